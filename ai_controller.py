@@ -4,226 +4,19 @@ import pyaudio
 import tempfile
 import time
 import os
-import fnmatch
 from datetime import datetime
 import json
 import subprocess
 from model import model
 from logic import webmovement
-
-# ===== IMPROVED GITIGNORE LIST =====
-GITIGNORE_LIST = [
-    # System / OS
-    ".git/",
-    ".git",
-    ".DS_Store",
-    "Thumbs.db",
-    "desktop.ini",
-    ".fseventsd",
-    ".Spotlight-V100",
-    ".Trashes",
-    
-    # Editor / IDE
-    ".vscode/",
-    ".vs/",
-    ".idea/",
-    "*.suo",
-    "*.ntvs*",
-    "*.njsproj",
-    "*.sln",
-    "*.swp",
-    "*.swo",
-    
-    # Python
-    "__pycache__/",
-    "*.pyc",
-    "*.pyo",
-    "*.pyd",
-    ".Python",
-    "pip-log.txt",
-    "pip-delete-this-directory.txt",
-    "pyvenv.cfg",
-    ".env",
-    "venv/",
-    ".venv/",
-    "env/",
-    "ENV/",
-    "pip-wheel-metadata/",
-    ".pytest_cache/",
-    ".mypy_cache/",
-    ".coverage",
-    "htmlcov/",
-    ".tox/",
-    ".nox/",
-    "coverage.xml",
-    
-    # Node.js / Frontend
-    "node_modules/",
-    "npm-debug.log*",
-    "yarn-debug.log*",
-    "yarn-error.log*",
-    ".npm",
-    ".yarn",
-    ".yarnrc",
-    "yarn.lock",
-    "package-lock.json",
-    "pnpm-debug.log*",
-    "pnpm-lock.yaml",
-    ".pnpm-store/",
-    ".next/",
-    ".nuxt/",
-    "dist/",
-    "out/",
-    ".vuepress/dist",
-    ".cache/",
-    ".parcel-cache/",
-    
-    # Java
-    "target/",
-    "*.jar",
-    "*.war",
-    "*.ear",
-    "*.class",
-    ".gradle/",
-    "gradle-app.setting",
-    "!gradle-wrapper.jar",
-    "build/",
-    "out/",
-    ".apt_generated/",
-    
-    # .NET / C#
-    "bin/",
-    "obj/",
-    "*.user",
-    "*.aps",
-    "*.ncb",
-    "*.opensdf",
-    "*.sdf",
-    "_ReSharper*/",
-    "*.csproj.user",
-    
-    # Ruby
-    "*.gem",
-    ".bundle",
-    "vendor/bundle/",
-    
-    # Go
-    "vendor/",
-    "go.sum",
-    
-    # Rust
-    "target/",
-    "Cargo.lock",
-    
-    # PHP
-    "vendor/",
-    "composer.lock",
-    
-    # Android
-    "*.apk",
-    "*.ap_",
-    "*.dex",
-    "*.class",
-    "gen/",
-    "bin/",
-    
-    # iOS / macOS
-    "*.ipa",
-    "*.dSYM.zip",
-    "*.dSYM",
-    "Pods/",
-    "DerivedData/",
-    
-    # Build / Generated files
-    "dist/",
-    "build/",
-    "out/",
-    ".cache/",
-    ".parcel-cache/",
-    ".eslintcache",
-    "*.tgz",
-    "*.tar.gz",
-    "*.zip",
-    
-    # Logs / Temp files
-    "*.log",
-    "*.tmp",
-    "*.temp",
-    "*.bak",
-    "*.backup",
-    "*.sublime-*",
-    
-    # Secrets / Configuration
-    "*.key",
-    "*.pem",
-    "*.crt",
-    ".env.local",
-    ".env.production",
-    ".env.development",
-    "*.secret",
-    "credentials.json",
-    "firebase.json",
-    "serviceAccountKey.json",
-    
-    # Database
-    "*.db",
-    "*.sqlite",
-    "*.sqlite3",
-    
-    # Testing
-    ".nyc_output/",
-    "coverage/",
-    "*.lcov",
-    
-    # Documentation
-    "site/",
-    ".docz/",
-    
-    # Project specific
-    "monacco folde/node_modules/",
-    "xterm folder/node_modules/",
-    "storage/*.tmp",
-    
-    # Project files
-    "*.project",
-    "*.settings/",
-    ".classpath",
-    
-    # OS generated
-    ".directory",
-    "*~",
-    "*.lock",
-    "*.pid",
-    
-    # Graphics/Media
-    "*.png",
-    "*.jpg",
-    "*.jpeg",
-    "*.gif",
-    "*.ico",
-    "*.svg",
-    "*.mp4",
-    "*.mov",
-    "*.avi",
-    
-    # Documents
-    "*.pdf",
-    "*.doc",
-    "*.docx",
-    "*.xls",
-    "*.xlsx",
-    "*.ppt",
-    "*.pptx",
-    
-    # Archives
-    "*.7z",
-    "*.dmg",
-    "*.gz",
-    "*.iso",
-    "*.rar",
-    "*.tar",
-    "*.zip",
-]
+from project_store import projects
+import ignore_rules
+from ignore_rules import GITIGNORE_LIST
+from project_scanner import ProjectScanner, is_text_file
+from record_cache import RecordCache
+import token_counter
+from batch_planner import plan_batches
+import rate_limiter
 
 GITHUB_COMMANDS = {
     # Repository commands
@@ -275,37 +68,18 @@ GITHUB_COMMANDS = {
 
 def should_ignore_file(file_path, project_root):
     """
-    Check if file should be ignored based on GITIGNORE_LIST
+    Check if file should be ignored (GITIGNORE_LIST + project .gitignore files, compiled once)
     """
-    rel_path = os.path.relpath(file_path, project_root)
-    file_name = os.path.basename(file_path)
-    
-    for pattern in GITIGNORE_LIST:
-        # Folder patterns (ending with /)
-        if pattern.endswith('/'):
-            folder_pattern = pattern.rstrip('/')
-            if folder_pattern in rel_path.split(os.sep):
-                return True
-        # File patterns
-        else:
-            if fnmatch.fnmatch(file_name, pattern):
-                return True
-            if fnmatch.fnmatch(rel_path, pattern):
-                return True
-    
-    return False
+    rel_path = os.path.relpath(file_path, project_root).replace(os.sep, "/")
+    return ignore_rules.for_project(project_root).ignored_path(rel_path)
 
 
 def should_ignore_directory(dir_name, dir_path, project_root):
     """
     Check if directory should be ignored
     """
-    for pattern in GITIGNORE_LIST:
-        if pattern.endswith('/'):
-            folder_pattern = pattern.rstrip('/')
-            if fnmatch.fnmatch(dir_name, folder_pattern):
-                return True
-    return False
+    rel_path = os.path.relpath(dir_path, project_root).replace(os.sep, "/")
+    return ignore_rules.for_project(project_root).ignored(rel_path, True)
 
 
 def get_file_size_kb(file_path):
@@ -316,22 +90,6 @@ def get_file_size_kb(file_path):
         return 0
 
 
-def is_text_file(file_path):
-    """Check if file is likely a text file"""
-    text_extensions = [
-        '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cpp', '.c', '.h', 
-        '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala',
-        '.html', '.css', '.scss', '.sass', '.less', '.xml', '.json',
-        '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
-        '.md', '.txt', '.rst', '.tex',
-        '.sh', '.bash', '.zsh', '.ps1', '.bat', '.cmd',
-        '.sql', '.r', '.m', '.f', '.f90', '.pl', '.lua'
-    ]
-    
-    _, ext = os.path.splitext(file_path)
-    return ext.lower() in text_extensions
-
-
 def get_file_priority(file_path):
     """
     Files ko priority assign kare
@@ -364,10 +122,17 @@ def get_file_priority(file_path):
 
 def estimate_tokens(text):
     """
-    Estimate tokens from text (rough calculation)
-    Average: 1 token ≈ 4 characters
+    Token count of text - real tokenizer when available (see token_counter), cached by content hash
     """
-    return len(text) // 4
+    return token_counter.count_tokens(text)
+
+
+RECORD_FIELDS_VERSION = "2"  # bump when file_record_fields changes - cached fields get recomputed
+
+
+def file_record_fields(file_path, content):
+    """Per-file fields readme_smart needs - cached in .codeflow/records.db, recomputed only when the file changes"""
+    return {'priority': get_file_priority(file_path), 'tokens': estimate_tokens(content)}
 
 
 # ===== IMPROVED README GENERATOR WITH TPM LIMIT =====
@@ -381,9 +146,7 @@ def readme_smart():
     """
     try:
         # Load project path
-        with open("storage/recent.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        project_path = data[0]["path"]
+        project_path = projects.current_path()
         readme_path = os.path.join(project_path, "README.md")
         
         print("\n" + "="*70)
@@ -394,55 +157,19 @@ def readme_smart():
         print(f"⚡ API Limit: 12,000 TPM (Tokens Per Minute)")
         print("="*70 + "\n")
         
-        # ⭐ STEP 1: Collect ALL valid files
+        # ⭐ STEP 1: Collect ALL valid files (ignore rules, text + size filters, parallel reads)
         all_files = []
-        ignored_files = []
         
         print("🔍 Phase 1: Scanning project files...\n")
         
-        for root, dirs, files in os.walk(project_path):
-            dirs[:] = [d for d in dirs if not should_ignore_directory(d, os.path.join(root, d), project_root=project_path)]
-            
-            if '.git' in dirs:
-                dirs.remove('.git')
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, project_path)
-                
-                if should_ignore_file(file_path, project_path):
-                    ignored_files.append(rel_path)
-                    continue
-                
-                if not is_text_file(file_path):
-                    ignored_files.append(rel_path)
-                    continue
-                
-                file_size = get_file_size_kb(file_path)
-                if file_size > 500:
-                    ignored_files.append(f"{rel_path} (too large: {file_size:.1f}KB)")
-                    continue
-                
-                try:
-                    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-                    
-                    priority = get_file_priority(file_path)
-                    tokens = estimate_tokens(content)
-                    
-                    all_files.append({
-                        'path': rel_path,
-                        'full_path': file_path,
-                        'content': content,
-                        'size': file_size,
-                        'priority': priority,
-                        'tokens': tokens
-                    })
-                    
-                except Exception as e:
-                    ignored_files.append(f"{rel_path} (read error)")
-                    continue
+        # Unchanged files since the last run: one stat each, text read only when its batch is built
+        # Token counts depend on the counter in use - switching it recounts everything
+        cache = RecordCache(project_path, version=f"{RECORD_FIELDS_VERSION}:{token_counter.get_counter().name}")
+        scanner = ProjectScanner(project_path, max_kb=500, cache=cache, derive=file_record_fields, content=False)
+        all_files = list(scanner.scan())
+        ignored_files = scanner.skipped
         
+        print(scanner.summary())
         print(f"✅ Found {len(all_files)} valid files")
         print(f"⏭️  Ignored {len(ignored_files)} files\n")
         
@@ -462,16 +189,12 @@ def readme_smart():
                 print(f"  Priority {priority_level} ({priority_name}): {len(priority_files)} files (~{total_tokens:,} tokens)")
         
         # ⭐ STEP 3: Create batches within TPM limit
-        print("\n📦 Phase 3: Creating batches (TPM limit: 12,000)...\n")
+        print(f"\n📦 Phase 3: Creating batches (TPM limit: {rate_limiter.TPM:,})...\n")
         
-        TPM_LIMIT = 12000  # Groq's limit
+        TPM_LIMIT = rate_limiter.TPM  # Groq's limit
         SAFETY_MARGIN = 2000  # Reserve for prompt + response
         MAX_TOKENS_PER_BATCH = TPM_LIMIT - SAFETY_MARGIN  # 10,000 tokens per batch
         
-        batches = []
-        current_batch = []
-        current_tokens = 0
-        
         # Estimate base prompt tokens
         base_prompt = """You are Nebula IDE AI. Analyze project code and create README.md.
         
@@ -488,34 +211,22 @@ Generate README content now:"""
         
         base_prompt_tokens = estimate_tokens(base_prompt)
         
-        for file_info in all_files:
-            file_tokens = file_info['tokens'] + 100  # +100 for formatting
-            
-            # Check if adding this file exceeds batch limit
-            if current_tokens + file_tokens + base_prompt_tokens > MAX_TOKENS_PER_BATCH:
-                if current_batch:
-                    batches.append({
-                        'files': current_batch,
-                        'tokens': current_tokens
-                    })
-                    print(f"  ✅ Batch {len(batches)}: {len(current_batch)} files, ~{current_tokens:,} tokens")
-                
-                # Start new batch
-                current_batch = [file_info]
-                current_tokens = file_tokens
-            else:
-                current_batch.append(file_info)
-                current_tokens += file_tokens
-        
-        # Add last batch
-        if current_batch:
-            batches.append({
-                'files': current_batch,
-                'tokens': current_tokens
-            })
-            print(f"  ✅ Batch {len(batches)}: {len(current_batch)} files, ~{current_tokens:,} tokens")
+        # Fewest batches that fit (first-fit decreasing, main code together, big files split at def/class)
+        plan = plan_batches(
+            all_files,
+            MAX_TOKENS_PER_BATCH - base_prompt_tokens,
+            # Exact count of the "### File: ..." wrapper the prompt puts around the content
+            overhead=lambda f: estimate_tokens(f"### File: {f['path']}\n```\n\n```\n\n"),
+            count=estimate_tokens,
+        )
+        batches = plan.batches
+        for batch_num, batch in enumerate(batches, 1):
+            print(f"  ✅ Batch {batch_num}: {len(batch['files'])} files, ~{batch['tokens']:,} tokens")
         
-        print(f"\n📊 Total batches created: {len(batches)}")
+        print(f"\n{plan.summary()}")
+        # model() waits on the shared RPM / TPM limiter - only as long as the token budget needs
+        expected = plan.estimate_seconds(base_prompt_tokens, response_tokens=rate_limiter.RESPONSE_TOKENS, tpm=rate_limiter.TPM)
+        print(f"📊 Expected: {plan.requests} request(s), ~{expected / 60:.1f} min wall time")
         print("="*70 + "\n")
         
         # ⭐ STEP 4: Process batches with delays
@@ -571,25 +282,12 @@ Additional README content:"""
                 print(f"   ⏳ Calling AI API...")
                 response = model(prompt)
                 all_readme_parts.append(response)
-                print(f"   ✅ Batch {batch_num} completed!")
-                
-                # Add delay between batches (60 seconds to reset TPM)
-                if batch_num < len(batches):
-                    wait_time = 65  # 65 seconds to be safe
-                    print(f"   ⏸️  Waiting {wait_time}s for rate limit reset...\n")
-                    time.sleep(wait_time)
-                else:
-                    print()
+                print(f"   ✅ Batch {batch_num} completed!\n")
                 
             except Exception as e:
+                # Rate limits are already waited out (and retried) inside model()
                 error_msg = str(e)
                 print(f"   ❌ Batch {batch_num} failed: {error_msg[:100]}\n")
-                
-                # If rate limit error, wait longer
-                if "rate" in error_msg.lower() or "limit" in error_msg.lower():
-                    print("   ⚠️  Rate limit detected! Waiting 70 seconds...\n")
-                    time.sleep(70)
-                
                 continue
         
         # ⭐ STEP 5: Combine all README parts
@@ -660,9 +358,7 @@ def readme():
 
 class GITHUB:
     def __init__(self, url=None, branch=None):
-        with open("storage/recent.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.folder_path = data[0]["path"]
+        self.folder_path = projects.current_path()
         self.files = GITIGNORE_LIST
         self.url = url
         self.branch = branch or "main"
@@ -802,47 +498,19 @@ class GITHUB:
 # ========== hold my tea====
 class HOLD_MY_TEA_MOMENT:
     def __init__(self):
-        with open("storage/recent.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-        self.project_path = data[0]["path"]
+        self.project_path = projects.current_path()
         self.fixed_files = []
         self.failed_files = []
     
     def collect_all_files(self):
-        """Sari files collect karo with their paths and content"""
-        files_data = []
+        """Sari files collect karo with their paths and content (text files only, binaries/huge files skip)"""
+        scanner = ProjectScanner(self.project_path)
+        files_data = list(scanner.scan())
         
-        for root, dirs, files in os.walk(self.project_path):
-            # Ignore .git folder
-            if ".git" in dirs:
-                dirs.remove(".git")
-            
-            # Ignore gitignore folders
-            dirs[:] = [
-                d for d in dirs
-                if not any(fnmatch.fnmatch(d, ig.rstrip("/")) for ig in GITIGNORE_LIST if ig.endswith("/"))
-            ]
-            
-            for file in files:
-                # Ignore gitignore files
-                if any(fnmatch.fnmatch(file, ig) for ig in GITIGNORE_LIST if not ig.endswith("/")):
-                    continue
-                
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, self.project_path)
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors="ignore") as f:
-                        content = f.read()
-                    
-                    files_data.append({
-                        'path': relative_path,
-                        'filename': file,
-                        'content': content,
-                        'full_path': file_path
-                    })
-                except Exception as e:
-                    print(f"❌ Cannot read {relative_path}: {str(e)}")
+        for skipped in scanner.skipped:
+            if skipped.endswith("(read error)"):
+                print(f"❌ Cannot read {skipped}")
+        print(scanner.summary())
         
         return files_data
     
@@ -1030,11 +698,10 @@ Example (WRONG - DON'T DO THIS):
 # ===== CODE UPDATER FUNCTIONS =====
 # (Keeping your original functions)
 
-import random
-
-def process_large_code_smart(original_code, change_request, max_lines=500, delay_between_chunks=8):
+def process_large_code_smart(original_code, change_request, max_lines=500, delay_between_chunks=0):
     """
-    Process chunks one by one with 500 lines limit and delays
+    Process chunks one by one with 500 lines limit
+    (model() paces calls with the shared rate limiter; delay_between_chunks adds an extra fixed pause)
     """
     lines = original_code.split('\n')
     line_count = len(lines)
@@ -1069,11 +736,10 @@ Return updated code:"""
         print(f"\n🔄 Processing chunk {idx + 1}/{len(chunks)}...")
         print(f"   Chunk size: {len(chunk.split('\\n'))} lines")
         
-        # Wait between chunks to avoid rate limit
-        if idx > 0:
-            wait_time = delay_between_chunks + random.uniform(2, 5)
-            print(f"⏳ Waiting {wait_time:.1f} seconds...")
-            time.sleep(wait_time)
+        # Extra pause only if asked for - the rate limiter already waits when the budget is used up
+        if idx > 0 and delay_between_chunks:
+            print(f"⏳ Waiting {delay_between_chunks:.1f} seconds...")
+            time.sleep(delay_between_chunks)
         
         chunk_prompt = f"""You are updating PART {idx + 1} of {len(chunks)}.
 Each chunk has maximum 500 lines.
@@ -1112,7 +778,6 @@ Updated chunk {idx + 1}:"""
     try:
         if len(updated_chunks) > 1:
             print("🧹 Doing final cleanup...")
-            time.sleep(5)  # Wait before final request
             
             cleanup_prompt = f"""This code was split into {len(chunks)} parts of 500 lines each.
 Now combine and ensure consistency:
@@ -1161,12 +826,6 @@ def process_500_line_chunks(code, instruction):
     for chunk_num, chunk in enumerate(chunks, 1):
         print(f"\n📄 Chunk {chunk_num}/{len(chunks)}")
         
-        # Add delay between chunks
-        if chunk_num > 1:
-            wait = 10
-            print(f"Waiting {wait} seconds...")
-            time.sleep(wait)
-        
         prompt = f"""Update this 500-line code chunk ({chunk_num}/{len(chunks)}):
 
 {chunk}
@@ -1213,4 +872,4 @@ def code_updater_500_limit(code, instruction):
 if __name__ == "__main__":
     print("Testing improved README generator...")
     s = GITHUB()
-    s.clone_repo("https://github.com/life2-byte/testing.git",r"C:\Users\User\Desktop\clone_repo")
\ No newline at end of file
+    s.clone_repo("https://github.com/life2-byte/testing.git",r"C:\Users\User\Desktop\clone_repo")
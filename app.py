@@ -79,6 +79,9 @@ class Api(webmovement, TerminalServer):
             window.resize(width, height)
 
     def close(self):
+        # Queued autosaves and the clipboard go to disk before the window disappears
+        self.flush_all()
+        self.save_clipboard()
         if webview.windows:
             webview.windows[0].destroy()
 
@@ -106,4 +109,4 @@ def start():
 if __name__ == "__main__":
     # a = Api()
     # a.github_Repo("https://github.com/life2-byte/testing.git")
-    start()
\ No newline at end of file
+    start()
\ No newline at end of file
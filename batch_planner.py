@@ -0,0 +1,207 @@
+import os
+import re
+import math
+
+from token_counter import count_tokens
+
+# ================= SETTINGS =================
+LATENCY_S = 8              # one model call, prompt in -> README part out
+RESPONSE_TOKENS = 1500     # a README part - TPM limits count it on top of the prompt
+
+# Where a file may be cut: top-level definitions, so every part is whole functions / classes
+BOUNDARIES = {
+    ".py": re.compile(r"(?:@|async\s+def\s|def\s|class\s)"),
+    ".js": re.compile(r"(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\b|class\b)|(?:export\s+)?(?:const|let|var)\s+\w+\s*=\s*(?:async\s*)?(?:function\b|\([^)]*\)\s*=>)"),
+}
+for ext in (".jsx", ".ts", ".tsx", ".mjs"):
+    BOUNDARIES[ext] = BOUNDARIES[".js"]
+NESTED = re.compile(r"\s+(?:async\s+def|def|class|function)\b")
+
+
+# ================= SPLITTING =================
+def cut_points(lines, ext):
+    """Line numbers where a new top-level block starts (decorators stay with their def)"""
+    pattern = BOUNDARIES.get(ext)
+    points = []
+    previous = False
+    for i, line in enumerate(lines):
+        if pattern is not None:
+            starts = bool(pattern.match(line))
+        else:
+            # Anything else: a non-indented line after a blank one
+            starts = bool(line[:1].strip()) and i > 0 and not lines[i - 1].strip()
+        if starts and not previous and i > 0:
+            points.append(i)
+        previous = starts
+    return points
+
+
+def pack_lines(lines, points, budget, count):
+    """Join lines[a:b] segments (cut at points) greedily into chunks of at most budget tokens"""
+    bounds = [0] + points + [len(lines)]
+    chunks, current, current_tokens = [], "", 0
+    for a, b in zip(bounds, bounds[1:]):
+        segment = "".join(lines[a:b])
+        tokens = count(segment)
+        if tokens > budget:
+            if current:
+                chunks.append((current, current_tokens))
+                current, current_tokens = "", 0
+            sub_lines = lines[a:b]
+            sub_points = [i for i, line in enumerate(sub_lines) if i and NESTED.match(line)]
+            if sub_points:
+                chunks.extend(pack_lines(sub_lines, sub_points, budget, count))
+            elif len(sub_lines) > 1:
+                chunks.extend(pack_lines(sub_lines, list(range(1, len(sub_lines))), budget, count))
+            else:
+                chunks.extend(cut_line(segment, budget, count))
+            continue
+        if current and current_tokens + tokens > budget:
+            chunks.append((current, current_tokens))
+            current, current_tokens = "", 0
+        current += segment
+        current_tokens += tokens
+    if current:
+        chunks.append((current, current_tokens))
+    return chunks
+
+
+def cut_line(text, budget, count):
+    """One line over budget (minified code, data) -> halves until each fits"""
+    tokens = count(text)
+    if tokens <= budget or len(text) < 2:
+        return [(text, tokens)]
+    middle = len(text) // 2
+    return cut_line(text[:middle], budget, count) + cut_line(text[middle:], budget, count)
+
+
+def split_file(record, budget, count=count_tokens):
+    """A file too big for one batch -> part records cut at def / class boundaries, each within budget"""
+    lines = record["content"].splitlines(keepends=True)
+    ext = os.path.splitext(record["path"])[1].lower()
+    chunks = pack_lines(lines, cut_points(lines, ext), budget, count)
+    parts = []
+    for i, (content, tokens) in enumerate(chunks, 1):
+        parts.append({
+            "path": f"{record['path']} (part {i}/{len(chunks)})",
+            "filename": record.get("filename", os.path.basename(record["path"])),
+            "full_path": record.get("full_path"),
+            "content": content,
+            "size": len(content.encode("utf-8")) / 1024,
+            "priority": record.get("priority", 4),
+            "tokens": tokens,
+            "part": (i, len(chunks)),
+        })
+    return parts
+
+
+def split_to_fit(record, capacity, overhead, count=count_tokens):
+    """
+    split_file with each part's own overhead - "path (part i/n)" is longer than path, so the
+    budget shrinks by whatever a part still went over and the file is cut again.
+    """
+    budget = capacity - overhead(record)
+    while budget > 0:
+        parts = split_file(record, budget, count)
+        over = max(part["tokens"] + overhead(part) - capacity for part in parts)
+        if over <= 0:
+            return parts
+        budget -= over
+    raise ValueError(f"{record['path']}: the per-file overhead alone is over {capacity} tokens")
+
+
+# ================= PACKING =================
+def first_fit(items, capacity, key):
+    """First-fit decreasing in the order key gives; bins are [free, items, used]"""
+    bins = []
+    for item in sorted(items, key=key):
+        cost = item[0]
+        for b in bins:
+            if b[0] >= cost:
+                b[0] -= cost
+                b[1].append(item)
+                b[2] += cost
+                break
+        else:
+            bins.append([capacity - cost, [item], cost])
+    return bins
+
+
+class BatchPlan:
+    def __init__(self, batches, capacity, total_tokens, lower_bound, split_files):
+        self.batches = batches          # [{"files": [...], "tokens": n}], main code first
+        self.capacity = capacity
+        self.total_tokens = total_tokens
+        self.lower_bound = lower_bound  # no packing can use fewer batches
+        self.split_files = split_files  # paths cut into parts
+
+    @property
+    def requests(self):
+        return len(self.batches)
+
+    def estimate_seconds(self, prompt_tokens=0, latency=LATENCY_S, response_tokens=RESPONSE_TOKENS, fixed_wait=None, tpm=None):
+        """
+        Wall time for sending every batch: fixed_wait seconds between calls, or a tokens-per-minute
+        budget that refills continuously (starts full). Neither - back to back.
+        """
+        if fixed_wait is not None:
+            return self.requests * latency + max(self.requests - 1, 0) * fixed_wait
+        seconds, bucket = 0.0, float(tpm or 0)
+        for batch in self.batches:
+            need = batch["tokens"] + prompt_tokens + response_tokens
+            if tpm and need > bucket:
+                wait = (min(need, tpm) - bucket) * 60 / tpm
+                seconds += wait
+                bucket += wait * tpm / 60
+            bucket -= need
+            seconds += latency
+            if tpm:
+                bucket = min(tpm, bucket + latency * tpm / 60)
+        return seconds
+
+    def summary(self):
+        text = (f"📦 {self.requests} batch(es) for {self.total_tokens:,} tokens "
+                f"(≤ {self.capacity:,} each, can't do better than {self.lower_bound})")
+        if self.split_files:
+            text += f"\n✂️  Split at def/class boundaries: {', '.join(self.split_files)}"
+        return text
+
+
+def plan_batches(files, capacity, overhead=lambda record: 0, count=count_tokens):
+    """
+    Pack files into the fewest batches of at most capacity tokens (file['tokens'] + overhead(file)).
+    First-fit decreasing, one priority level after another so the main code lands in the same
+    (first) batches; plain FFD is tried too and wins only if it needs fewer batches.
+    Files bigger than a batch are split into parts first.
+    """
+    items, split = [], []
+    for record in files:
+        cost = record["tokens"] + overhead(record)
+        if cost > capacity:
+            split.append(record["path"])
+            for part in split_to_fit(record, capacity, overhead, count):
+                items.append((part["tokens"] + overhead(part), part))
+        else:
+            items.append((cost, record))
+
+    def by_priority(item):
+        return (item[1].get("priority", 4), -item[0], item[1]["path"])
+
+    bins = first_fit(items, capacity, by_priority)
+    plain = first_fit(items, capacity, lambda item: (-item[0], item[1]["path"]))
+    if len(plain) < len(bins):
+        bins = plain
+
+    batches = []
+    for _, members, used in bins:
+        assert used <= capacity, f"batch of {used} tokens is over capacity {capacity}"
+        records = sorted((record for _, record in members), key=lambda r: (r.get("priority", 4), r["path"]))
+        batches.append({"files": records, "tokens": used})
+    # Batch 1 gets the "write the whole README" prompt - give it the most important code
+    batches.sort(key=lambda b: (min(r.get("priority", 4) for r in b["files"]),
+                                -sum(1 for r in b["files"] if r.get("priority", 4) == 1)))
+
+    total = sum(cost for cost, _ in items)
+    half = sum(1 for cost, _ in items if cost > capacity / 2)
+    lower_bound = max(math.ceil(total / capacity), half) if items else 0
+    return BatchPlan(batches, capacity, total, lower_bound, split)
@@ -0,0 +1,151 @@
+import os
+import re
+import shutil
+import hashlib
+import tempfile
+import threading
+
+# ================= SETTINGS =================
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "build-cache")
+BUDGET_MB = 512  # LRU eviction kicks in above this
+
+INCLUDE_RE = re.compile(rb'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+
+
+class BuildCache:
+    """
+    Content-addressed cache of compiled artifacts.
+    Key = source (+ local headers / sibling .java files) + compiler identity + flags.
+    Every entry is a folder <root>/<key>/ - its mtime is the LRU clock.
+    """
+
+    def __init__(self, root=CACHE_DIR, budget_mb=BUDGET_MB):
+        self.root = root
+        self.budget = budget_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        self.index = None  # key -> [size, last_used], loaded on first use
+
+    # ================= KEY =================
+    def dependencies(self, lang, filepath):
+        """Files besides the source that change what the compiler produces"""
+        folder = os.path.dirname(filepath)
+        if lang == "java":
+            try:
+                return sorted(
+                    os.path.join(folder, name) for name in os.listdir(folder)
+                    if name.endswith(".java") and os.path.join(folder, name) != filepath
+                )
+            except OSError:
+                return []
+
+        # C / C++ - follow #include "local.h" recursively
+        deps = []
+        seen = {os.path.normcase(os.path.abspath(filepath))}
+        pending = [filepath]
+        while pending:
+            current = pending.pop()
+            try:
+                with open(current, "rb") as f:
+                    includes = INCLUDE_RE.findall(f.read())
+            except OSError:
+                continue
+            for name in includes:
+                header = os.path.abspath(os.path.join(os.path.dirname(current), name.decode("utf-8", "ignore")))
+                if os.path.normcase(header) not in seen and os.path.isfile(header):
+                    seen.add(os.path.normcase(header))
+                    deps.append(header)
+                    pending.append(header)
+        return sorted(deps)
+
+    def compiler_identity(self, compiler):
+        path = shutil.which(compiler)
+        if not path:
+            return compiler
+        st = os.stat(path)
+        return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+    def key_for(self, lang, filepath, compiler, flags):
+        h = hashlib.sha256()
+        h.update(f"{lang}\0{self.compiler_identity(compiler)}\0{' '.join(flags)}\0".encode())
+        if lang == "java":
+            # Class name comes from the file name
+            h.update(os.path.basename(filepath).encode() + b"\0")
+        for path in [filepath] + self.dependencies(lang, filepath):
+            h.update(os.path.relpath(path, os.path.dirname(filepath)).encode() + b"\0")
+            with open(path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        return h.hexdigest()[:32]
+
+    # ================= ENTRIES =================
+    def load_index(self):
+        if self.index is not None:
+            return
+        self.index = {}
+        os.makedirs(self.root, exist_ok=True)
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith("tmp"):
+                    # Leftover from a build that never finished
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                elif entry.is_dir():
+                    self.index[entry.name] = [self.folder_size(entry.path), entry.stat().st_mtime]
+
+    def folder_size(self, path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def lookup(self, key):
+        """Entry folder for key, or None on a miss"""
+        with self.lock:
+            self.load_index()
+            if key not in self.index:
+                return None
+            path = os.path.join(self.root, key)
+            if not os.path.isdir(path):
+                del self.index[key]
+                return None
+            os.utime(path)
+            self.index[key][1] = os.path.getmtime(path)
+            return path
+
+    def staging(self):
+        """Private folder to compile into - published with commit()"""
+        with self.lock:
+            self.load_index()
+        return tempfile.mkdtemp(prefix="tmp", dir=self.root)
+
+    def commit(self, key, staging):
+        final = os.path.join(self.root, key)
+        with self.lock:
+            try:
+                os.replace(staging, final)
+            except OSError:
+                # Someone else published the same key first - theirs is identical
+                shutil.rmtree(staging, ignore_errors=True)
+            self.index[key] = [self.folder_size(final), os.path.getmtime(final)]
+            self.evict(keep=key)
+        return final
+
+    def discard(self, staging):
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self, keep=None):
+        total = sum(size for size, _ in self.index.values())
+        for key, (size, _) in sorted(self.index.items(), key=lambda item: item[1][1]):
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            del self.index[key]
+            total -= size
+            print(f"🧹 Build cache evicted {key} ({size / 1024:.0f} KB)")
+
+
+build_cache = BuildCache()
@@ -0,0 +1,92 @@
+import os
+import json
+import atexit
+import threading
+
+# ================= SETTINGS =================
+STORAGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "clipboard.json")
+MODES = ("cut", "copy")
+
+
+def existing_paths(paths):
+    """
+    (existing, missing) in one batched pass - one scandir per parent folder
+    instead of one os.path.exists per path.
+    """
+    by_folder = {}
+    for path in paths:
+        norm = os.path.normpath(path)
+        by_folder.setdefault(os.path.dirname(norm), []).append((path, os.path.basename(norm)))
+
+    existing, missing = [], []
+    for folder, entries in by_folder.items():
+        try:
+            with os.scandir(folder or ".") as it:
+                names = {os.path.normcase(entry.name) for entry in it}
+        except OSError:
+            names = set()
+        for path, name in entries:
+            # Drive roots / "." have no basename - fall back to a plain check
+            found = os.path.normcase(name) in names if name else os.path.exists(path)
+            (existing if found else missing).append(path)
+    return existing, missing
+
+
+class Clipboard:
+    """
+    Cut and copy sets for the explorer, kept in memory and shared by every Api / webmovement.
+    Only written to disk on shutdown or when save() is asked for.
+    """
+
+    def __init__(self, storage_file=STORAGE_FILE):
+        self.storage_file = storage_file
+        self.lock = threading.Lock()
+        self.entries = {mode: [] for mode in MODES}
+        self.loaded = False
+        self.dirty = False
+
+    def load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        try:
+            with open(self.storage_file, "r") as f:
+                data = json.load(f)
+            for mode in MODES:
+                self.entries[mode] = [p for p in data.get(mode, []) if isinstance(p, str)]
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def set(self, mode, paths):
+        """Replace the mode's set. Returns the missing paths - nothing is stored if there are any."""
+        _, missing = existing_paths(paths)
+        if missing:
+            return missing
+        with self.lock:
+            self.load()
+            self.entries[mode] = list(paths)
+            self.dirty = True
+        return []
+
+    def take(self, mode):
+        """Paths in the mode's set (still existing), and empty the set - pasting consumes it"""
+        with self.lock:
+            self.load()
+            paths, self.entries[mode] = self.entries[mode], []
+            if paths:
+                self.dirty = True
+        existing, _ = existing_paths(paths)
+        return existing
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.storage_file), exist_ok=True)
+            with open(self.storage_file, "w") as f:
+                json.dump(self.entries, f)
+            self.dirty = False
+
+
+clipboard = Clipboard()
+atexit.register(clipboard.save)
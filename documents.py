@@ -0,0 +1,342 @@
+import os
+import re
+import sys
+import time
+import uuid
+import tempfile
+import threading
+
+MAX_PIECES = 2000  # past this the table is flattened back into one piece
+AUTOSAVE_BATCH = 0.05  # write-behind collects autosaves this long before writing
+
+# Monaco offsets are UTF-16 units - with astral characters they stop matching str offsets
+ASTRAL_RE = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def offsets_match_utf16(text):
+    return text.isascii() or not ASTRAL_RE.search(text)
+
+
+class PieceTable:
+    """
+    Text as a list of (buffer, start, length) pieces over immutable strings.
+    Edits only split pieces - the file content is never copied until text() is asked for.
+    """
+
+    def __init__(self, text=""):
+        self.pieces = [(text, 0, len(text))] if text else []
+        self.length = len(text)
+
+    def locate(self, offset):
+        """(piece index, offset inside that piece) for a document offset"""
+        pos = 0
+        for i, (_, _, length) in enumerate(self.pieces):
+            if offset <= pos + length:
+                return i, offset - pos
+            pos += length
+        return len(self.pieces), 0
+
+    def split(self, offset):
+        """Make offset fall on a piece boundary and return the index of the piece starting there"""
+        i, inner = self.locate(offset)
+        if i == len(self.pieces):
+            return i
+        buf, start, length = self.pieces[i]
+        if inner == 0:
+            return i
+        if inner == length:
+            return i + 1
+        self.pieces[i:i + 1] = [(buf, start, inner), (buf, start + inner, length - inner)]
+        return i + 1
+
+    def replace(self, offset, length, text):
+        if offset < 0 or length < 0 or offset + length > self.length:
+            raise ValueError(f"Edit {offset}+{length} is outside the document ({self.length})")
+        first = self.split(offset)
+        last = self.split(offset + length)
+        self.pieces[first:last] = [(text, 0, len(text))] if text else []
+        self.length += len(text) - length
+        if len(self.pieces) > MAX_PIECES:
+            self.__init__(self.text())
+
+    def text(self):
+        return "".join(buf[start:start + length] for buf, start, length in self.pieces)
+
+
+def atomic_write(path, content):
+    """Temp file in the same folder + fsync + rename - a crash never leaves a half-written file"""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def disk_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class Document:
+    def __init__(self, path, text):
+        self.path = path
+        self.table = PieceTable(text)
+        self.epoch = uuid.uuid4().hex[:8]
+        self.revision = 0
+        self.offsets_safe = None  # not checked yet - the write-behind thread (or the first apply) finds out
+        self.stamp = disk_stamp(path)
+        self.writing = 0  # write-behind writes in flight - the disk stamp is ours to change meanwhile
+
+    @property
+    def version(self):
+        return f"{self.epoch}:{self.revision}"
+
+
+class DocumentStore:
+    """
+    Server-side image of every open (non-windowed) editor file.
+    The editor sends Monaco change deltas against a version it got from us; anything that
+    doesn't line up (unknown version, file changed on disk, astral characters) is answered
+    with "resync" and the editor falls back to sending the full content.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.docs = {}
+
+    def key(self, path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def open(self, path, text):
+        with self.lock:
+            doc = Document(path, text)
+            self.docs[self.key(path)] = doc
+            return doc.version
+
+    def close(self, path):
+        with self.lock:
+            self.docs.pop(self.key(path), None)
+
+    def get(self, path):
+        with self.lock:
+            return self.docs.get(self.key(path))
+
+    def replace(self, path, text):
+        """New full text, in memory - same epoch, next revision (opened if it wasn't). Caller holds the lock."""
+        doc = self.docs.get(self.key(path))
+        if doc is None:
+            doc = self.docs[self.key(path)] = Document(path, text)
+        else:
+            doc.table = PieceTable(text)
+            doc.offsets_safe = None
+            doc.revision += 1
+        return doc
+
+    def apply(self, path, version, changes):
+        """Monaco changes onto the in-memory document - None, or the "resync" answer. Caller holds the lock."""
+        doc = self.docs.get(self.key(path))
+        if doc is None or doc.version != version:
+            return {"status": "resync", "message": "version mismatch"}
+        if doc.offsets_safe is None:
+            doc.offsets_safe = offsets_match_utf16(doc.table.text())
+        if not doc.offsets_safe:
+            return {"status": "resync", "message": "document has characters outside the BMP"}
+        if not doc.writing and disk_stamp(path) != doc.stamp:
+            return {"status": "resync", "message": "file changed on disk"}
+
+        table = PieceTable()
+        table.pieces, table.length = list(doc.table.pieces), doc.table.length
+        try:
+            for change in changes:
+                text = change.get("text", "")
+                if not offsets_match_utf16(text):
+                    return {"status": "resync", "message": "edit has characters outside the BMP"}
+                table.replace(int(change["rangeOffset"]), int(change["rangeLength"]), text)
+        except (KeyError, ValueError, TypeError) as e:
+            return {"status": "resync", "message": str(e)}
+
+        doc.table = table
+        doc.revision += 1
+        return None
+
+    def save_full(self, path, text):
+        """Write the whole buffer and make it the new base - the version moves on, it doesn't restart"""
+        atomic_write(path, text)
+        with self.lock:
+            doc = self.replace(path, text)
+            doc.stamp = disk_stamp(path)
+            return doc.version
+
+    def save_delta(self, path, version, changes):
+        with self.lock:
+            answer = self.apply(path, version, changes)
+            if answer is not None:
+                return answer
+            doc = self.docs[self.key(path)]
+            atomic_write(path, doc.table.text())
+            doc.stamp = disk_stamp(path)
+            return {"status": "success", "message": "file saved", "path": path, "version": doc.version}
+
+    def update(self, path, version=None, changes=None, text=None):
+        """
+        Autosave, in memory only: changes against version like save_delta, else (or if those
+        don't line up and the full text came along) the full text. Returns the answer for the
+        editor - with the new version, so its next changes can build on this one.
+        """
+        with self.lock:
+            answer = {"status": "resync", "message": "nothing to autosave"}
+            if version and changes is not None:
+                answer = self.apply(path, version, changes)
+            if answer is not None:
+                if text is None:
+                    return answer
+                self.replace(path, text)
+            return {"status": "queued", "message": "autosave queued", "path": path,
+                    "version": self.docs[self.key(path)].version}
+
+    def write(self, doc):
+        """Put a document's current text on disk (write-behind thread) - and do its BMP check here, off the UI call"""
+        with self.lock:
+            table = doc.table
+            text = table.text()
+            doc.writing += 1
+        try:
+            safe = offsets_match_utf16(text) if doc.offsets_safe is None else None
+            atomic_write(doc.path, text)
+        finally:
+            with self.lock:
+                doc.writing -= 1
+                doc.stamp = disk_stamp(doc.path)
+                if safe is not None and doc.table is table and doc.offsets_safe is None:
+                    doc.offsets_safe = safe
+
+
+store = DocumentStore()
+
+
+# ================= WRITE-BEHIND AUTOSAVE =================
+class WriteBehind:
+    """
+    Autosaves are applied to the DocumentStore right away (DocumentStore.update) and written
+    by one background thread. A document is written once per batch however many autosaves it
+    got, batches go out every AUTOSAVE_BATCH seconds, and fsync never runs on the pywebview API thread.
+    """
+
+    def __init__(self, store, interval=AUTOSAVE_BATCH):
+        self.store = store
+        self.interval = interval
+        self.cond = threading.Condition()
+        self.pending = {}      # key -> Document to write
+        self.writing = set()   # keys being written right now
+        self.errors = {}       # path -> last error, reported by the next auto_save
+        self.thread = None
+
+    def submit(self, path):
+        """O(1) - marks the open document for path as needing a write"""
+        doc = self.store.get(path)
+        if doc is None:
+            return None
+        with self.cond:
+            self.pending[self.store.key(path)] = doc
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.cond.notify_all()
+            return self.errors.pop(path, None)
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            # Let a burst of keystroke pauses collapse into one write per file
+            time.sleep(self.interval)
+            with self.cond:
+                batch, self.pending = self.pending, {}
+                self.writing = set(batch)
+            for key, doc in batch.items():
+                try:
+                    self.store.write(doc)
+                except Exception as e:
+                    print(f"❌ Autosave failed for {doc.path}: {e}")
+                    with self.cond:
+                        self.errors[doc.path] = str(e)
+                with self.cond:
+                    self.writing.discard(key)
+                    self.cond.notify_all()
+
+    def discard(self, path):
+        """Drop a queued autosave (an explicit save supersedes it) and wait out one being written"""
+        key = self.store.key(path)
+        with self.cond:
+            self.pending.pop(key, None)
+            while key in self.writing:
+                self.cond.wait()
+
+    def flush(self, path=None, timeout=10):
+        """Block until everything queued (or just path) is on disk"""
+        key = path and self.store.key(path)
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while True:
+                busy = (key in self.pending or key in self.writing) if key else (self.pending or self.writing)
+                remaining = deadline - time.monotonic()
+                if not busy or remaining <= 0:
+                    return not busy
+                self.cond.wait(remaining)
+
+    def flush_all(self, timeout=10):
+        return self.flush(None, timeout)
+
+
+autosaver = WriteBehind(store)
+
+
+# ================= BENCHMARK =================
+def benchmark(folder, sizes_mb=(0.01, 1, 5, 25), rounds=50):
+    """auto_save UI-call latency (queue) vs. the old synchronous write - plain ASCII, accented and astral text"""
+    print(f"📊 auto_save latency, {rounds} calls per size")
+    for kind, line in (("ascii", "x" * 79), ("é", "é" * 79), ("astral", "x" * 77 + "😀")):
+        for size in sizes_mb:
+            path = os.path.join(folder, f"autosave-{kind}-{size}mb.txt")
+            content = line + "\n"
+            content = content * max(1, int(size * 1024 * 1024 / len(content.encode("utf-8"))))
+
+            calls = []
+            for i in range(rounds):
+                start = time.perf_counter()
+                store.update(path, text=content)
+                autosaver.submit(path)
+                calls.append(time.perf_counter() - start)
+            autosaver.flush_all(timeout=60)
+
+            start = time.perf_counter()
+            store.save_full(path, content)
+            sync = time.perf_counter() - start
+
+            calls.sort()
+            print(f"  {kind:>6} {size:>6} MB   queued p50 {calls[len(calls) // 2] * 1e6:7.1f} us   max {calls[-1] * 1e6:7.1f} us"
+                  f"   synchronous write {sync * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    # python documents.py [folder-on-the-disk-to-test]
+    target = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp(prefix="nebula-autosave-")
+    benchmark(target)
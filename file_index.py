@@ -0,0 +1,347 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Shown in the explorer, but never walked into
+IGNORED_DIRS = {
+    ".git", "node_modules", "venv", ".venv", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".tox", ".nox", ".next", ".nuxt", ".gradle",
+    ".codeflow",
+}
+
+
+def path_key(path):
+    return os.path.normcase(os.path.normpath(path))
+
+
+def contains(root, path):
+    key = path_key(path)
+    root = path_key(root)
+    return key == root or key.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class FileTreeIndex:
+    """
+    In-memory explorer tree for one project, built once with os.scandir.
+    Nodes are the same dicts the frontend renders ({name, path, type, children}),
+    and file operations patch them in place instead of re-walking the project.
+    Folders in IGNORED_DIRS or matched by the project's ignore rules are listed, never walked.
+    """
+
+    def __init__(self, root):
+        import ignore_rules  # it imports path_key from here
+
+        self.root = os.path.normpath(root)
+        self.ignore = ignore_rules.for_project(self.root)
+        self.lock = threading.RLock()
+        self.nodes = {}  # path_key -> node
+        self.tree = None
+
+    def build(self):
+        with self.lock:
+            self.nodes = {}
+            self.tree = self.scan(self.root)
+        return self.tree
+
+    def scan(self, path):
+        """Walk one folder (iteratively) and register every node under it"""
+        root_node = self.folder_node(path)
+        stack = [root_node]
+        while stack:
+            node = stack.pop()
+            if node.get("ignored"):
+                continue
+            try:
+                with os.scandir(node["path"]) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            child = self.folder_node(entry.path)
+                            # Don't follow directory symlinks - they can loop
+                            if not entry.is_symlink():
+                                stack.append(child)
+                        else:
+                            child = self.file_node(entry.path)
+                        node["children"].append(child)
+            except OSError:
+                pass
+        return root_node
+
+    def skipped(self, path):
+        """Folder to list but not walk into - its parent is assumed not to be skipped"""
+        if path_key(path) == path_key(self.root):
+            return False
+        if os.path.basename(path) in IGNORED_DIRS:
+            return True
+        return self.ignore.ignored(os.path.relpath(path, self.root).replace(os.sep, "/"), True)
+
+    def folder_node(self, path):
+        name = os.path.basename(path) or path
+        node = {"name": name, "path": path, "type": "folder", "children": []}
+        if self.skipped(path):
+            node["ignored"] = True
+        self.nodes[path_key(path)] = node
+        return node
+
+    def file_node(self, path):
+        node = {"name": os.path.basename(path), "path": path, "type": "file"}
+        self.nodes[path_key(path)] = node
+        return node
+
+    def owns(self, path):
+        return contains(self.root, path)
+
+    # ================= QUERIES =================
+    def subtree(self, path):
+        """Node for path, building the tree on first use. Inside a skipped folder: just that one level."""
+        with self.lock:
+            if self.tree is None:
+                self.build()
+            node = self.nodes.get(path_key(path))
+            if (node is None or node.get("ignored")) and self.owns(path):
+                node = self.shallow(path)
+            return node
+
+    def shallow(self, path):
+        """One level of a folder the tree doesn't walk - not registered, subfolders stay unwalked"""
+        if not os.path.isdir(path):
+            return None
+        node = {"name": os.path.basename(path) or path, "path": path, "type": "folder", "children": [], "ignored": True}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        node["children"].append({"name": entry.name, "path": entry.path, "type": "folder",
+                                                 "children": [], "ignored": True})
+                    else:
+                        node["children"].append({"name": entry.name, "path": entry.path, "type": "file"})
+        except OSError:
+            pass
+        return node
+
+    # ================= IN-PLACE UPDATES =================
+    def add(self, path):
+        with self.lock:
+            parent = self.nodes.get(path_key(os.path.dirname(path)))
+            if parent is None or parent.get("ignored"):
+                return
+            if path_key(path) in self.nodes:
+                self.remove(path)
+            if os.path.isdir(path):
+                node = self.scan(path)
+            elif os.path.exists(path):
+                node = self.file_node(path)
+            else:
+                return
+            parent["children"].append(node)
+
+    def remove(self, path):
+        with self.lock:
+            node = self.nodes.get(path_key(path))
+            if node is None:
+                return
+            self.forget(node)
+            parent = self.nodes.get(path_key(os.path.dirname(path)))
+            if parent is not None:
+                parent["children"] = [c for c in parent["children"] if c is not node]
+
+    def forget(self, node):
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            self.nodes.pop(path_key(current["path"]), None)
+            stack.extend(current.get("children", []))
+
+    def move(self, old_path, new_path):
+        with self.lock:
+            node = self.nodes.get(path_key(old_path))
+            new_parent = self.nodes.get(path_key(os.path.dirname(new_path)))
+            if node is None or new_parent is None or new_parent.get("ignored"):
+                self.remove(old_path)
+                self.add(new_path)
+                return
+
+            old_parent = self.nodes.get(path_key(os.path.dirname(old_path)))
+            if old_parent is not None:
+                old_parent["children"] = [c for c in old_parent["children"] if c is not node]
+            self.forget(node)
+
+            # Re-key the moved subtree - no disk access needed
+            node["name"] = os.path.basename(new_path)
+            if node["type"] == "folder":
+                node.pop("ignored", None)
+                if self.skipped(new_path):
+                    node["ignored"] = True
+                    node["children"] = []
+            stack = [(node, new_path)]
+            while stack:
+                current, path = stack.pop()
+                current["path"] = path
+                self.nodes[path_key(path)] = current
+                for child in current.get("children", []):
+                    stack.append((child, os.path.join(path, child["name"])))
+
+            if path_key(new_path) in self.nodes and self.nodes[path_key(new_path)] is not node:
+                self.remove(new_path)
+                self.nodes[path_key(new_path)] = node
+            new_parent["children"].append(node)
+
+    def refresh(self, path):
+        """Re-scan one path after something outside the IDE touched it"""
+        with self.lock:
+            if path_key(path) == path_key(self.root):
+                return self.build()
+            self.remove(path)
+            self.add(path)
+            return self.nodes.get(path_key(path))
+
+
+# ================= REGISTRY =================
+_indexes = {}
+_registry_lock = threading.Lock()
+
+# Sorted single-level listings for list_directory, reused while the folder's mtime holds
+LISTING_CACHE_SIZE = 64
+_listings = OrderedDict()  # path_key -> (mtime_ns, entries)
+
+
+def get_tree(path, project_root=None):
+    """
+    Tree for path - served from the index that contains it, built on first use. A path inside
+    project_root gets the project's own index (then its subtree), never a second overlapping one.
+    """
+    root = project_root if project_root and contains(project_root, path) else path
+    with _registry_lock:
+        index = next((i for i in _indexes.values() if i.owns(path)), None)
+        if index is None:
+            # The new tree covers these - keeping them would patch the same folders twice
+            for key in [key for key, other in _indexes.items() if contains(root, other.root)]:
+                del _indexes[key]
+            index = _indexes[path_key(root)] = FileTreeIndex(root)
+    return index.subtree(path)
+
+
+def rules_changed():
+    """A .gitignore changed - drop the trees, the next get_tree builds them with the new rules"""
+    with _registry_lock:
+        _indexes.clear()
+
+
+def _each_index(path):
+    with _registry_lock:
+        _listings.pop(path_key(os.path.dirname(path)), None)
+        return [index for index in _indexes.values() if index.owns(path)]
+
+
+def added(path):
+    for index in _each_index(path):
+        index.add(path)
+
+
+def removed(path):
+    for index in _each_index(path):
+        index.remove(path)
+
+
+def moved(old_path, new_path):
+    with _registry_lock:
+        _listings.pop(path_key(os.path.dirname(old_path)), None)
+    for index in set(_each_index(old_path)) | set(_each_index(new_path)):
+        if index.owns(old_path) and index.owns(new_path):
+            index.move(old_path, new_path)
+        elif index.owns(old_path):
+            index.remove(old_path)
+        else:
+            index.add(new_path)
+
+
+def modified(path):
+    """File content changed - only the cached listing (size/mtime) is stale"""
+    with _registry_lock:
+        _listings.pop(path_key(os.path.dirname(path)), None)
+
+
+def refreshed(path):
+    for index in _each_index(path):
+        index.refresh(path)
+
+
+# ================= PAGED LISTING =================
+MAX_PAGE = 5000  # biggest page list_directory hands out, whatever the caller asks for
+
+
+def read_listing(path):
+    """One scandir pass over a single folder - folders first, then files, by name"""
+    key = path_key(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _registry_lock:
+        cached = _listings.get(key)
+        if cached is not None and cached[0] == mtime:
+            _listings.move_to_end(key)
+            return cached[1]
+
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                try:
+                    st = entry.stat()
+                except OSError:
+                    # Dangling symlink - still list it
+                    st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            entries.append((not is_dir, entry.name.lower(), entry.name, entry.path, st.st_size, st.st_mtime))
+    entries.sort()
+
+    with _registry_lock:
+        _listings[key] = (mtime, entries)
+        while len(_listings) > LISTING_CACHE_SIZE:
+            _listings.popitem(last=False)
+    return entries
+
+
+def listing_node(name, path, is_dir, size, mtime):
+    node = {"name": name, "path": path, "type": "folder" if is_dir else "file", "size": size, "mtime": mtime}
+    if is_dir:
+        node["children"] = []
+        if name in IGNORED_DIRS:
+            node["ignored"] = True
+        # Known only if the folder was listed already - otherwise None, settled when it's expanded
+        # (a scandir per child folder here would double the cost of every page)
+        with _registry_lock:
+            cached = _listings.get(path_key(path))
+        node["has_children"] = bool(cached[1]) if cached is not None else None
+    else:
+        node["has_children"] = False
+    return node
+
+
+def describe(path):
+    """Explorer node for one path, same shape as list_directory children. None if it is gone."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return listing_node(os.path.basename(path), path, os.path.isdir(path), st.st_size, st.st_mtime)
+
+
+def list_directory(path, cursor=0, page_size=200):
+    """Direct children of path, page_size at a time. next_cursor is None on the last page."""
+    entries = read_listing(path)
+    cursor = max(0, int(cursor))
+    # 0 would hand back the same cursor forever, a negative size would slice entries off the end
+    page_size = max(1, min(int(page_size), MAX_PAGE))
+    page = entries[cursor:cursor + page_size]
+
+    children = [listing_node(name, child_path, not is_file, size, mtime) for is_file, _, name, child_path, size, mtime in page]
+
+    end = cursor + len(page)
+    return {
+        "status": "ok",
+        "name": os.path.basename(os.path.normpath(path)) or path,
+        "path": path,
+        "children": children,
+        "next_cursor": end if end < len(entries) else None,
+        "total": len(entries),
+    }
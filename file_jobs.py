@@ -0,0 +1,411 @@
+import os
+import sys
+import time
+import uuid
+import errno
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from send2trash import send2trash
+
+import file_index
+from hidden import codeflow_folder
+from project_store import projects
+
+# ================= SETTINGS =================
+WORKERS = 4                      # files copied in parallel
+CHUNK = 8 * 1024 * 1024          # bytes per copy_file_range / sendfile call
+BUFFER = 1024 * 1024             # plain read/write fallback
+JOB_HISTORY = 50                 # finished jobs kept for get_file_job
+DELETE_WORKERS = 8               # per-path trash calls when the batch call fails
+TRASH_FOLDER = "trash"           # inside <project>/.codeflow - permanent deletes wait here to be freed
+
+# copy_file_range / sendfile refuse some file systems - fall back instead of failing
+FALLBACK_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM, errno.EBADF}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def project_root_of(path):
+    """Project containing path: the open one, else the nearest folder above it with a .codeflow"""
+    current = projects.current_path()
+    if current and file_index.contains(current, path) and file_index.path_key(current) != file_index.path_key(path):
+        return current
+    folder = os.path.dirname(path)
+    while True:
+        if os.path.isdir(os.path.join(folder, ".codeflow")):
+            return folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+def remove_path(path, ignore_errors=False):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=ignore_errors)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            if not ignore_errors:
+                raise
+
+
+def copy_file_data(src, dst, on_bytes, cancelled):
+    """
+    Copy one file's bytes: copy_file_range (in-kernel, reflink-capable) -> sendfile -> read/write.
+    on_bytes(n) is called as data lands, cancelled() is checked between chunks.
+    """
+    if hasattr(os, "copy_file_range"):
+        method = "copy_file_range"
+    elif sys.platform.startswith("linux"):
+        method = "sendfile"
+    else:
+        method = "buffered"
+
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        while True:
+            if cancelled():
+                raise JobCancelled()
+            try:
+                if method == "copy_file_range":
+                    n = os.copy_file_range(infd, outfd, CHUNK)
+                elif method == "sendfile":
+                    n = os.sendfile(outfd, infd, None, CHUNK)
+                else:
+                    data = os.read(infd, BUFFER)
+                    n = len(data)
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(outfd, view):]
+            except OSError as e:
+                if method != "buffered" and e.errno in FALLBACK_ERRNOS:
+                    # Both fds keep their offsets, so the next method carries on where this one stopped
+                    method = "sendfile" if method == "copy_file_range" and sys.platform.startswith("linux") else "buffered"
+                    continue
+                raise
+            if n == 0:
+                break
+            on_bytes(n)
+    shutil.copystat(src, dst)
+
+
+class FileJob:
+    def __init__(self, kind, sources, destination):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind  # "copy" | "move"
+        self.sources = list(sources)
+        self.destination = destination
+        self.status = "queued"
+        self.total_bytes = 0
+        self.done_bytes = 0
+        self.total_files = 0
+        self.done_files = 0
+        self.results = []  # {"from", "to"} per finished top-level item
+        self.errors = []
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.finished = None
+
+    def add_bytes(self, n):
+        with self.lock:
+            self.done_bytes += n
+
+    def file_done(self):
+        with self.lock:
+            self.done_files += 1
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def snapshot(self):
+        with self.lock:
+            elapsed = (self.finished or time.time()) - self.started
+            return {
+                "status": "ok",
+                "job_id": self.id,
+                "kind": self.kind,
+                "state": self.status,
+                "total_bytes": self.total_bytes,
+                "done_bytes": self.done_bytes,
+                "total_files": self.total_files,
+                "done_files": self.done_files,
+                "percent": round(100 * self.done_bytes / self.total_bytes, 1) if self.total_bytes else (100.0 if self.finished else 0.0),
+                "bytes_per_sec": int(self.done_bytes / elapsed) if elapsed > 0 else 0,
+                "results": list(self.results),
+                "errors": list(self.errors),
+            }
+
+
+class FileOperations:
+    """
+    Copy/move engine behind cmd_paste / cmd_paste_copy.
+    Every call returns a job straight away; a job thread plans the work and a shared pool copies files.
+    Same-filesystem moves are a single rename.
+    """
+
+    def __init__(self, workers=WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="file-op")
+        self.delete_pool = ThreadPoolExecutor(max_workers=DELETE_WORKERS, thread_name_prefix="file-delete")
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.swept = set()  # trash folders already emptied of what an earlier run left behind
+
+    # ================= JOBS =================
+    def start(self, kind, sources, destination):
+        job = FileJob(kind, sources, destination)
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.finished]
+            for old in finished[:max(0, len(finished) - JOB_HISTORY)]:
+                del self.jobs[old.id]
+        threading.Thread(target=self.run, args=(job,), daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def run(self, job):
+        job.status = "running"
+        try:
+            items = self.plan(job)
+            for src, target, files, dirs in items:
+                if job.cancelled():
+                    raise JobCancelled()
+                if files is None:
+                    # Renamed in place - nothing to copy
+                    job.results.append({"from": src, "to": target})
+                    continue
+                self.copy_item(job, src, target, files, dirs)
+                if job.kind == "move":
+                    if os.path.isdir(src) and not os.path.islink(src):
+                        shutil.rmtree(src)
+                    else:
+                        os.remove(src)
+                    file_index.moved(src, target)
+                else:
+                    file_index.added(target)
+                job.results.append({"from": src, "to": target})
+            job.status = "done" if not job.errors else "error"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.errors.append(str(e))
+            job.status = "error"
+        finally:
+            job.finished = time.time()
+            print(f"📦 {job.kind} job {job.id} {job.status}: {job.done_files} file(s), {job.done_bytes / (1024 * 1024):.1f} MB")
+
+    # ================= PLANNING =================
+    def target_for(self, job, src):
+        name = os.path.basename(os.path.normpath(src))
+        target = os.path.join(job.destination, name)
+        if job.kind == "copy" and os.path.exists(target):
+            # Same naming as before: name_copy1.ext, name_copy2.ext ...
+            base, ext = os.path.splitext(name)
+            i = 1
+            while os.path.exists(os.path.join(job.destination, f"{base}_copy{i}{ext}")):
+                i += 1
+            target = os.path.join(job.destination, f"{base}_copy{i}{ext}")
+        return target
+
+    def plan(self, job):
+        """(src, target, files, dirs) per source. files is None when a rename already finished it."""
+        items = []
+        for src in job.sources:
+            if not os.path.lexists(src):
+                continue
+            target = self.target_for(job, src)
+            src_norm = os.path.normcase(os.path.abspath(src))
+            target_norm = os.path.normcase(os.path.abspath(target))
+            if target_norm == src_norm:
+                continue
+            if target_norm.startswith(src_norm + os.sep):
+                job.errors.append(f"Cannot put {src} inside itself")
+                continue
+
+            if job.kind == "move":
+                if os.path.lexists(target):
+                    job.errors.append(f"Already exists: {target}")
+                    continue
+                try:
+                    # Same file system - one rename, no data copied
+                    os.rename(src, target)
+                    file_index.moved(src, target)
+                    items.append((src, target, None, None))
+                    continue
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        job.errors.append(f"Cannot move {src}: {e}")
+                        continue
+
+            files, dirs = self.walk(src, target)
+            with job.lock:
+                job.total_files += len(files)
+                job.total_bytes += sum(size for _, _, size in files if size)
+            items.append((src, target, files, dirs))
+        return items
+
+    def walk(self, src, target):
+        """
+        Every file (src, dst, size) and folder (src, dst) to create, one stat per entry.
+        Symlinks inside a folder are recreated as links (size None) rather than followed.
+        """
+        if not os.path.isdir(src):
+            return [(src, target, os.path.getsize(src))], []
+        files, dirs = [], [(src, target)]
+        stack = [(src, target)]
+        while stack:
+            folder, out = stack.pop()
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    dst = os.path.join(out, entry.name)
+                    if entry.is_symlink():
+                        files.append((entry.path, dst, None))
+                    elif entry.is_dir():
+                        dirs.append((entry.path, dst))
+                        stack.append((entry.path, dst))
+                    else:
+                        files.append((entry.path, dst, entry.stat().st_size))
+        return files, dirs
+
+    # ================= COPY =================
+    def copy_item(self, job, src, target, files, dirs):
+        for _, out in dirs:
+            os.makedirs(out, exist_ok=True)
+
+        def copy_one(item):
+            path, dst, size = item
+            try:
+                if size is None:
+                    os.symlink(os.readlink(path), dst)
+                else:
+                    copy_file_data(path, dst, job.add_bytes, job.cancelled)
+                job.file_done()
+            except BaseException:
+                try:
+                    os.remove(dst)
+                except OSError:
+                    pass
+                raise
+
+        futures = [self.pool.submit(copy_one, item) for item in files]
+        wait(futures)
+        failures = [f.exception() for f in futures if f.exception() is not None]
+
+        if job.cancelled() or failures:
+            # Half-copied item - take it away again, the source is untouched
+            if os.path.isdir(target) and not os.path.islink(target):
+                shutil.rmtree(target, ignore_errors=True)
+            elif os.path.lexists(target):
+                os.remove(target)
+            if job.cancelled():
+                raise JobCancelled()
+            job.errors.extend(f"{src}: {e}" for e in failures[:20])
+            raise RuntimeError(f"{len(failures)} file(s) failed while copying {src}")
+
+        for folder, out in reversed(dirs):
+            shutil.copystat(folder, out)
+
+    # ================= DELETE =================
+    def delete(self, paths, permanent=False):
+        """
+        Delete many paths and report per path instead of stopping at the first failure.
+        Trash: one send2trash call for the whole batch (one shell transaction on Windows),
+        per-path calls in the pool only if the batch call fails.
+        Permanent: rename into the project's .codeflow/trash (instant, never shown or indexed)
+        and rmtree it in the background.
+        """
+        results = OrderedDict()
+        pending = []
+        for path in paths:
+            path = os.path.normpath(path)
+            results[path] = None  # keeps the caller's order
+            if os.path.lexists(path):
+                pending.append(path)
+            else:
+                results[path] = {"path": path, "status": "error", "message": f"Path not found: {path}"}
+
+        if permanent:
+            for path in pending:
+                results[path] = self.purge(path)
+        elif pending:
+            try:
+                send2trash(pending)
+                for path in pending:
+                    results[path] = {"path": path, "status": "ok"}
+            except Exception:
+                futures = {path: self.delete_pool.submit(self.trash_one, path) for path in pending}
+                for path, future in futures.items():
+                    results[path] = future.result()
+
+        for result in results.values():
+            if result["status"] == "ok":
+                file_index.removed(result["path"])
+        return list(results.values())
+
+    def trash_one(self, path):
+        if not os.path.lexists(path):
+            # Already went with the part of the batch that succeeded
+            return {"path": path, "status": "ok"}
+        try:
+            send2trash(path)
+            return {"path": path, "status": "ok"}
+        except Exception as e:
+            return {"path": path, "status": "error", "message": f"Cannot delete {path}: {e}"}
+
+    def purge(self, path):
+        """
+        Permanent delete - gone from the folder right away, disk space freed in the background.
+        Staged in .codeflow/trash, which the explorer, watcher and indexes never look into; a path
+        outside any project, or on another file system than its .codeflow, is deleted in place.
+        """
+        root = project_root_of(path)
+        tomb = None
+        if root is not None and not file_index.contains(os.path.join(root, ".codeflow"), path):
+            trash = os.path.join(codeflow_folder(root), TRASH_FOLDER)
+            tomb = os.path.join(trash, f"{os.path.basename(path)}-{uuid.uuid4().hex[:8]}")
+            try:
+                os.makedirs(trash, exist_ok=True)
+                os.rename(path, tomb)
+            except OSError:
+                tomb = None
+
+        if tomb is None:
+            try:
+                remove_path(path)
+            except OSError as e:
+                return {"path": path, "status": "error", "message": f"Cannot delete {path}: {e}"}
+            return {"path": path, "status": "ok"}
+
+        # Whatever an earlier run didn't get to finish goes too
+        leftovers = []
+        with self.lock:
+            if trash not in self.swept:
+                self.swept.add(trash)
+                leftovers = [os.path.join(trash, name) for name in os.listdir(trash) if name != os.path.basename(tomb)]
+
+        def remove():
+            for item in [tomb] + leftovers:
+                remove_path(item, ignore_errors=True)
+
+        threading.Thread(target=remove, daemon=True).start()
+        return {"path": path, "status": "ok"}
+
+
+file_ops = FileOperations()
@@ -0,0 +1,485 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from collections import OrderedDict
+
+import file_index
+from file_index import IGNORED_DIRS
+
+# ================= SETTINGS =================
+DEBOUNCE = 0.2        # quiet time before a burst is pushed
+MAX_LATENCY = 1.0     # push anyway if a burst keeps going
+POLL_INTERVAL = 2.0   # polling fallback rescans this often
+MAX_DELTAS = 2000     # bigger batches become one "reset" - the UI just reloads the tree
+MANY_CHANGES = 50     # this many changes in one folder become one "refresh" of that folder
+
+
+def is_under(path, parent):
+    return path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def has_ancestor(path, group):
+    parent = os.path.dirname(path)
+    while parent != path:
+        if parent in group:
+            return True
+        path, parent = parent, os.path.dirname(parent)
+    return False
+
+
+class DeltaBuffer:
+    """
+    Coalesces raw events into one pending change per path.
+    add+remove cancels out, remove+add becomes modify, a rename of a fresh add is just an add.
+    Anything under a removed or freshly added folder is dropped at flush time.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.changes = OrderedDict()  # path -> "add" | "remove" | "modify" | "rename"
+        self.sources = {}             # rename target -> original path
+        self.reset = False
+        self.first_event = None
+        self.last_event = None
+
+    def touch(self):
+        now = time.monotonic()
+        self.last_event = now
+        if self.first_event is None:
+            self.first_event = now
+
+    def record(self, kind, path, old_path=None):
+        with self.lock:
+            self.touch()
+            if kind == "add":
+                self.add(path)
+            elif kind == "remove":
+                self.remove(path)
+            elif kind == "modify":
+                if path not in self.changes:
+                    self.changes[path] = "modify"
+            elif kind == "rename":
+                self.rename(old_path, path)
+
+    def add(self, path):
+        if self.changes.get(path) == "remove":
+            self.changes[path] = "modify"
+        elif path not in self.changes:
+            self.changes[path] = "add"
+
+    def remove(self, path):
+        prev = self.changes.get(path)
+        if prev == "add":
+            del self.changes[path]
+        elif prev == "rename":
+            del self.changes[path]
+            self.changes[self.sources.pop(path)] = "remove"
+        else:
+            self.changes[path] = "remove"
+
+    def rename(self, old_path, new_path):
+        prev = self.changes.pop(old_path, None)
+        # Pending changes inside a renamed folder move with it
+        for child in [p for p in self.changes if is_under(p, old_path)]:
+            moved = new_path + child[len(old_path):]
+            self.changes[moved] = self.changes.pop(child)
+            if self.changes[moved] == "rename":
+                self.sources[moved] = self.sources.pop(child)
+
+        if prev == "add":
+            self.add(new_path)
+        elif prev == "rename":
+            self.sources[new_path] = self.sources.pop(old_path)
+            self.changes[new_path] = "rename"
+        else:
+            self.sources[new_path] = old_path
+            self.changes[new_path] = "rename"
+
+    def overflow(self):
+        with self.lock:
+            self.touch()
+            self.reset = True
+
+    def due(self, debounce):
+        with self.lock:
+            if self.first_event is None:
+                return False
+            now = time.monotonic()
+            return now - self.last_event >= debounce or now - self.first_event >= MAX_LATENCY
+
+    def take(self):
+        with self.lock:
+            changes, sources, reset = self.changes, self.sources, self.reset
+            self.changes, self.sources, self.reset = OrderedDict(), {}, False
+            self.first_event = self.last_event = None
+        return changes, sources, reset
+
+
+# ================= INOTIFY (LINUX) =================
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """One inotify watch per folder (ignored folders skipped), rename pairs matched by cookie"""
+
+    def __init__(self, root, buffer):
+        self.root = root
+        self.buffer = buffer
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}        # wd -> folder path
+        self.pending_moves = {}  # cookie -> (path, is_dir)
+        try:
+            self.watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def watch_tree(self, path):
+        stack = [path]
+        while stack:
+            folder = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    # Out of inotify watches - caller falls back to polling
+                    raise OSError(err, "inotify watch limit reached")
+                continue
+            self.paths[wd] = folder
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False) and entry.name not in IGNORED_DIRS:
+                            stack.append(entry.path)
+            except OSError:
+                pass
+
+    def unwatch_tree(self, path):
+        for wd, folder in list(self.paths.items()):
+            if folder == path or is_under(folder, path):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                self.paths.pop(wd, None)
+
+    def rekey(self, old_path, new_path):
+        for wd, folder in self.paths.items():
+            if folder == old_path or is_under(folder, old_path):
+                self.paths[wd] = new_path + folder[len(old_path):]
+
+    def poll(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            self.resolve_moves()
+            return
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            self.handle(wd, mask, cookie, os.fsdecode(name))
+
+        # Moves out of the project never get a MOVED_TO - settle them once the queue is drained
+        if not select.select([self.fd], [], [], 0)[0]:
+            self.resolve_moves()
+
+    def handle(self, wd, mask, cookie, name):
+        if mask & IN_Q_OVERFLOW:
+            self.buffer.overflow()
+            return
+        if mask & IN_IGNORED:
+            self.paths.pop(wd, None)
+            return
+        folder = self.paths.get(wd)
+        if folder is None or not name:
+            return
+
+        path = os.path.join(folder, name)
+        is_dir = bool(mask & IN_ISDIR)
+
+        if mask & IN_CREATE:
+            if is_dir and name not in IGNORED_DIRS:
+                self.watch_tree(path)
+            self.buffer.record("add", path)
+        elif mask & IN_DELETE:
+            self.buffer.record("remove", path)
+        elif mask & IN_MOVED_FROM:
+            self.pending_moves[cookie] = (path, is_dir)
+        elif mask & IN_MOVED_TO:
+            source = self.pending_moves.pop(cookie, None)
+            if source is None:
+                if is_dir and name not in IGNORED_DIRS:
+                    self.watch_tree(path)
+                self.buffer.record("add", path)
+            else:
+                if is_dir:
+                    self.rekey(source[0], path)
+                self.buffer.record("rename", path, source[0])
+        elif mask & (IN_MODIFY | IN_CLOSE_WRITE) and not is_dir:
+            self.buffer.record("modify", path)
+
+    def resolve_moves(self):
+        for path, is_dir in self.pending_moves.values():
+            if is_dir:
+                self.unwatch_tree(path)
+            self.buffer.record("remove", path)
+        self.pending_moves.clear()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# ================= POLLING FALLBACK =================
+class PollingBackend:
+    """Rescans the project every POLL_INTERVAL and diffs (mtime, size, inode) snapshots"""
+
+    def __init__(self, root, buffer, interval=POLL_INTERVAL):
+        self.root = root
+        self.buffer = buffer
+        self.interval = interval
+        self.snapshot = self.scan()
+        self.next_scan = time.monotonic() + interval
+
+    def scan(self):
+        result = {}
+        stack = [self.root]
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        ino = st.st_ino or os.stat(entry.path, follow_symlinks=False).st_ino
+                        result[entry.path] = (is_dir, st.st_size, st.st_mtime_ns, ino)
+                        if is_dir and entry.name not in IGNORED_DIRS:
+                            stack.append(entry.path)
+            except OSError:
+                pass
+        return result
+
+    def poll(self, timeout):
+        wait = self.next_scan - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            return
+        self.next_scan = time.monotonic() + self.interval
+
+        old, new = self.snapshot, self.scan()
+        self.snapshot = new
+
+        removed = {p for p in old if p not in new}
+        added = sorted(p for p in new if p not in old)
+
+        # Same inode on both sides = rename. Children of a renamed folder ride along with it.
+        by_inode = {(old[p][0], old[p][3]): p for p in removed if old[p][3]}
+        renamed = []
+        implied = set()
+        for path in added:
+            source = by_inode.get((new[path][0], new[path][3]))
+            if source is None or source not in removed:
+                continue
+            removed.discard(source)
+            if any(is_under(path, n) and source == s + path[len(n):] for s, n in renamed):
+                implied.add(path)
+            else:
+                renamed.append((source, path))
+        moved_to = {n for _, n in renamed}
+
+        for source, path in renamed:
+            self.buffer.record("rename", path, source)
+        for path in sorted(removed):
+            self.buffer.record("remove", path)
+        for path in added:
+            if path not in implied and path not in moved_to:
+                self.buffer.record("add", path)
+        for path, (is_dir, size, mtime, _) in new.items():
+            prev = old.get(path)
+            if prev is not None and not is_dir and (prev[1] != size or prev[2] != mtime):
+                self.buffer.record("modify", path)
+
+    def close(self):
+        pass
+
+
+# ================= WATCHER =================
+class FileWatcher:
+    """
+    Watches one project folder on a background thread and calls on_deltas(list) with
+    coalesced add/remove/rename/modify deltas once a burst of events goes quiet.
+    The shared file_index is kept in sync before the UI hears about it.
+    """
+
+    def __init__(self, root, on_deltas, debounce=DEBOUNCE):
+        self.root = os.path.normpath(root)
+        self.on_deltas = on_deltas
+        self.debounce = debounce
+        self.buffer = DeltaBuffer()
+        self.backend = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend(self.root, self.buffer)
+            except (OSError, AttributeError) as e:
+                print(f"⚠️ inotify unavailable ({e}), polling instead")
+        if self.backend is None:
+            self.backend = PollingBackend(self.root, self.buffer)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                try:
+                    self.backend.poll(self.debounce / 2)
+                except OSError as e:
+                    if e.errno != errno.ENOSPC or isinstance(self.backend, PollingBackend):
+                        raise
+                    self.fall_back(e)
+                if self.buffer.due(self.debounce):
+                    self.flush()
+        except Exception as e:
+            print(f"❌ File watcher stopped: {e}")
+        finally:
+            self.backend.close()
+
+    def fall_back(self, error):
+        """A new folder ran out of inotify watches - poll from now on, and have the UI reload since events were lost"""
+        print(f"⚠️ inotify unavailable ({error}), polling instead")
+        self.backend.close()
+        self.backend = PollingBackend(self.root, self.buffer)
+        self.buffer.overflow()
+
+    def flush(self):
+        changes, sources, reset = self.buffer.take()
+
+        removed = {p for p, kind in changes.items() if kind == "remove"}
+        added = {p for p, kind in changes.items() if kind in ("add", "rename")}
+        pending = []
+        for path, kind in changes.items():
+            if has_ancestor(path, removed):
+                if kind == "rename":
+                    # Moved into a folder that is gone by now - only the source matters
+                    pending.append(("remove", sources[path]))
+                continue
+            # A new folder is listed lazily - its contents need no deltas of their own
+            if kind in ("add", "modify") and has_ancestor(path, added):
+                continue
+            pending.append((kind, path))
+
+        # One folder with lots of changes (checkout, npm install, a burst split by MAX_LATENCY)
+        # is cheaper to re-list than to patch entry by entry
+        per_folder = {}
+        for kind, path in pending:
+            if kind != "rename":
+                per_folder[os.path.dirname(path)] = per_folder.get(os.path.dirname(path), 0) + 1
+        busy = {folder for folder, count in per_folder.items() if count >= MANY_CHANGES}
+        if busy:
+            pending = [(k, p) for k, p in pending if k == "rename" or os.path.dirname(p) not in busy]
+            pending += [("refresh", folder) for folder in busy if not has_ancestor(folder, busy)]
+
+        if reset or len(pending) > MAX_DELTAS:
+            file_index.refreshed(self.root)
+            self.emit([{"type": "reset", "path": self.root}])
+            return
+
+        deltas = []
+        for kind, path in pending:
+            if kind == "add":
+                node = file_index.describe(path)
+                if node is None:
+                    continue
+                file_index.added(path)
+                deltas.append({"type": "add", "path": path, "node": node})
+            elif kind == "remove":
+                file_index.removed(path)
+                deltas.append({"type": "remove", "path": path})
+            elif kind == "rename":
+                file_index.moved(sources[path], path)
+                deltas.append({"type": "rename", "old_path": sources[path], "path": path, "node": file_index.describe(path)})
+            elif kind == "modify":
+                node = file_index.describe(path)
+                if node is None:
+                    continue
+                file_index.modified(path)
+                deltas.append({"type": "modify", "path": path, "size": node["size"], "mtime": node["mtime"]})
+            elif kind == "refresh":
+                file_index.refreshed(path)
+                deltas.append({"type": "refresh", "path": path})
+        self.emit(deltas)
+
+    def emit(self, deltas):
+        if not deltas:
+            return
+        try:
+            self.on_deltas(deltas)
+        except Exception as e:
+            print(f"⚠️ Could not push file deltas: {e}")
+
+
+# ================= REGISTRY =================
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def watch(root, on_deltas):
+    """Watch root (only one project is open at a time - switching projects stops the old watcher)"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            if file_index.path_key(_watcher.root) == file_index.path_key(root):
+                _watcher.on_deltas = on_deltas
+                return _watcher
+            _watcher.stop()
+        _watcher = FileWatcher(root, on_deltas)
+        _watcher.start()
+        return _watcher
+
+
+def stop():
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None
@@ -2,7 +2,7 @@ import os
 import ctypes
 import json
 
-def create_project_structure(project_path):
+def codeflow_folder(project_path):
     # 1. Hidden folder ka rasta (path)
     hidden_folder = os.path.join(project_path, ".codeflow")
     
@@ -11,8 +11,15 @@ def create_project_structure(project_path):
         os.makedirs(hidden_folder)
         
         # 3. Windows ka JUGAD: Isay hidden attribute set karo
-        # 0x02 ka matlab hota hai 'Hidden'
-        ctypes.windll.kernel32.SetFileAttributesW(hidden_folder, 0x02)
+        # 0x02 ka matlab hota hai 'Hidden' (Linux/macOS pe dot hi kaafi hai)
+        if os.name == "nt":
+            ctypes.windll.kernel32.SetFileAttributesW(hidden_folder, 0x02)
+
+    return hidden_folder
+
+
+def create_project_structure(project_path):
+    hidden_folder = codeflow_folder(project_path)
         
     # 4. Settings file banao uske andar
     settings = {"theme": "dark", "last_opened": "main.py"}
@@ -29,4 +36,4 @@ def get_terminal_path():
 
 if __name__ == "__main__":
     r = get_terminal_path()
-    print(r)
\ No newline at end of file
+    print(r)
\ No newline at end of file
@@ -1,12 +1,22 @@
 import webview
 import customtkinter as ctk
 from tkinter import filedialog
-import os,json
+import os,json,re
 from datetime import datetime
 from model import model
 import tkinter as tk
 import shutil
 from send2trash import send2trash
+import file_index
+import fs_watcher
+import search_index
+import ignore_rules
+import quick_open
+import file_window
+import documents
+from file_jobs import file_ops
+from clipboard import clipboard
+from project_store import projects
 
 import os
 import sys
@@ -24,7 +34,8 @@ else:
 
 class webmovement():
     def __init__(self):
-        self.temp_cut_path = None
+        # Same clipboard object for every instance (see clipboard.py)
+        self.clipboard = clipboard
 
     def move_nextpage(self):
         webview.create_window('My Desktop App', 'web/index.html', frameless=True,easy_drag=False)
@@ -44,11 +55,8 @@ class webmovement():
 
         
     def send_data(self):
-        file = "storage/recent.json"
-        if os.path.exists(file):
-            with open(file,"r") as f:
-                data = json.load(f)
-                return data
+        # Served from memory - the store is loaded once per process
+        return projects.recent_projects()
     def browse_folder(self):
         root = ctk.CTk()
         root.withdraw()
@@ -90,79 +98,122 @@ class webmovement():
         return None
 
     def recentprojectsave(self, name, path, description):
-        file_path = "storage/recent.json"
-    
-        # 1. Naya data jo humne dalkna hai
-        new_entry = {
-            "name": name,
-            "path": path,
-            "description": description,
-            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-
-        # 2. Pehle purana data load karo (agar file hai)
-        if os.path.exists(file_path):
-            with open(file_path, "r") as f:
-                try:
-                    current_data = json.load(f) # Purani list utha li
-                except:
-                    current_data = [] # Agar file kharab ho toh khali list
-        else:
-            current_data = []
+        # SQLite (WAL) store, cached in memory - no more full rewrites of recent.json
+        projects.add_recent(name, path, description)
 
-        current_data = [item for item in current_data if item['path'] != path]
+    def set_project_path(self, project_path):
+        """Recent project opened again - it becomes the current project"""
+        projects.touch(project_path)
 
-        current_data.insert(0, new_entry)
+    # ------------------- PROJECT STATE -------------------
+    # per-project metadata: open files, cursor positions, index locations ...
+    def get_project_state(self, key=None, project_path=None):
+        return projects.get_meta(project_path or self.current_project_path(), key)
 
-        current_data = current_data[:10]
+    def set_project_state(self, key, value, project_path=None):
+        try:
+            projects.set_meta(project_path or self.current_project_path(), key, value)
+            return {"status": "ok"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
 
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    
-        with open(file_path, "w") as f:
-            json.dump(current_data, f, indent=4)
-    
     def send_model_response(self,prompt):
         response = model(prompt)
         return response
 
 
 
+    def current_project_path(self):
+        path = projects.current_path()
+        if path is None:
+            raise FileNotFoundError("No project opened yet")
+        return path
+
     def get_folder_structure(self, folderpath=None):
-        result = []
         if folderpath is None:
-            with open("storage/recent.json","r") as f:
-                folder = json.load(f)
-            access = folder[0]
-            folderpath = access["path"]
-
-        for item in os.listdir(folderpath):
-            item_path = os.path.join(folderpath, item)
-
-            if os.path.isdir(item_path):
-                sub_structure = self.get_folder_structure(item_path)
-                result.append({
-                    "name": item,
-                    "path": item_path,
-                    "type": "folder",
-                    "children": sub_structure.get("children", [])
-                })
-            else:
-                # File
-                result.append({
-                    "name": item,
-                    "path": item_path,
-                    "type": "file"
-                })
-        
-        main_name = os.path.basename(folderpath)
-        root = {
-        "name": main_name,
-        "path": folderpath,
-        "type": "folder",
-        "children": result
-    }
-        
-        return root
+            folderpath = self.current_project_path()
+
+        # Built once per project, then patched in place by the file operations below
+        return file_index.get_tree(folderpath, projects.current_path())
+
+    def list_directory(self, folderpath=None, cursor=0, page_size=200):
+        """One level of the explorer tree, a page at a time - folders expand on demand"""
+        try:
+            if folderpath is None:
+                folderpath = self.current_project_path()
+            return file_index.list_directory(folderpath, int(cursor or 0), int(page_size or 200))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def watch_project(self, folderpath=None):
+        """Start pushing add/remove/rename/modify deltas for the open project to the explorer"""
+        try:
+            if folderpath is None:
+                folderpath = self.current_project_path()
+            fs_watcher.watch(folderpath, self.push_fs_deltas)
+            search_index.get_index(folderpath)  # first (incremental) index pass starts in the background
+            quick_open.get_index(folderpath)
+            return {"status": "ok", "path": folderpath}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def push_fs_deltas(self, deltas):
+        rules_changed = ignore_rules.gitignore_changed(deltas)
+        if rules_changed:
+            file_index.rules_changed()
+        search_index.notify(deltas, rules_changed)
+        quick_open.notify(deltas, rules_changed)
+        if webview.windows:
+            webview.windows[0].evaluate_js(f"window.applyFsDeltas && window.applyFsDeltas({json.dumps(deltas)})")
+
+    # ------------------- SEARCH -------------------
+    def search_project(self, query, regex=False, case_sensitive=False, max_hits=None, search_id=None):
+        """
+        Project-wide text search over the trigram index in .codeflow.
+        Returns straight away - hits are pushed to window.onSearchResults(search_id, hits, done, info).
+        """
+        try:
+            if not query:
+                return {"status": "error", "message": "Nothing to search for"}
+            search_id = search_index.start_search(
+                self.current_project_path(), query, self.push_search_results,
+                regex=bool(regex), case_sensitive=bool(case_sensitive),
+                max_hits=int(max_hits or search_index.MAX_HITS), search_id=search_id,
+            )
+            return {"status": "ok", "search_id": search_id}
+        except re.error as e:
+            return {"status": "error", "message": f"Invalid regex: {e}"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def quick_open(self, query, limit=None, request_id=None):
+        """
+        Fuzzy "go to file". Best matches found within a few ms come back now; if there was more
+        to rank, the full list follows through window.onQuickOpenResults(request_id, results).
+        """
+        try:
+            return quick_open.quick_open(
+                self.current_project_path(), query, self.push_quick_open_results,
+                limit=int(limit or quick_open.RESULT_LIMIT), request_id=request_id,
+            )
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def push_quick_open_results(self, request_id, results):
+        if webview.windows:
+            webview.windows[0].evaluate_js(
+                f"window.onQuickOpenResults && window.onQuickOpenResults({json.dumps(request_id)}, {json.dumps(results)})"
+            )
+
+    def cancel_search(self, search_id):
+        return {"status": "ok", "cancelled": search_index.cancel_search(search_id)}
+
+    def push_search_results(self, search_id, hits, done, info):
+        if webview.windows:
+            webview.windows[0].evaluate_js(
+                f"window.onSearchResults && window.onSearchResults({json.dumps(search_id)}, {json.dumps(hits)}, "
+                f"{json.dumps(done)}, {json.dumps(info)})"
+            )
 
 
     def open_files_editor(self, file_path):
@@ -221,33 +272,75 @@ class webmovement():
             return r
         except Exception as e:
             print("war giya program",e)
+
+    # ------------------- LARGE FILES -------------------
+    def open_file_chunked(self, file_path, head_kb=256):
+        """Metadata + content. Big files come back as their first head_kb only, read-only and windowed."""
+        try:
+            # A queued autosave of this file has to land before we read it
+            documents.autosaver.flush(file_path)
+            result = file_window.open_chunked(file_path, int(head_kb or 256))
+            if not result["windowed"]:
+                # Base image for save_delta
+                result["doc_version"] = documents.store.open(file_path, result["content"])
+            return result
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def read_file_range(self, file_path, start, length):
+        try:
+            return file_window.get_window(file_path).read_range(int(start), int(length))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def read_file_lines(self, file_path, first_line, count):
+        try:
+            return file_window.get_window(file_path).read_lines(int(first_line), int(count))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def close_file_window(self, file_path):
+        file_window.close_window(file_path)
+        return {"status": "ok"}
+
+    def close_document(self, file_path):
+        documents.store.close(file_path)
+        return {"status": "ok"}
     
 
     def create_newFile(self,path,name):
         filePath = os.path.join(path,name)
         with open(filePath ,"w") as f:
             f.write("")
+        file_index.added(filePath)
         return {"status": "ok", "path": filePath}
     
     # ------------------- DELETE -------------------
-    def delete_file(self, paths):
-        from send2trash import send2trash
-
+    def delete_file(self, paths, permanent=False):
+        """
+        paths: string or list of paths
+        permanent: skip the trash - for regenerable folders like node_modules (instant in the UI)
+        """
         if isinstance(paths, str):
             paths = [paths]  # convert single path to list
 
-        deleted = []
-        for path in paths:
-            path = os.path.normpath(path)
-            if not os.path.exists(path):
-                return {"status": "error", "message": f"Path not found: {path}"}
-            try:
-                send2trash(path)
-                deleted.append(path)
-            except Exception as e:
-                return {"status": "error", "message": f"Cannot delete {path}: {str(e)}"}
-
-        return {"status": "ok", "deleted": deleted}
+        results = file_ops.delete(paths, bool(permanent))
+        deleted = [r["path"] for r in results if r["status"] == "ok"]
+        failed = [r for r in results if r["status"] != "ok"]
+
+        if not failed:
+            return {"status": "ok", "deleted": deleted, "results": results}
+
+        message = failed[0]["message"]
+        if len(failed) > 1:
+            message += f" (+{len(failed) - 1} more)"
+        return {
+            "status": "partial" if deleted else "error",
+            "message": message,
+            "deleted": deleted,
+            "failed": failed,
+            "results": results
+        }
 
 
     # ------------------- RENAME -------------------
@@ -272,6 +365,7 @@ class webmovement():
                 folder_dir = os.path.dirname(path)
                 new_path = os.path.join(folder_dir, new_name)
                 os.rename(path, new_path)
+                file_index.moved(path, new_path)
                 renamed.append({"old_path": path, "new_path": new_path})
             except Exception as e:
                 return {"status": "error", "message": f"Cannot rename {path}: {str(e)}"}
@@ -288,121 +382,61 @@ class webmovement():
         if isinstance(paths, str):
             paths = [paths]  # convert single path to list
 
-        valid_paths = []
-        for path in paths:
-            if os.path.exists(path):
-                valid_paths.append(path)
-            else:
-                return {"status": "error", "message": f"Path not found: {path}"}
-
-        self.temp_cut_path = valid_paths
-
-        # Save to JSON clipboard
-        os.makedirs("storage", exist_ok=True)
-        with open("storage/cut-file.json", "w") as f:
-            json.dump(valid_paths, f)
+        # In-memory, shared by every Api instance - written to disk only on shutdown
+        missing = clipboard.set("cut", paths)
+        if missing:
+            return {"status": "error", "message": f"Path not found: {missing[0]}"}
 
-        return {"status": "ok", "message": f"{len(valid_paths)} path(s) saved to cut clipboard"}
+        return {"status": "ok", "message": f"{len(paths)} path(s) saved to cut clipboard"}
 
     # ------------------- PASTE -------------------
     def cmd_paste(self, destination_folder):
-        clipboard_file = "storage/cut-file.json"
-
-        # Load from RAM or JSON
-        if not getattr(self, "temp_cut_path", None):
-            if os.path.exists(clipboard_file):
-                with open(clipboard_file, "r") as f:
-                    try:
-                        self.temp_cut_path = json.load(f)
-                    except:
-                        return {"status": "error", "message": "Cut clipboard corrupted"}
-
-        if not getattr(self, "temp_cut_path", None):
+        paths = clipboard.take("cut")
+        if not paths:
             return {"status": "error", "message": "Nothing to paste"}
 
-        moved_paths = []
-        for path in self.temp_cut_path:
-            if not os.path.exists(path):
-                continue
-            filename = os.path.basename(path)
-            final_path = os.path.join(destination_folder, filename)
-            shutil.move(path, final_path)
-            moved_paths.append({"from": path, "to": final_path})
-
-        # Clean up
-        self.temp_cut_path = None
-        if os.path.exists(clipboard_file):
-            os.remove(clipboard_file)
+        # Runs in the background - poll get_file_job(job_id) for progress
+        job = file_ops.start("move", paths, destination_folder)
 
-        return {"status": "ok", "moved": moved_paths}
+        return {"status": "ok", "job_id": job.id, "count": len(job.sources)}
 
     # ------------------- COPY -------------------
     def cmd_copy(self, paths):
         if isinstance(paths, str):
             paths = [paths]
 
-        valid_paths = []
-        for path in paths:
-            if os.path.exists(path):
-                valid_paths.append(path)
-            else:
-                return {"status": "error", "message": f"Path not found: {path}"}
-
-        self.temp_copy_path = valid_paths
+        missing = clipboard.set("copy", paths)
+        if missing:
+            return {"status": "error", "message": f"Path not found: {missing[0]}"}
 
-        # Save to JSON
-        os.makedirs("storage", exist_ok=True)
-        with open("storage/copy-file.json", "w") as f:
-            json.dump(valid_paths, f)
-
-        return {"status": "ok", "message": f"{len(valid_paths)} path(s) saved to copy clipboard"}
+        return {"status": "ok", "message": f"{len(paths)} path(s) saved to copy clipboard"}
 
     # ------------------- PASTE COPY -------------------
     def cmd_paste_copy(self, destination_folder):
-        clipboard_file = "storage/copy-file.json"
-
-        # Load from RAM or JSON
-        if not getattr(self, "temp_copy_path", None):
-            if os.path.exists(clipboard_file):
-                with open(clipboard_file, "r") as f:
-                    try:
-                        self.temp_copy_path = json.load(f)
-                    except:
-                        return {"status": "error", "message": "Copy clipboard corrupted"}
-
-        if not getattr(self, "temp_copy_path", None):
+        paths = clipboard.take("copy")
+        if not paths:
             return {"status": "error", "message": "Nothing to paste"}
 
-        copied_paths = []
-        for path in self.temp_copy_path:
-            if not os.path.exists(path):
-                continue
-
-            filename = os.path.basename(path)
-            final_path = os.path.join(destination_folder, filename)
+        # Runs in the background (name conflicts become name_copy1.ext ...)
+        job = file_ops.start("copy", paths, destination_folder)
 
-            # Handle name conflict
-            if os.path.exists(final_path):
-                base, ext = os.path.splitext(filename)
-                i = 1
-                while os.path.exists(os.path.join(destination_folder, f"{base}_copy{i}{ext}")):
-                    i += 1
-                final_path = os.path.join(destination_folder, f"{base}_copy{i}{ext}")
+        return {"status": "ok", "job_id": job.id, "count": len(job.sources)}
 
-            # Copy file or folder
-            if os.path.isfile(path):
-                shutil.copy2(path, final_path)
-            elif os.path.isdir(path):
-                shutil.copytree(path, final_path)
+    def save_clipboard(self):
+        clipboard.save()
+        return {"status": "ok", "message": "clipboard saved"}
 
-            copied_paths.append({"from": path, "to": final_path})
+    # ------------------- FILE JOBS -------------------
+    def get_file_job(self, job_id):
+        job = file_ops.get(job_id)
+        if job is None:
+            return {"status": "error", "message": f"Unknown job: {job_id}"}
+        return job.snapshot()
 
-        # Clean up
-        self.temp_copy_path = None
-        if os.path.exists(clipboard_file):
-            os.remove(clipboard_file)
-
-        return {"status": "ok", "copied": copied_paths}
+    def cancel_file_job(self, job_id):
+        if not file_ops.cancel(job_id):
+            return {"status": "error", "message": f"Unknown job: {job_id}"}
+        return {"status": "ok", "message": "cancelling"}
 
     def create_folder(self, parent_path, name):
         try:
@@ -419,6 +453,7 @@ class webmovement():
                 return {"status": "error", "message": "Folder already exists"}
 
             os.makedirs(full_path)
+            file_index.added(full_path)
 
             return {
                 "status": "ok",
@@ -437,20 +472,33 @@ class webmovement():
             return {"status": "fail", "message": "path not found"}
 
         try:
-            # ensure folder exists
-            folder = os.path.dirname(path)
-            if folder:
-                os.makedirs(folder, exist_ok=True)
-
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            # An explicit save wins over a queued autosave of older content
+            documents.autosaver.discard(path)
+            # temp file + fsync + rename, and the new base for save_delta
+            version = documents.store.save_full(path, content)
 
             return {
                 "status": "success",
                 "message": "file saved",
-                "path": path
+                "path": path,
+                "version": version
+            }
+
+        except Exception as e:
+            return {
+                "status": "fail",
+                "message": "cannot save file",
+                "error": str(e)
             }
 
+    # SAVE DELTA
+    # frontend sends Monaco changes since `version` - "resync" means send full content via save()
+    def save_delta(self, path, version, changes):
+        if not path:
+            return {"status": "fail", "message": "path not found"}
+        try:
+            documents.autosaver.discard(path)
+            return documents.store.save_delta(path, version, changes)
         except Exception as e:
             return {
                 "status": "fail",
@@ -469,15 +517,32 @@ class webmovement():
         return self.save_files(new_path, content)
 
     # AUTO SAVE
-    def auto_save(self, current_path, content):
+    # frontend sends Monaco changes since `version` (like save_delta) - content only when it has no
+    # version, or along with the changes as the fallback. Applied now, written off the API thread.
+    def auto_save(self, current_path, content=None, version=None, changes=None):
         if not current_path:
             return {"status": "skip", "message": "no path to autosave"}
 
-        return self.save_files(current_path, content)
+        try:
+            result = documents.store.update(current_path, version, changes, content)
+            if result["status"] != "queued":
+                # "resync" - send the full content next time
+                return result
+            error = documents.autosaver.submit(current_path)
+        except Exception as e:
+            return {"status": "fail", "message": "cannot autosave file", "error": str(e)}
+        if error:
+            return {"status": "fail", "message": "previous autosave failed", "error": error, "version": result["version"]}
+        return result
+
+    # window close - every queued autosave must be on disk first
+    def flush_all(self):
+        done = documents.autosaver.flush_all()
+        return {"status": "ok" if done else "fail", "message": "autosaves flushed" if done else "autosave flush timed out"}
     def sdd(self, ext):
         print(ext)
 # if __name__ == "__main__":
 #     a = webmovement()
 #     b = a.send_data()
 #     d = b[0]["path"]
-#     print(d)
\ No newline at end of file
+#     print(d)
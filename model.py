@@ -1,9 +1,14 @@
 
 
 
+from rate_limiter import limiter
+from token_counter import count_tokens
+
+
 def model(prompt):
     try:
-        chat_completion = client.chat.completions.create(
+        # RPM / TPM budget shared by every caller - waits only as long as needed, retries 429s
+        chat_completion = limiter.call(lambda: client.chat.completions.create(
             messages=[
                 {
                     "role": "user",
@@ -12,7 +17,7 @@ def model(prompt):
             ],
             model="llama-3.3-70b-versatile", # Best for Mark 1 logic
             temperature=0, # Strictness ke liye 0 zaroori hai
-        )
+        ), count_tokens(prompt))
         return chat_completion.choices[0].message.content
     except Exception as e:
         return f"Error: {e}"
@@ -69,4 +74,4 @@ def model(prompt):
 
 # response = model(prompt)
 # text = message.text_in_voice(response)
-# print(response)
\ No newline at end of file
+# print(response)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import ignore_rules
+from record_cache import text_digest
+
+# ================= SETTINGS =================
+WORKERS = 8              # files read + decoded in parallel
+READ_AHEAD = 64          # reads in flight ahead of the consumer - bounds memory on big projects
+MAX_FILE_KB = 500        # bigger files are skipped
+SNIFF_BYTES = 8192       # a NUL byte in here means binary, whatever the extension says
+
+TEXT_EXTENSIONS = {
+    '.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.cpp', '.c', '.h',
+    '.cs', '.php', '.rb', '.go', '.rs', '.swift', '.kt', '.scala',
+    '.html', '.css', '.scss', '.sass', '.less', '.xml', '.json',
+    '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
+    '.md', '.txt', '.rst', '.tex',
+    '.sh', '.bash', '.zsh', '.ps1', '.bat', '.cmd',
+    '.sql', '.r', '.m', '.f', '.f90', '.pl', '.lua'
+}
+
+
+def is_text_file(file_path):
+    """Check if file is likely a text file"""
+    _, ext = os.path.splitext(file_path)
+    return ext.lower() in TEXT_EXTENSIONS
+
+
+def read_file(full_path, max_bytes):
+    """
+    Runs in the pool: read, sniff, decode. Returns (content or None, skip reason, read s, decode s).
+    Never reads more than max_bytes + 1, even if the file grew after the size check.
+    """
+    started = time.perf_counter()
+    try:
+        with open(full_path, "rb") as f:
+            data = f.read(max_bytes + 1)
+    except OSError:
+        return None, "read error", time.perf_counter() - started, 0.0
+    read_done = time.perf_counter()
+    if len(data) > max_bytes:
+        return None, f"too large: {len(data) / 1024:.1f}KB", read_done - started, 0.0
+    if b"\0" in data[:SNIFF_BYTES]:
+        return None, "binary", read_done - started, 0.0
+    content = data.decode("utf-8", errors="ignore")
+    return content, None, read_done - started, time.perf_counter() - read_done
+
+
+class FileRecord(dict):
+    """A scan record whose 'content' is read on first use - cache hits never open the file otherwise"""
+
+    def __missing__(self, key):
+        if key != "content":
+            raise KeyError(key)
+        try:
+            with open(self["full_path"], "rb") as f:
+                content = f.read().decode("utf-8", errors="ignore")
+        except OSError:
+            content = ""
+        self["content"] = content
+        return content
+
+
+class ProjectScanner:
+    """
+    One pass over a project for the AI features (readme_smart, HOLD_MY_TEA_MOMENT).
+    scandir walk with the compiled ignore rules on this thread, reading + decoding in a pool;
+    scan() yields file records in walk order as soon as each is ready, never a full list.
+    skipped and timings are filled in as the scan goes.
+
+    derive(full_path, content) -> dict adds per-file fields (priority, tokens ...) in the pool.
+    With a RecordCache those fields are reused while the file is unchanged, and with
+    content=False an unchanged file costs one stat - its text is only read if record['content'] is used.
+    """
+
+    def __init__(self, root, max_kb=MAX_FILE_KB, text_only=True, workers=WORKERS, cache=None, derive=None, content=True):
+        self.root = os.path.normpath(root)
+        self.max_bytes = int(max_kb * 1024)
+        self.text_only = text_only
+        self.workers = workers
+        self.cache = cache
+        self.derive = derive
+        self.content = content
+        self.ignore = ignore_rules.for_project(self.root)
+        self.skipped = []   # "rel (reason)" strings, same shape readme_smart always reported
+        self.files = 0
+        self.bytes = 0
+        # walk: scandir + stat + filters (this thread), read / decode: summed over pool threads,
+        # wait: this thread blocked on a read that wasn't done yet
+        self.timings = {"walk": 0.0, "read": 0.0, "decode": 0.0, "derive": 0.0, "wait": 0.0, "total": 0.0}
+
+    def entries(self):
+        """(rel, display path, full path, stat) for every file worth reading; ignored folders are never entered"""
+        stack = [(self.root, "")]
+        while stack:
+            folder, prefix = stack.pop()
+            try:
+                with os.scandir(folder) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                rel = prefix + entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if rel != ".codeflow" and not self.ignore.ignored(rel, True):
+                            subdirs.append((entry.path, rel + "/"))
+                        continue
+                    if not entry.is_file():
+                        continue
+                    display = rel.replace("/", os.sep)
+                    if self.ignore.ignored(rel):
+                        self.skipped.append(display)
+                    elif self.text_only and not is_text_file(entry.name):
+                        self.skipped.append(display)
+                    else:
+                        st = entry.stat()
+                        if st.st_size > self.max_bytes:
+                            self.skipped.append(f"{display} (too large: {st.st_size / 1024:.1f}KB)")
+                        else:
+                            yield rel, display, entry.path, st
+                except OSError:
+                    self.skipped.append(f"{rel.replace('/', os.sep)} (read error)")
+            # Reversed so the stack pops folders in name order
+            stack.extend(reversed(subdirs))
+
+    def load(self, rel, full_path, row):
+        """Pool job: read + decode, then digest and derive unless the cache already knows this text"""
+        content, reason, read_s, decode_s = read_file(full_path, self.max_bytes)
+        digest, fields, derive_s = None, None, 0.0
+        if content is not None and row is None:
+            started = time.perf_counter()
+            if self.cache is not None:
+                digest = text_digest(content)
+                row = self.cache.lookup_digest(rel, digest)
+            if row is None and self.derive is not None:
+                fields = self.derive(full_path, content)
+            derive_s = time.perf_counter() - started
+        return content, reason, row, digest, fields, read_s, decode_s, derive_s
+
+    def scan(self):
+        """
+        Yield {'path', 'filename', 'full_path', 'content', 'size'} (+ derived fields, 'digest' and
+        'summaries' with a cache) per file - path is relative, os.sep-separated; size in KB.
+        Up to READ_AHEAD reads run ahead of whoever is consuming.
+        """
+        started = time.perf_counter()
+        entries = self.entries()
+        pending = deque()
+        seen = set()
+        walking = True
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="project-scan") as pool:
+            try:
+                while walking or pending:
+                    # Keep the pool fed before blocking on the oldest read
+                    step = time.perf_counter()
+                    while walking and len(pending) < READ_AHEAD:
+                        item = next(entries, None)
+                        if item is None:
+                            walking = False
+                            continue
+                        rel, _, full_path, st = item
+                        row = self.cache.lookup(rel, st.st_mtime_ns, st.st_size) if self.cache is not None else None
+                        if row is not None and not self.content:
+                            pending.append((item, row, None))
+                        else:
+                            pending.append((item, row, pool.submit(self.load, rel, full_path, row)))
+                    self.timings["walk"] += time.perf_counter() - step
+                    if not pending:
+                        break
+
+                    (rel, display, full_path, st), row, future = pending.popleft()
+                    record = FileRecord(path=display, filename=os.path.basename(full_path), full_path=full_path, size=st.st_size / 1024)
+                    if future is not None:
+                        step = time.perf_counter()
+                        content, reason, found, digest, fields, read_s, decode_s, derive_s = future.result()
+                        self.timings["wait"] += time.perf_counter() - step
+                        self.timings["read"] += read_s
+                        self.timings["decode"] += decode_s
+                        self.timings["derive"] += derive_s
+                        if content is None:
+                            self.skipped.append(f"{display} ({reason})")
+                            continue
+                        record["content"] = content
+                        if self.cache is not None and row is None:
+                            # Stat changed - keep what the text digest still vouches for, store the new stat
+                            if found is not None:
+                                digest, fields = found["digest"], found["fields"]
+                            row = self.cache.store(rel, st.st_mtime_ns, st.st_size, digest, fields or {})
+                        elif fields:
+                            record.update(fields)
+                    if row is not None:
+                        record.update(row["fields"])
+                        record["digest"] = row["digest"]
+                        record["summaries"] = row["summaries"]
+                    seen.add(rel)
+                    self.files += 1
+                    self.bytes += st.st_size
+                    yield record
+                if self.cache is not None:
+                    self.cache.prune(seen)
+            finally:
+                for _, _, future in pending:
+                    if future is not None:
+                        future.cancel()
+                if self.cache is not None:
+                    self.cache.flush()
+                self.timings["total"] = time.perf_counter() - started
+
+    def summary(self):
+        t = self.timings
+        text = (f"🔍 Scanned {self.files} files ({self.bytes / (1024 * 1024):.1f} MB), skipped {len(self.skipped)} "
+                f"in {t['total']:.2f}s - walk {t['walk']:.2f}s, read {t['read']:.2f}s, decode {t['decode']:.2f}s, "
+                f"derive {t['derive']:.2f}s (pool time), waiting on reads {t['wait']:.2f}s")
+        if self.cache is not None:
+            text += "\n" + self.cache.summary()
+        return text
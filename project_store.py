@@ -0,0 +1,133 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+# ================= SETTINGS =================
+STORAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage")
+DB_FILE = os.path.join(STORAGE_DIR, "projects.db")
+LEGACY_RECENT_FILE = os.path.join(STORAGE_DIR, "recent.json")
+MAX_RECENTS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recent (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS project_meta (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (path, key)
+);
+"""
+
+
+class ProjectStore:
+    """
+    Recent projects + per-project metadata (open files, cursors, index locations) in SQLite (WAL).
+    Everything is loaded once into memory; reads never touch disk, writes are one transaction each.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self.lock = threading.RLock()
+        self.conn = None
+        self.recents = []  # newest first, same dicts recent.json used to hold
+        self.meta = {}     # path -> {key: value}
+
+    def connect(self):
+        if self.conn is not None:
+            return
+        os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=10)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+        self.import_legacy()
+        self.reload()
+
+    def import_legacy(self):
+        """One-time move of storage/recent.json into the database"""
+        if self.conn.execute("SELECT 1 FROM recent LIMIT 1").fetchone() or not os.path.exists(LEGACY_RECENT_FILE):
+            return
+        try:
+            with open(LEGACY_RECENT_FILE, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.conn:
+            for entry in reversed(entries[:MAX_RECENTS]):
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO recent (path, name, description, time) VALUES (?, ?, ?, ?)",
+                    (entry["path"], entry.get("name", os.path.basename(entry["path"])), entry.get("description", ""), entry.get("time", "")),
+                )
+        print(f"📦 Imported {len(entries[:MAX_RECENTS])} recent project(s) from recent.json")
+
+    def reload(self):
+        rows = self.conn.execute("SELECT name, path, description, time FROM recent ORDER BY time DESC, rowid DESC").fetchall()
+        self.recents = [{"name": n, "path": p, "description": d, "time": t} for n, p, d, t in rows]
+        self.meta = {}
+        for path, key, value in self.conn.execute("SELECT path, key, value FROM project_meta"):
+            self.meta.setdefault(path, {})[key] = json.loads(value)
+
+    # ================= RECENTS =================
+    def recent_projects(self):
+        with self.lock:
+            self.connect()
+            return [dict(entry) for entry in self.recents]
+
+    def current_path(self, default=None):
+        """Most recently opened project - what recent.json[0]["path"] used to be"""
+        with self.lock:
+            self.connect()
+            return self.recents[0]["path"] if self.recents else default
+
+    def add_recent(self, name, path, description=""):
+        entry = {"name": name, "path": path, "description": description, "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        with self.lock:
+            self.connect()
+            dropped = [e["path"] for e in self.recents if e["path"] != path][MAX_RECENTS - 1:]
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO recent (path, name, description, time) VALUES (?, ?, ?, ?)",
+                    (path, name, description, entry["time"]),
+                )
+                self.conn.executemany("DELETE FROM recent WHERE path = ?", [(p,) for p in dropped])
+            self.recents = [entry] + [e for e in self.recents if e["path"] != path and e["path"] not in dropped]
+        return entry
+
+    def touch(self, path):
+        """Re-open a known project - moves it to the front, keeps its name and description"""
+        with self.lock:
+            self.connect()
+            known = next((e for e in self.recents if e["path"] == path), None)
+            if known is None:
+                return self.add_recent(os.path.basename(os.path.normpath(path)), path)
+            return self.add_recent(known["name"], path, known["description"])
+
+    # ================= PER-PROJECT METADATA =================
+    def get_meta(self, path, key=None, default=None):
+        with self.lock:
+            self.connect()
+            values = self.meta.get(path, {})
+            if key is None:
+                return dict(values)
+            return values.get(key, default)
+
+    def set_meta(self, path, key, value):
+        with self.lock:
+            self.connect()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO project_meta (path, key, value) VALUES (?, ?, ?)",
+                    (path, key, json.dumps(value)),
+                )
+            self.meta.setdefault(path, {})[key] = value
+
+
+projects = ProjectStore()
@@ -0,0 +1,378 @@
+import os
+import re
+import time
+import heapq
+import threading
+
+from file_index import path_key
+import ignore_rules
+
+# ================= SETTINGS =================
+RESULT_LIMIT = 50
+BUDGET_MS = 15           # a keystroke gets its first answer within this
+GROW_BYTES = 4096        # bitsets grow by this many bytes (32k paths) at a time
+COMPACT_DEAD = 0.25      # rebuild once this share of ids is removed paths
+
+# fzf-style scoring
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = 8       # first char, or after / _ - . space
+BONUS_CAMEL = 7          # fooBar -> B, foo2 -> 2
+BONUS_CONSECUTIVE = 4
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+BONUS_FILE_NAME = 24     # whole query matched inside the file name
+PENALTY_DEPTH = 2        # per folder level
+
+BOUNDARY_CHARS = frozenset("/_-. ")
+BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+# ================= SCORING =================
+def match_positions(lower, query, start=0):
+    """
+    Tightest subsequence match (fzf v1): a forward pass finds where the first match ends,
+    a backward pass from there pulls the start in. None if query isn't a subsequence.
+    """
+    pos = start - 1
+    for ch in query:
+        pos = lower.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    positions = [0] * len(query)
+    end = pos + 1
+    for i in range(len(query) - 1, -1, -1):
+        end = lower.rfind(query[i], start, end)
+        positions[i] = end
+    return positions
+
+
+def char_bonus(path, pos):
+    if pos == 0:
+        return BONUS_BOUNDARY
+    prev, ch = path[pos - 1], path[pos]
+    if prev in BOUNDARY_CHARS:
+        return BONUS_BOUNDARY
+    if (prev.islower() and ch.isupper()) or (not prev.isdigit() and ch.isdigit()):
+        return BONUS_CAMEL
+    return 0
+
+
+def score_path(path, lower, query):
+    """(score, positions) for a rel path, or None. A match inside the file name wins over one across folders."""
+    name_start = lower.rfind("/") + 1
+    positions = match_positions(lower, query, name_start)
+    in_name = positions is not None
+    if not in_name:
+        positions = match_positions(lower, query)
+        if positions is None:
+            return None
+
+    score = BONUS_FILE_NAME if in_name else 0
+    prev = -2
+    chunk_bonus = 0
+    for i, pos in enumerate(positions):
+        bonus = char_bonus(path, pos)
+        if i == 0:
+            bonus *= BONUS_FIRST_CHAR_MULTIPLIER
+        score += SCORE_MATCH
+        if pos == prev + 1:
+            # A run keeps the bonus it started with (fzf: "foo" right after a / scores like a boundary)
+            score += max(bonus, chunk_bonus, BONUS_CONSECUTIVE)
+        else:
+            if i > 0:
+                score += SCORE_GAP_START + SCORE_GAP_EXTENSION * (pos - prev - 2)
+            chunk_bonus = bonus
+            score += bonus
+        prev = pos
+    score -= PENALTY_DEPTH * lower.count("/")
+    return score, positions
+
+
+# ================= INDEX =================
+class QuickOpenIndex:
+    """
+    Every file of one project (ignore rules applied), kept in memory for "go to file".
+    ids are handed out shallow/short paths first, and each character has a bitset of the ids
+    whose path contains it - one AND per query character narrows 500k paths to the candidates
+    before anything is scored. Watcher deltas patch it; it is never rebuilt per query.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self.ignore = ignore_rules.for_project(self.root)
+        self.lock = threading.RLock()
+        self.ready = threading.Event()
+        self.generation = 0        # bumped on every change - a query only caches its ids for the generation it ran on
+        self.reset()
+
+    def reset(self):
+        self.paths = []            # id -> rel path ("/" separated), None once removed
+        self.lower = []            # id -> lowercased rel path
+        self.ids = {}              # rel path -> id
+        self.dirs = set()          # rel folders seen - removing one drops everything under it
+        self.chars = {}            # char -> bytearray bitset of ids
+        self.alive = bytearray()
+        self.dead = 0
+        self.last = None           # (query, ids that matched it) - the next keystroke starts from there
+
+    def rel(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def walk(self, folder):
+        """rel paths of every file under folder (ignored folders and .codeflow skipped)"""
+        top = self.rel(folder)
+        stack = [(folder, "" if top == "." else top + "/")]
+        while stack:
+            current, prefix = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        rel = prefix + entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if rel != ".codeflow" and not self.ignore.ignored(rel, True):
+                                    self.dirs.add(rel)
+                                    stack.append((entry.path, rel + "/"))
+                            elif not self.ignore.ignored(rel):
+                                yield rel
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def build(self):
+        """Walk into a fresh index and swap it in - queries keep using the old one meanwhile"""
+        started = time.perf_counter()
+        fresh = QuickOpenIndex(self.root)
+        rels = sorted(fresh.walk(fresh.root), key=lambda rel: (rel.count("/"), len(rel), rel))
+        for rel in rels:
+            fresh.add(rel)
+        with self.lock:
+            for name in ("paths", "lower", "ids", "dirs", "chars", "alive", "dead"):
+                setattr(self, name, getattr(fresh, name))
+            self.last = None
+            self.generation += 1
+        self.ready.set()
+        print(f"⚡ Quick open: {len(rels)} files in {time.perf_counter() - started:.2f}s")
+
+    def add(self, rel):
+        if rel in self.ids:
+            return
+        file_id = len(self.paths)
+        if file_id >> 3 >= len(self.alive):
+            for bits in self.chars.values():
+                bits.extend(bytes(GROW_BYTES))
+            self.alive.extend(bytes(GROW_BYTES))
+        lower = rel.lower()
+        self.paths.append(rel)
+        self.lower.append(lower)
+        self.ids[rel] = file_id
+        byte, bit = file_id >> 3, 1 << (file_id & 7)
+        self.alive[byte] |= bit
+        for ch in set(lower):
+            bits = self.chars.get(ch)
+            if bits is None:
+                bits = self.chars[ch] = bytearray(len(self.alive))
+            bits[byte] |= bit
+        self.last = None
+        self.generation += 1
+
+    def remove(self, rel):
+        file_id = self.ids.pop(rel, None)
+        if file_id is not None:
+            self.paths[file_id] = None
+            self.alive[file_id >> 3] &= ~(1 << (file_id & 7)) & 0xFF
+            self.dead += 1
+            self.last = None
+            self.generation += 1
+        if rel in self.dirs:
+            self.dirs = {d for d in self.dirs if d != rel and not d.startswith(rel + "/")}
+            for other in [r for r in self.ids if r.startswith(rel + "/")]:
+                self.remove(other)
+
+    def add_tree(self, path):
+        rel = self.rel(path)
+        if os.path.isdir(path):
+            if self.ignore.ignored(rel, True):
+                return
+            self.dirs.add(rel)
+            for sub in self.walk(path):
+                self.add(sub)
+        elif not self.ignore.ignored(rel):
+            self.add(rel)
+
+    def skipped(self, rel):
+        """Outside the project, inside .codeflow or inside an ignored folder"""
+        parts = rel.split("/")
+        if parts[0] in ("..", ".", ".codeflow"):
+            return True
+        return any(self.ignore.ignored("/".join(parts[:depth]), True) for depth in range(1, len(parts)))
+
+    def notify(self, deltas, rules_changed=False):
+        """Apply fs_watcher deltas (add / remove / rename / refresh / reset)"""
+        if not self.ready.is_set():
+            return
+        # A changed .gitignore can hide or show files anywhere - start over
+        rebuild = rules_changed
+        with self.lock:
+            for delta in deltas:
+                kind, path = delta["type"], delta.get("path")
+                if kind == "reset":
+                    rebuild = True
+                    break
+                if not path or not path_key(path).startswith(path_key(self.root)):
+                    continue
+                rel = self.rel(path)
+                if kind == "rename":
+                    self.remove(self.rel(delta["old_path"]))
+                if kind in ("remove", "refresh"):
+                    self.remove(rel)
+                if kind in ("add", "rename", "refresh") and not self.skipped(rel):
+                    self.add_tree(path)
+            if self.paths and self.dead / len(self.paths) >= COMPACT_DEAD:
+                rebuild = True
+        if rebuild:
+            threading.Thread(target=self.build, daemon=True).start()
+
+    # ================= MATCHING =================
+    def candidates(self, query):
+        """ids whose path has every character of query, lowest (shallowest) first"""
+        with self.lock:
+            last = self.last
+            if not (last and query.startswith(last[0])):
+                mask = int.from_bytes(self.alive, "little")
+                for ch in set(query):
+                    bits = self.chars.get(ch)
+                    mask &= int.from_bytes(bits, "little") if bits is not None else 0
+                data = mask.to_bytes(len(self.alive), "little") if mask else b""
+        if last and query.startswith(last[0]):
+            # Typing on - only what matched the shorter query can still match
+            yield from last[1]
+            return
+        for found in NONZERO_BYTE.finditer(data):
+            base = found.start() * 8
+            for bit in BITS[data[found.start()]]:
+                yield base + bit
+
+    def matcher(self, query, limit=RESULT_LIMIT):
+        return Matcher(self, query.lower().replace("\\", "/").replace(" ", ""), limit)
+
+
+class Matcher:
+    """One query over the index. run() can stop at a deadline and be resumed later."""
+
+    def __init__(self, index, query, limit):
+        self.index = index
+        with index.lock:
+            self.paths, self.lower = index.paths, index.lower  # a rebuild swaps these - keep the ones ids refer to
+            self.generation = index.generation
+        self.query = query
+        self.limit = limit
+        self.ids = index.candidates(query)
+        self.best = []      # min-heap of (score, -length, -id, positions)
+        self.matched = []
+        self.done = False
+
+    def run(self, deadline=None, cancelled=None):
+        """Score candidates until all are done (True) or the deadline / cancel comes first (False)"""
+        paths, lower = self.paths, self.lower
+        query, best, limit = self.query, self.best, self.limit
+        for count, file_id in enumerate(self.ids, 1):
+            path = paths[file_id]
+            if path is not None:
+                scored = score_path(path, lower[file_id], query)
+                if scored is not None:
+                    self.matched.append(file_id)
+                    entry = (scored[0], -len(path), -file_id, scored[1])
+                    if len(best) < limit:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            if count % 128 == 0:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                if cancelled is not None and cancelled():
+                    return False
+        self.done = True
+        with self.index.lock:
+            # A delta or rebuild since we started - these ids may be stale, don't seed the next keystroke with them
+            if self.index.generation == self.generation:
+                self.index.last = (query, self.matched)
+        return True
+
+    def results(self):
+        out = []
+        for score, _, neg_id, positions in sorted(self.best, reverse=True):
+            rel = self.paths[-neg_id]
+            if rel is None:
+                continue
+            out.append({
+                "path": os.path.join(self.index.root, *rel.split("/")),
+                "rel": rel,
+                "name": rel.rsplit("/", 1)[-1],
+                "score": score,
+                "positions": positions,
+            })
+        return out
+
+
+# ================= REGISTRY =================
+_indexes = {}
+_indexes_lock = threading.Lock()
+_background = {"cancel": threading.Event()}
+
+
+def get_index(root):
+    """Index for the open project, built in the background the first time"""
+    key = path_key(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            _indexes.clear()
+            index = _indexes[key] = QuickOpenIndex(root)
+            threading.Thread(target=index.build, daemon=True).start()
+        return index
+
+
+def notify(deltas, rules_changed=False):
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.notify(deltas, rules_changed)
+
+
+def quick_open(root, query, on_results, limit=RESULT_LIMIT, request_id=None, budget_ms=BUDGET_MS):
+    """
+    Ranked matches found within budget_ms come back right away. If the budget ran out (or the
+    index is still being built) they are marked partial, the rest carries on in the background and
+    on_results(request_id, results) gets the full ranking. A newer call cancels the older one's background part.
+    """
+    started = time.perf_counter()
+    index = get_index(root)
+    cancel = threading.Event()
+    with _indexes_lock:
+        _background["cancel"].set()
+        _background["cancel"] = cancel
+    if not query.strip():
+        return {"status": "ok", "request_id": request_id, "results": [], "done": True}
+
+    matcher = None
+    if index.ready.is_set():
+        matcher = index.matcher(query, limit)
+        if matcher.run(started + budget_ms / 1000):
+            return {"status": "ok", "request_id": request_id, "results": matcher.results(), "done": True,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def finish(matcher):
+        if matcher is None:
+            index.ready.wait()
+            matcher = index.matcher(query, limit)
+        if matcher.run(cancelled=cancel.is_set) and not cancel.is_set():
+            on_results(request_id, matcher.results())
+
+    threading.Thread(target=finish, args=(matcher,), daemon=True).start()
+    return {"status": "ok", "request_id": request_id, "results": matcher.results() if matcher else [],
+            "done": False, "partial": True, "indexing": matcher is None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
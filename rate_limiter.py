@@ -0,0 +1,138 @@
+import re
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+# ================= SETTINGS =================
+RPM = 30                  # requests per minute (Groq, llama-3.3-70b-versatile)
+TPM = 12000               # tokens per minute - prompt + completion
+RESPONSE_TOKENS = 1500    # reserved per call for the answer, settled with the real usage afterwards
+MAX_RETRIES = 4           # 429s retried per call
+BACKOFF = 2               # seconds, doubled per retry, when the error says nothing about when
+
+DURATION_RE = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+TRY_AGAIN_RE = re.compile(r"try again in ((?:\d+(?:\.\d+)?(?:h|ms|m|s))+)", re.IGNORECASE)
+
+
+def parse_duration(text):
+    """'7.5', '7.66s', '2m59.56s', '120ms' -> seconds (None if it isn't one)"""
+    text = str(text).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = DURATION_RE.match(text)
+    if not text or not match or not any(match.groups()):
+        return None
+    h, m, s, ms = (float(g) if g else 0.0 for g in match.groups())
+    return h * 3600 + m * 60 + s + ms / 1000
+
+
+def retry_after(error):
+    """Seconds the API asked us to wait: retry-after header, x-ratelimit-reset-*, or 'try again in ...'"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after")
+    if value:
+        seconds = parse_duration(value)
+        if seconds is None:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                seconds = None
+        if seconds is not None:
+            return max(seconds, 0.0)
+    resets = [parse_duration(headers[key]) for key in ("x-ratelimit-reset-tokens", "x-ratelimit-reset-requests") if headers.get(key)]
+    resets = [s for s in resets if s is not None]
+    if resets:
+        return max(resets)
+    match = TRY_AGAIN_RE.search(str(error))
+    if match:
+        return parse_duration(match.group(1))
+    return None
+
+
+def is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+class TokenBucket:
+    """per_minute units, refilled continuously; starts full"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is there (an amount over capacity only waits for a full bucket)"""
+        self.refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+
+class RateLimiter:
+    """
+    Process-wide gate in front of model(): one bucket for requests, one for tokens.
+    A call blocks only until both have room, reserves its prompt + RESPONSE_TOKENS, and gives
+    back / takes the difference once the real usage is known. A 429 closes the gate for
+    whatever retry-after says, for every thread.
+    """
+
+    def __init__(self, rpm=RPM, tpm=TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self, tokens):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now), self.blocked_until - now)
+                if wait <= 0:
+                    self.requests.level -= 1
+                    self.tokens.level -= tokens
+                    return
+            self.waited += wait
+            time.sleep(wait)
+
+    def settle(self, reserved, used):
+        with self.lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.level += reserved - used
+
+    def block(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def call(self, fn, prompt_tokens, response_tokens=RESPONSE_TOKENS):
+        """fn() once there's room; 429s wait as long as the API asks and try again"""
+        reserved = prompt_tokens + response_tokens
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire(reserved)
+            try:
+                result = fn()
+            except Exception as e:
+                self.settle(reserved, prompt_tokens)
+                if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                    raise
+                seconds = retry_after(e)
+                seconds = BACKOFF * 2 ** attempt if seconds is None else seconds
+                print(f"⏳ Rate limited - waiting {seconds:.1f}s (retry {attempt + 1}/{MAX_RETRIES})")
+                self.block(seconds)
+                continue
+            usage = getattr(result, "usage", None)
+            used = getattr(usage, "total_tokens", None)
+            self.settle(reserved, used if used is not None else reserved)
+            return result
+
+
+limiter = RateLimiter()
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+
+from hidden import codeflow_folder
+
+# ================= SETTINGS =================
+CACHE_FILE = "records.db"    # inside <project>/.codeflow
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    summaries TEXT NOT NULL DEFAULT '{}'
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def text_digest(content):
+    """Digest of the decoded text - same text, same digest, whatever the mtime says"""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class RecordCache:
+    """
+    What the AI features worked out per file (token count, priority, summaries), kept in
+    <project>/.codeflow/records.db (SQLite, WAL) across runs.
+    Looked up by path + mtime + size first; if only the stat changed, by the text digest.
+    Everything is loaded into memory on first use - a lookup never touches disk.
+    version: whatever changes the derived fields (e.g. the token counter) - a different version
+    throws the old fields away.
+    """
+
+    def __init__(self, root, version="1"):
+        self.root = os.path.normpath(root)
+        self.db_file = os.path.join(codeflow_folder(self.root), CACHE_FILE)
+        self.version = str(version)
+        self.lock = threading.RLock()
+        self.conn = None
+        self.rows = {}       # rel path -> {"mtime_ns", "size", "digest", "fields", "summaries"}
+        self.dirty = 0
+        self.hits = 0        # stat matched
+        self.digest_hits = 0 # stat changed, text didn't
+        self.misses = 0
+
+    def connect(self):
+        with self.lock:
+            if self.conn is not None:
+                return
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=10)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if not row or row[0] != self.version:
+                with self.conn:
+                    self.conn.execute("DELETE FROM records")
+                    self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (self.version,))
+            for rel, mtime_ns, size, digest, fields, summaries in self.conn.execute(
+                    "SELECT path, mtime_ns, size, digest, fields, summaries FROM records"):
+                self.rows[rel] = {"mtime_ns": mtime_ns, "size": size, "digest": digest,
+                                  "fields": json.loads(fields), "summaries": json.loads(summaries)}
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.flush()
+                self.conn.close()
+                self.conn = None
+
+    # ================= LOOKUP =================
+    def lookup(self, rel, mtime_ns, size):
+        """Cached row if the file wasn't touched since it was stored"""
+        self.connect()
+        row = self.rows.get(rel)
+        if row is not None and row["mtime_ns"] == mtime_ns and row["size"] == size:
+            self.hits += 1
+            return row
+        return None
+
+    def lookup_digest(self, rel, digest):
+        """Cached row for rel if its text is the same (touched / checked out again, not edited)"""
+        self.connect()
+        row = self.rows.get(rel)
+        if row is not None and row["digest"] == digest:
+            self.digest_hits += 1
+            return row
+        self.misses += 1
+        return None
+
+    # ================= STORING =================
+    def store(self, rel, mtime_ns, size, digest, fields):
+        """Remember fields for this version of the file; summaries survive if the text is the same"""
+        self.connect()
+        with self.lock:
+            old = self.rows.get(rel)
+            summaries = old["summaries"] if old is not None and old["digest"] == digest else {}
+            row = self.rows[rel] = {"mtime_ns": mtime_ns, "size": size, "digest": digest,
+                                    "fields": fields, "summaries": summaries}
+            self.conn.execute(
+                "INSERT OR REPLACE INTO records (path, mtime_ns, size, digest, fields, summaries) VALUES (?, ?, ?, ?, ?, ?)",
+                (rel, mtime_ns, size, digest, json.dumps(fields), json.dumps(summaries)),
+            )
+            self.dirty += 1
+        return row
+
+    def set_summary(self, rel, kind, text):
+        """Keep a derived summary (e.g. kind="readme") with the file - dropped once its text changes"""
+        self.connect()
+        with self.lock:
+            row = self.rows.get(rel)
+            if row is None:
+                return False
+            row["summaries"][kind] = text
+            self.conn.execute("UPDATE records SET summaries = ? WHERE path = ?", (json.dumps(row["summaries"]), rel))
+            self.dirty += 1
+            return True
+
+    def prune(self, seen):
+        """Forget files a full scan no longer found"""
+        self.connect()
+        with self.lock:
+            gone = [rel for rel in self.rows if rel not in seen]
+            for rel in gone:
+                del self.rows[rel]
+            self.conn.executemany("DELETE FROM records WHERE path = ?", [(rel,) for rel in gone])
+            self.dirty += len(gone)
+
+    def flush(self):
+        with self.lock:
+            if self.conn is not None and self.dirty:
+                self.conn.commit()
+                self.dirty = 0
+
+    def summary(self):
+        return f"💾 Record cache: {self.hits} unchanged, {self.digest_hits} same text, {self.misses} re-read"
@@ -120,26 +120,782 @@ import json
 import tempfile
 import webbrowser
 import time
-from winpty import PTY
+import re
+import sys
+import hashlib
+import shutil
+import codecs
+import threading
+import platform
+import uuid
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from build_cache import build_cache
+from vt_filter import OutputFilter
+from project_store import projects
+
+IS_WINDOWS = platform.system() == "Windows"
+
+if IS_WINDOWS:
+    from winpty import PTY
+else:
+    import pty
+    import select
+    import signal
+    import struct
+    import fcntl
+    import termios
 
 # ================= PATH LOAD =================
 try:
-    with open("storage/recent.json", "r") as f:
-        start_path = json.load(f)[0]["path"]
+    start_path = projects.current_path(os.getcwd())
 except:
     start_path = os.getcwd()
 
-# ================= SERVER =================
-class TerminalServer:
-    def __init__(self):
-        self.start_path = start_path
+# ================= SHELL =================
+if IS_WINDOWS:
+    SHELL_COMMAND = 'cmd.exe /Q /K @echo off'
+    CLEAR_COMMAND = 'cls'
+    NEWLINE = '\r\n'
+    PYTHON_COMMAND = 'python'
+else:
+    SHELL_COMMAND = os.environ.get("SHELL", "/bin/bash")
+    CLEAR_COMMAND = 'clear'
+    NEWLINE = '\r'
+    PYTHON_COMMAND = 'python3'
+
+# ================= COMPILERS =================
+COMPILERS = {"c": "gcc", "cpp": "g++", "java": "javac"}
+COMPILE_FLAGS = {"c": [], "cpp": [], "java": []}
+SCRATCH_DIR = os.path.join(tempfile.gettempdir(), "nebula-scratch")
+
+
+# ================= PROCESS STATS =================
+# Runs the real program, wait4()s it and writes "<exit code> <peak RSS KB> <launcher RSS KB>" to the
+# fd in argv[1]. argv[2] is "tty" when stdin is a PTY that should become the controlling terminal.
+# ru_maxrss survives exec, so the child starts out at the launcher's peak (its memory map's high
+# water mark, VmHWM) - anything above that is the program's, anything at or below can't be told apart.
+RUSAGE_WRAPPER = '''
+import os, sys, signal, resource
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+if sys.argv[2] == "tty":
+    import fcntl, termios
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+scale = 1024 if sys.platform == "darwin" else 1
+
+def own_peak_kb():
+    # Not RUSAGE_SELF - that also remembers the server this wrapper was forked from
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+
+try:
+    pid = os.posix_spawn(sys.argv[3], sys.argv[3:], os.environ, setsigdef=(signal.SIGINT,))
+except OSError as e:
+    print(e, file=sys.stderr)
+    os.write(int(sys.argv[1]), b"127 0 0")
+    os._exit(127)
+# posix_spawn returns once the child has exec'd - the mark it inherited can't be higher than this
+base = own_peak_kb()
+_, status, usage = os.wait4(pid, 0)
+code = os.waitstatus_to_exitcode(status)
+os.write(int(sys.argv[1]), b"%d %d %d" % (code, usage.ru_maxrss // scale, base))
+os._exit(code if code >= 0 else 128 - code)
+'''
+DRAIN_QUIET_S = 0.5   # after the program exits, stop draining its output once it's been quiet this long
+
+
+async def wait_readable(fd):
+    """Park on the event loop until fd is readable (or at EOF)"""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await ready
+    finally:
+        loop.remove_reader(fd)
+
+
+class FdWriter:
+    """
+    Writes to a non-blocking fd without ever blocking the event loop - every session shares it.
+    Whatever the fd doesn't take right away (a paste into a program that isn't reading) is kept
+    and sent from loop.add_writer as the other side drains; the writer goes once it's all out.
+    """
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.pending = bytearray()
+        self.loop = None
+
+    def write(self, data):
+        if not self.pending:
+            try:
+                data = data[os.write(self.fd, data):]
+            except BlockingIOError:
+                pass
+            if not data:
+                return
+            self.loop = asyncio.get_running_loop()
+            self.loop.add_writer(self.fd, self._drain)
+        self.pending += data
+
+    def _drain(self):
+        try:
+            written = os.write(self.fd, self.pending)
+        except BlockingIOError:
+            return
+        except OSError:
+            # The other side is gone - nobody is left to read the rest
+            written = len(self.pending)
+        del self.pending[:written]
+        if not self.pending:
+            self.loop.remove_writer(self.fd)
+
+    def close(self):
+        """Call before closing the fd"""
+        if self.pending:
+            self.loop.remove_writer(self.fd)
+            self.pending.clear()
+
+
+class PtyOutput:
+    """Master side of a program's PTY with the read() of a StreamReader - b"" once every slave fd is closed"""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    async def read(self, n):
+        while True:
+            try:
+                return os.read(self.fd, n)
+            except BlockingIOError:
+                await wait_readable(self.fd)
+            except OSError:
+                # EIO - the program and everything it started closed the terminal
+                return b""
+
+
+def win_open_process(pid):
+    """Keep a handle so the exit can be waited on and the peak working set read after it"""
+    try:
+        import ctypes
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        SYNCHRONIZE = 0x00100000
+        return ctypes.windll.kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION | SYNCHRONIZE, False, pid)
+    except Exception as e:
+        print(f"[DEBUG] OpenProcess failed: {e}")
+        return None
+
+
+def win_wait(handle):
+    """Blocks until the process exits and returns its exit code - run it in an executor"""
+    import ctypes
+    from ctypes import wintypes
+    INFINITE = 0xFFFFFFFF
+    ctypes.windll.kernel32.WaitForSingleObject(handle, INFINITE)
+    code = wintypes.DWORD()
+    ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+    return code.value
+
+
+def win_peak_rss_kb(handle):
+    if not handle:
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize // 1024
+        return None
+    except Exception as e:
+        print(f"[DEBUG] GetProcessMemoryInfo failed: {e}")
+        return None
+    finally:
+        ctypes.windll.kernel32.CloseHandle(handle)
+
+
+class TrackedProcess:
+    """
+    Child process with exit code / wall time / peak RSS accounting.
+    tty=True (POSIX) puts it on its own PTY, so stdio buffering, isatty() and Ctrl+C / Ctrl+D
+    behave like in a terminal - an interactive C/C++ program sees its prompts flushed. Otherwise
+    (warm workers, Windows) stdin / stdout are pipes and the session does the line editing.
+    """
+
+    def __init__(self, argv, cwd=None, env=None, tty=False):
+        self.argv = argv
+        self.cwd = cwd
+        self.env = env
+        self.tty = tty and not IS_WINDOWS
+        self.proc = None
+        self.master = None
+        self.output = None
+        self.input = None
+        self.stats_r = None
+        self.win_handle = None
+        self.started = None
+        self.exited = False
+
+    @property
+    def pid(self):
+        return self.proc.pid
+
+    @property
+    def stdin(self):
+        return self.proc.stdin
+
+    @property
+    def stdout(self):
+        return self.output if self.tty else self.proc.stdout
+
+    @property
+    def returncode(self):
+        return self.proc.returncode if self.proc else None
+
+    async def start(self):
+        program = shutil.which(self.argv[0]) or self.argv[0]
+        if not os.path.exists(program):
+            raise FileNotFoundError(f"Command not found: {self.argv[0]}")
+
+        stdio = {"stdin": asyncio.subprocess.PIPE, "stdout": asyncio.subprocess.PIPE, "stderr": asyncio.subprocess.STDOUT}
+        slave = None
+        if IS_WINDOWS:
+            cmd = [program, *self.argv[1:]]
+            extra = {}
+        else:
+            # POSIX: a tiny wrapper wait4()s the program and reports its rusage on a side pipe
+            self.stats_r, stats_w = os.pipe()
+            if self.tty:
+                # Same geometry as the shell PTY, so nothing wraps differently
+                self.master, slave = pty.openpty()
+                fcntl.ioctl(slave, termios.TIOCSWINSZ, struct.pack("HHHH", 50, 800, 0, 0))
+                os.set_blocking(self.master, False)
+                self.output = PtyOutput(self.master)
+                self.input = FdWriter(self.master)
+                stdio = {"stdin": slave, "stdout": slave, "stderr": slave}
+            cmd = [sys.executable, "-S", "-c", RUSAGE_WRAPPER, str(stats_w), "tty" if self.tty else "pipe",
+                   program, *self.argv[1:]]
+            extra = {"pass_fds": (stats_w,), "start_new_session": True}
+
+        try:
+            self.proc = await asyncio.create_subprocess_exec(*cmd, cwd=self.cwd, env=self.env, **stdio, **extra)
+        except OSError:
+            self.close()
+            raise
+        finally:
+            if not IS_WINDOWS:
+                os.close(stats_w)
+            if slave is not None:
+                # Only the program holds the slave now - EIO on the master means it's all gone
+                os.close(slave)
+
+        if IS_WINDOWS:
+            self.win_handle = win_open_process(self.proc.pid)
+        self.started = time.perf_counter()
+
+    def write_tty(self, text):
+        """Keystrokes for a PTY child - the line discipline echoes, edits and turns ^C / ^D into signals / EOF"""
+        if self.master is None:
+            return
+        try:
+            self.input.write(text.encode("utf-8"))
+        except OSError:
+            pass
+
+    def interrupt(self):
+        if self.exited or self.returncode is not None:
+            return
+        if IS_WINDOWS:
+            self.proc.terminate()
+        else:
+            os.killpg(self.proc.pid, signal.SIGINT)
+
+    def kill(self):
+        if self.exited or self.returncode is not None:
+            return
+        try:
+            if IS_WINDOWS:
+                self.proc.kill()
+            else:
+                os.killpg(self.proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    async def finish(self):
+        """
+        Wait for the program itself to exit and collect the accounting. Doesn't wait for its
+        output to close - a background child may keep that open; draining is the caller's job.
+        """
+        report = []
+        if IS_WINDOWS:
+            if self.win_handle:
+                code = await asyncio.get_running_loop().run_in_executor(None, win_wait, self.win_handle)
+                report = [code, win_peak_rss_kb(self.win_handle) or 0, 0]
+                self.win_handle = None
+        elif self.stats_r is not None:
+            # The wrapper writes the moment wait4() returns; EOF without a report means it was killed
+            await wait_readable(self.stats_r)
+            report = os.read(self.stats_r, 64).decode().split()
+        ended = time.perf_counter()
+        self.exited = True
+
+        stats = {
+            "argv": self.argv,
+            "exit_code": None,
+            "wall_time": ended - self.started,
+            "peak_rss_kb": None,
+            "launcher_rss_kb": None,
+        }
+        if len(report) == 3:
+            code, rss, base = (int(x) for x in report)
+            stats["exit_code"] = code
+            if rss > base:
+                stats["peak_rss_kb"] = rss
+            else:
+                # Stayed under what the launcher itself used - only the bound is known
+                stats["launcher_rss_kb"] = base
+        else:
+            stats["exit_code"] = await self.proc.wait()
+        return stats
+
+    def close(self):
+        if self.stats_r is not None:
+            os.close(self.stats_r)
+            self.stats_r = None
+        if self.master is not None:
+            self.input.close()
+            os.close(self.master)
+            self.master = None
+
+
+# ================= WARM RUNTIMES =================
+# Workers start ahead of time, import the usual stdlib, then block until a snippet arrives on stdin
+# as "<byte length>\n<code>". Everything after the snippet is the program's own stdin.
+PYTHON_WORKER = r'''
+import os, sys, traceback
+import re, json, math, random, time, datetime, string, collections, itertools, functools
+import pathlib, typing, dataclasses, statistics, decimal, fractions, copy, heapq, bisect
+
+def read_exact(n):
+    data = b""
+    while len(data) < n:
+        chunk = os.read(0, n - len(data))
+        if not chunk:
+            os._exit(0)
+        data += chunk
+    return data
+
+header = b""
+while not header.endswith(b"\n"):
+    header += read_exact(1)
+code = read_exact(int(header)).decode("utf-8")
+
+# Fresh namespace - nothing from the warm-up leaks into the snippet
+namespace = {"__name__": "__main__", "__file__": "<snippet>", "__builtins__": __builtins__}
+try:
+    exec(compile(code, "<snippet>", "exec"), namespace)
+except SystemExit:
+    raise
+except BaseException:
+    etype, value, tb = sys.exc_info()
+    traceback.print_exception(etype, value, tb.tb_next)
+    sys.exit(1)
+'''
+
+NODE_WORKER = r'''
+const fs = require('fs'), path = require('path'), Module = require('module');
+const mode = process.argv[1];
+
+let transpile = (code) => code;
+if (mode === 'ts') {
+    try {
+        const esbuild = require('esbuild');
+        transpile = (code) => esbuild.transformSync(code, { loader: 'ts', format: 'cjs' }).code;
+    } catch (e) {
+        const ts = require('typescript');
+        transpile = (code) => ts.transpileModule(code, {
+            compilerOptions: { module: ts.ModuleKind.CommonJS, target: ts.ScriptTarget.ES2020 }
+        }).outputText;
+    }
+}
+
+function readExact(n) {
+    const buf = Buffer.alloc(n);
+    let got = 0;
+    while (got < n) {
+        const r = fs.readSync(0, buf, got, n - got, null);
+        if (r === 0) process.exit(0);
+        got += r;
+    }
+    return buf;
+}
+
+let header = '';
+while (!header.endsWith('\n')) header += readExact(1).toString();
+const code = transpile(readExact(parseInt(header, 10)).toString('utf8'));
+
+// Fresh module - own exports/require, same as running a file
+const filename = path.join(process.cwd(), mode === 'ts' ? 'snippet.ts' : 'snippet.js');
+const snippet = new Module(filename, null);
+snippet.filename = filename;
+snippet.paths = Module._nodeModulePaths(process.cwd());
+snippet._compile(code, filename);
+'''
+
+TS_PROBE = "try { require.resolve('esbuild') } catch (e) { require.resolve('typescript') }"
+
+
+class WarmPool:
+    """Pre-started interpreters per language so __RUN__ skips interpreter startup and imports"""
+
+    def __init__(self, size=1):
+        self.size = size
+        self.idle = {"python": deque(), "javascript": deque(), "typescript": deque()}
+        self.unavailable = set()
+        self.filling = set()
+        self.node_env = None
+
+    def worker_argv(self, lang):
+        if lang == "python":
+            return [PYTHON_COMMAND, "-u", "-c", PYTHON_WORKER]
+        return ["node", "-e", NODE_WORKER, "ts" if lang == "typescript" else "js"]
+
+    async def probe_typescript(self):
+        """Warm TS needs esbuild or typescript importable from node - else ts-node stays cold"""
+        env = dict(os.environ)
+        try:
+            npm = await asyncio.create_subprocess_exec(
+                shutil.which("npm") or "npm", "root", "-g",
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+            )
+            global_root = (await npm.communicate())[0].decode().strip()
+            if global_root:
+                env["NODE_PATH"] = os.pathsep.join(filter(None, [env.get("NODE_PATH"), global_root]))
+
+            node = await asyncio.create_subprocess_exec(
+                shutil.which("node") or "node", "-e", TS_PROBE, env=env,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+            )
+            if await node.wait() != 0:
+                return False
+        except OSError:
+            return False
+        self.node_env = env
+        return True
+
+    async def fill(self, lang):
+        if lang in self.filling or lang in self.unavailable:
+            return
+        self.filling.add(lang)
+        try:
+            if lang == "typescript" and self.node_env is None and not await self.probe_typescript():
+                self.unavailable.add(lang)
+                return
+
+            os.makedirs(SCRATCH_DIR, exist_ok=True)
+            while len(self.idle[lang]) < self.size:
+                worker = TrackedProcess(
+                    self.worker_argv(lang), cwd=SCRATCH_DIR,
+                    env=self.node_env if lang == "typescript" else None
+                )
+                try:
+                    await worker.start()
+                except OSError as e:
+                    print(f"[DEBUG] Warm {lang} runtime unavailable: {e}")
+                    self.unavailable.add(lang)
+                    return
+                self.idle[lang].append(worker)
+        finally:
+            self.filling.discard(lang)
+
+    def start(self):
+        for lang in self.idle:
+            asyncio.create_task(self.fill(lang))
+
+    async def take(self, lang):
+        """A ready worker (refill kicks off in the background), or None -> caller runs cold"""
+        if lang not in self.idle:
+            return None
+        if not self.idle[lang]:
+            await self.fill(lang)
+
+        while self.idle[lang]:
+            worker = self.idle[lang].popleft()
+            if worker.returncode is None:
+                asyncio.create_task(self.fill(lang))
+                return worker
+            await worker.finish()
+            worker.close()
+        return None
+
+    def shutdown(self):
+        for workers in self.idle.values():
+            while workers:
+                worker = workers.popleft()
+                worker.kill()
+                worker.close()
+
+
+warm_pool = WarmPool()
+
+
+# ================= POSIX PTY =================
+class PosixPTY:
+    """Same interface as winpty.PTY, backed by pty.fork() on Linux/macOS"""
+
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        self.pid = None
+        self.fd = None
+        self.writer = None
+        self._decoder = None
+
+    def spawn(self, appname, cwd=None):
+        argv = appname.split()
+        env = dict(os.environ, TERM="xterm-256color")
+
+        pid, fd = pty.fork()
+        if pid == 0:
+            # Child - become the shell
+            try:
+                if cwd:
+                    os.chdir(cwd)
+                os.execvpe(argv[0], argv, env)
+            finally:
+                os._exit(1)
+
+        self.pid = pid
+        self.fd = fd
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        os.set_blocking(fd, False)
+        self.writer = FdWriter(fd)
+        self.set_size(self.cols, self.rows)
+        return True
+
+    def fileno(self):
+        return self.fd
+
+    def set_size(self, cols, rows):
+        self.cols, self.rows = cols, rows
+        if self.fd is not None:
+            fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+
+    def read(self, blocking=False):
+        if self.fd is None:
+            raise EOFError("PTY closed")
+
+        if blocking:
+            select.select([self.fd], [], [])
+
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return ""
+        except OSError:
+            # EIO - the shell on the other side has exited
+            data = b""
+
+        if not data:
+            raise EOFError("PTY closed")
+        return self._decoder.decode(data)
+
+    def write(self, data):
+        """Never blocks - what the shell isn't ready for yet goes out from the event loop"""
+        self.writer.write(data.encode("utf-8"))
+        return len(data)
+
+    def isalive(self):
+        if self.pid is None:
+            return False
+        try:
+            pid, _ = os.waitpid(self.pid, os.WNOHANG)
+        except ChildProcessError:
+            return False
+        return pid == 0
+
+    def close(self):
+        if self.fd is not None:
+            self.writer.close()
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+        if self.pid is not None:
+            try:
+                os.kill(self.pid, signal.SIGHUP)
+                for _ in range(10):
+                    if not self.isalive():
+                        break
+                    time.sleep(0.01)
+                else:
+                    os.kill(self.pid, signal.SIGKILL)
+                    os.waitpid(self.pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.pid = None
+
+
+# ================= OUTPUT BATCHER =================
+class OutputBatcher:
+    """Merges PTY chunks into fewer WebSocket frames and pushes back when the client is slow"""
+
+    def __init__(self, ws, max_frame=64 * 1024, flush_interval=0.01, high_water=1024 * 1024,
+                 on_pause=None, on_resume=None):
+        self.ws = ws
+        self.max_frame = max_frame
+        self.flush_interval = flush_interval
+        self.high_water = high_water
+        self.low_water = high_water // 4
+        self.on_pause = on_pause
+        self.on_resume = on_resume
+
+        self.parts = deque()
+        self.size = 0
+        self.skipped = 0
+        self.paused = False
+        self.closed = False
+        self.timer = None
+        self.wakeup = asyncio.Event()
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+    def feed(self, data):
+        if not data or self.closed:
+            return
+
+        # Producer could not be paused (or is still flooding) - drop instead of growing forever
+        if self.size >= self.high_water and (self.on_pause is None or self.size >= self.high_water * 2):
+            self.skipped += len(data)
+            return
+
+        self.parts.append(data)
+        self.size += len(data)
+
+        if self.size >= self.high_water:
+            self.drained.clear()
+            if not self.paused and self.on_pause:
+                self.paused = True
+                self.on_pause()
+
+        if self.size >= self.max_frame:
+            self.wakeup.set()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.flush_interval, self.wakeup.set)
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        self.drained.set()
+
+    def _take(self, limit):
+        out = []
+        taken = 0
+        while self.parts and taken < limit:
+            part = self.parts[0]
+            if taken + len(part) > limit:
+                cut = limit - taken
+                out.append(part[:cut])
+                self.parts[0] = part[cut:]
+                taken += cut
+            else:
+                out.append(self.parts.popleft())
+                taken += len(part)
+        self.size -= taken
+        return "".join(out)
+
+    async def flush(self):
+        while self.parts or self.skipped:
+            frame = self._take(self.max_frame)
+            if not self.parts and self.skipped:
+                frame += f"\r\n\x1b[33m[... skipped {self.skipped:,} bytes of output ...]\x1b[0m\r\n"
+                self.skipped = 0
+
+            # websockets waits for the transport to drain here when the client's buffer is full
+            await self.ws.send(frame)
+
+            if self.size <= self.low_water:
+                self.drained.set()
+                if self.paused:
+                    self.paused = False
+                    if self.on_resume:
+                        self.on_resume()
+
+    async def run(self):
+        try:
+            while not (self.closed and not self.parts):
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                if self.timer:
+                    self.timer.cancel()
+                    self.timer = None
+                await self.flush()
+        except Exception as e:
+            print(f"[DEBUG] Send error: {e}")
+            self.closed = True
+
+
+# ================= SESSION =================
+class TerminalSession:
+    """One shell per terminal tab - its own PTY, reader and output batcher"""
+
+    def __init__(self, session_id, path=None):
+        self.session_id = session_id
+        self.start_path = path or start_path
         self.pty = None
         self.is_active = False
         self.temp_files = []
+        self.output_filter = OutputFilter()
         self.html_cleanup_delay = 5
-        self.reading_output = False
         self.echo_mode = False  # Track if we should echo user input
 
+        # Event-driven output: the loop (POSIX) or a reader thread (winpty) pushes (pty, chunk) here -
+        # chunks from a PTY that was already reset are dropped, so a late reader can't end the new shell
+        self.output_queue = None
+        self.reader_loop = None
+        self.reader_fd = None
+        self.reader_thread = None
+        self.reader_gate = threading.Event()
+        self.reader_gate.set()
+        self.last_output_time = time.time()
+
+        # Program started by __RUN_FILE__ / __RUN__ (tracked child, not typed into the shell)
+        self.run_task = None
+        self.proc = None
+        self.input_line = ""
+        self.last_run = None
+
+        # Client currently attached to this shell (None while the tab is disconnected)
+        self.ws = None
+        self.batcher = None
+        self.reader_task = None
+        self.last_activity = time.time()
+
         self.languages = {
             "python": ".py",
             "javascript": ".js",
@@ -151,18 +907,20 @@ class TerminalServer:
             "css": ".css"
         }
 
-    def create_pty(self):
+    async def create_pty(self):
         if self.pty:
             self.destroy_pty()
 
         # VERY WIDE WIDTH to prevent wrapping
-        self.pty = PTY(800, 50)
+        self.pty = PTY(800, 50) if IS_WINDOWS else PosixPTY(800, 50)
+        self.flush_filter()
+        self.output_filter = OutputFilter()
         
         # Use CMD with proper settings - /K keeps window open, /Q disables echo
-        self.pty.spawn('cmd.exe /Q /K @echo off', cwd=self.start_path)
+        self.pty.spawn(SHELL_COMMAND, cwd=self.start_path)
         self.is_active = True
         
-        time.sleep(0.5)
+        await asyncio.sleep(0.5)
         
         # Clear initial output
         try:
@@ -172,16 +930,19 @@ class TerminalServer:
             pass
         
         # Send initial commands to configure terminal
-        self.pty.write('cls\r\n')
-        time.sleep(0.1)
+        self.pty.write(CLEAR_COMMAND + NEWLINE)
+        await asyncio.sleep(0.1)
         try:
             self.pty.read()  # Clear cls output
         except:
             pass
         
-        print("✅ PTY started with echo disabled")
+        self.attach_reader()
+        print(f"✅ PTY started with echo disabled [{self.session_id}]")
 
     def destroy_pty(self):
+        self.cancel_run()
+        self.detach_reader()
         try:
             if self.pty:
                 self.pty.close()
@@ -191,7 +952,7 @@ class TerminalServer:
         self.pty = None
         self.is_active = False
         asyncio.create_task(self.delayed_cleanup())
-        print("🗑️ PTY destroyed")
+        print(f"🗑️ PTY destroyed [{self.session_id}]")
 
     async def delayed_cleanup(self):
         await asyncio.sleep(self.html_cleanup_delay)
@@ -204,196 +965,492 @@ class TerminalServer:
         self.temp_files.clear()
 
     def clean_output(self, data):
-        """Remove ANSI codes and cleanup markers"""
-        # Remove ANSI escape sequences
-        data = data.replace('\x1b[?2004h', '').replace('\x1b[?2004l', '')
-        data = data.replace('\x1b[?25h', '').replace('\x1b[?25l', '')
-        data = data.replace('\x1b[?1h', '').replace('\x1b[?1l', '')
-        
-        # Remove markers
-        data = data.replace('__DONE__', '')
-        data = data.replace('__CMD_START__', '')
-        
-        return data
+        """Remove unwanted private-mode sequences - one pass, state carried between reads"""
+        return self.output_filter.feed(data)
+
+    def flush_filter(self):
+        """Send what the filter held back for the next read - at EOF and before it's replaced"""
+        tail = self.output_filter.flush()
+        if tail:
+            self.write_output(tail)
 
     # ================= RUN FILE =================
-    async def run_file(self, lang, filepath, ws):
+    async def run_file(self, lang, filepath):
         if not os.path.exists(filepath):
-            await ws.send(f"\r\n❌ File not found: {filepath}\r\n")
+            self.write_output(f"\r\n❌ File not found: {filepath}\r\n")
             return
 
         if filepath.endswith(('.html', '.css')):
             file_url = f"file:///{filepath.replace(os.sep, '/')}"
             webbrowser.open(file_url)
-            await ws.send(f"\r\n🌐 Opened: {os.path.basename(filepath)}\r\n")
+            self.write_output(f"\r\n🌐 Opened: {os.path.basename(filepath)}\r\n")
             return
 
-        # Convert paths with spaces to 8.3 format to avoid wrapping
-        short_path = filepath
-        try:
-            # Get short path name (8.3 DOS format)
-            import ctypes
-            from ctypes import wintypes
-            
-            get_short_path_name = ctypes.windll.kernel32.GetShortPathNameW
-            get_short_path_name.argtypes = [wintypes.LPCWSTR, wintypes.LPWSTR, wintypes.DWORD]
-            get_short_path_name.restype = wintypes.DWORD
-            
-            buffer_size = 500
-            buffer = ctypes.create_unicode_buffer(buffer_size)
-            ret = get_short_path_name(filepath, buffer, buffer_size)
-            
-            if ret:
-                short_path = buffer.value
-                print(f"[DEBUG] Short path: {short_path}")
-        except Exception as e:
-            print(f"[DEBUG] Could not get short path: {e}")
-
-        # Build command
+        # Build command(s) - each step runs only if the previous one exited with 0
+        folder = os.path.dirname(filepath)
         if lang == "python":
-            cmd = f'python -u "{short_path}"'
+            steps = [[PYTHON_COMMAND, "-u", filepath]]
         elif lang == "javascript":
-            cmd = f'node "{short_path}"'
+            steps = [["node", filepath]]
         elif lang == "typescript":
-            cmd = f'npx ts-node "{short_path}"'
+            steps = [["npx", "ts-node", filepath]]
         elif lang in ["c", "cpp"]:
-            exe = short_path.replace('.c' if lang == 'c' else '.cpp', '.exe')
-            compiler = "gcc" if lang == "c" else "g++"
-            cmd = f'{compiler} "{short_path}" -o "{exe}" && "{exe}"'
+            entry = await self.build_cached(lang, filepath)
+            if not entry:
+                return
+            steps = [[os.path.join(entry, "program.exe" if IS_WINDOWS else "program")]]
         elif lang == "java":
-            cls = os.path.basename(short_path).replace(".java", "")
-            cmd = f'javac "{short_path}" && java -cp "{os.path.dirname(short_path)}" {cls}'
+            entry = await self.build_cached(lang, filepath)
+            if not entry:
+                return
+            cls = os.path.basename(filepath).replace(".java", "")
+            steps = [["java", "-cp", os.pathsep.join([os.path.join(entry, "classes"), folder]), cls]]
         else:
-            await ws.send(f"\r\n❌ Unsupported: {lang}\r\n")
+            self.write_output(f"\r\n❌ Unsupported: {lang}\r\n")
             return
 
-        # Execute
-        if self.pty and self.is_active:
-            self.reading_output = True
-            
-            print(f"[DEBUG] Executing: {cmd}")
-            
-            # Send command with completion marker
-            self.pty.write(f'{cmd} && echo __DONE__\r\n')
-            
-            await asyncio.sleep(0.3)
-            
-            output_buffer = ""
-            max_wait = 200
-            wait_count = 0
-            done_found = False
-            last_output_time = time.time()
-            
-            while wait_count < max_wait and not done_found:
-                await asyncio.sleep(0.05)
-                try:
-                    data = self.pty.read()
-                    if data:
-                        last_output_time = time.time()
-                        output_buffer += data
-                        
-                        if "__DONE__" in data:
-                            done_found = True
-                            
-                        clean_data = self.clean_output(data)
-                        if clean_data.strip():
-                            await ws.send(clean_data)
-                    else:
-                        # No data - check timeout
-                        if time.time() - last_output_time > 2.0:
-                            # No output for 2 seconds, might be done
-                            break
-                            
-                except Exception as e:
-                    print(f"[DEBUG] Read error: {e}")
-                    pass
-                    
-                wait_count += 1
-            
-            self.reading_output = False
-            
-            if not done_found:
-                print(f"[DEBUG] Timeout or completed without marker")
+        for argv in steps:
+            stats = await self.run_process(argv, cwd=folder or None)
+            self.last_run = stats
+            if stats["exit_code"] != 0:
+                break
+
+    async def build_cached(self, lang, filepath):
+        """Compile into the build cache (or reuse an identical earlier build) - returns the entry folder"""
+        compiler = COMPILERS[lang]
+        flags = COMPILE_FLAGS[lang]
+        key = build_cache.key_for(lang, filepath, compiler, flags)
+
+        entry = build_cache.lookup(key)
+        if entry:
+            self.write_output(f"\r\n⚡ Source unchanged - using cached build\r\n")
+            return entry
+
+        staging = build_cache.staging()
+        if lang == "java":
+            output = os.path.join(staging, "classes")
+            argv = [compiler, *flags, "-d", output, filepath]
+        else:
+            output = os.path.join(staging, "program.exe" if IS_WINDOWS else "program")
+            argv = [compiler, *flags, filepath, "-o", output]
+
+        stats = await self.run_process(argv, cwd=os.path.dirname(filepath) or None)
+        self.last_run = stats
+        if stats["exit_code"] != 0:
+            build_cache.discard(staging)
+            return None
+        return build_cache.commit(key, staging)
+
+    async def run_process(self, argv, cwd=None):
+        """Run one tracked child process, stream its output and return exit code / wall time / peak RSS"""
+        print(f"[DEBUG] Executing: {argv}")
+        process = TrackedProcess(argv, cwd=cwd, tty=True)
+        try:
+            await process.start()
+        except FileNotFoundError:
+            self.write_output(f"\r\n❌ Command not found: {argv[0]}\r\n")
+            return {"argv": argv, "exit_code": 127, "wall_time": 0.0, "peak_rss_kb": None}
+        except OSError as e:
+            self.write_output(f"\r\n❌ Cannot start {argv[0]}: {e}\r\n")
+            return {"argv": argv, "exit_code": 126, "wall_time": 0.0, "peak_rss_kb": None}
+
+        return await self.stream_process(process, os.path.basename(argv[0]))
+
+    async def pump_output(self, process, progress):
+        """Stream output the moment it arrives, until EOF on the program's stdout"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        while True:
+            data = await process.stdout.read(65536)
+            if not data:
+                break
+            progress[0] += len(data)
+            await self.write_output_drained(decoder.decode(data))
+
+    async def stream_process(self, process, label):
+        self.proc = process
+        progress = [0]
+        pump = asyncio.create_task(self.pump_output(process, progress))
+
+        try:
+            stats = await process.finish()
+            # The program is gone; what it wrote last is still in the pipe / PTY. Drain until EOF,
+            # or until it goes quiet - a background child may hold stdout open for ever
+            while not pump.done():
+                before = progress[0]
+                await asyncio.wait({pump}, timeout=DRAIN_QUIET_S)
+                if progress[0] == before:
+                    break
+        finally:
+            pump.cancel()
+            if not process.exited:
+                # Cancelled (reset / session closed) - don't leave the program behind
+                process.kill()
+            process.close()
+            self.proc = None
+            self.input_line = ""
+
+        icon = "✅" if stats["exit_code"] == 0 else "❌"
+        if stats["peak_rss_kb"]:
+            rss = f", peak RSS {stats['peak_rss_kb'] / 1024:.1f} MB"
+        elif stats.get("launcher_rss_kb"):
+            rss = f", peak RSS ≤ {stats['launcher_rss_kb'] / 1024:.1f} MB"
+        else:
+            rss = ""
+        self.write_output(
+            f"\r\n{icon} {label} exited with code {stats['exit_code']} "
+            f"in {stats['wall_time']:.3f}s{rss}\r\n"
+        )
+        return stats
+
+    def start_run(self, coro):
+        if self.run_task and not self.run_task.done():
+            coro.close()
+            self.write_output("\r\n⚠️ A program is already running (Ctrl+C to stop it)\r\n")
+            return
+        self.run_task = asyncio.create_task(coro)
+
+    def cancel_run(self):
+        if self.run_task and not self.run_task.done():
+            self.run_task.cancel()
+        self.run_task = None
+
+    def send_run_input(self, msg):
+        """A PTY child gets raw keystrokes; pipes have no line discipline - echo, edit and line-buffer input ourselves"""
+        proc = self.proc
+        if proc.tty:
+            proc.write_tty(msg)
+            return
+        for ch in msg:
+            if ch == "\x03":
+                self.write_output("^C\r\n")
+                proc.interrupt()
+            elif ch == "\x04":
+                proc.stdin.close()
+            elif ch in ("\r", "\n"):
+                self.write_output("\r\n")
+                line, self.input_line = self.input_line, ""
+                if not proc.stdin.is_closing():
+                    proc.stdin.write((line + "\n").encode("utf-8"))
+            elif ch in ("\x7f", "\b"):
+                if self.input_line:
+                    self.input_line = self.input_line[:-1]
+                    self.write_output("\b \b")
+            elif ch >= " ":
+                self.input_line += ch
+                self.write_output(ch)
 
     # ================= RUN CODE =================
-    async def run_code(self, lang, code, ws):
+    async def run_code(self, lang, code, isolated=False):
         ext = self.languages.get(lang)
         if not ext:
-            await ws.send(f"\r\n❌ Unsupported language: {lang}\r\n")
+            self.write_output(f"\r\n❌ Unsupported language: {lang}\r\n")
             return
 
-        fd, path = tempfile.mkstemp(suffix=ext, text=True)
-        try:
-            os.write(fd, code.encode('utf-8'))
-        finally:
-            os.close(fd)
+        # Warm worker unless the caller asked for a cold, fully separate interpreter
+        if not isolated:
+            worker = await warm_pool.take(lang)
+            if worker:
+                await self.run_warm(worker, lang, code)
+                return
 
+        path = self.scratch_file(lang, ext, code)
         self.temp_files.append(path)
 
         if ext in [".html", ".css"]:
             file_url = f"file:///{path.replace(os.sep, '/')}"
             webbrowser.open(file_url)
-            await ws.send(f"\r\n🌐 Browser opened\r\n")
+            self.write_output(f"\r\n🌐 Browser opened\r\n")
             return
 
         # Run the file
-        await self.run_file(lang, path, ws)
+        await self.run_file(lang, path)
 
-    # ================= WS HANDLER =================
-    async def handler(self, ws):
-        print("🔗 Client connected")
+    async def run_warm(self, worker, lang, code):
+        print(f"[DEBUG] Executing on warm {lang} runtime (pid {worker.pid})")
+        data = code.encode("utf-8")
+        worker.stdin.write(str(len(data)).encode() + b"\n" + data)
+        # Wall time counts from the hand-off, not from when the worker was pre-started
+        worker.started = time.perf_counter()
+        self.last_run = await self.stream_process(worker, f"{lang} (warm)")
 
-        if not self.is_active:
-            self.create_pty()
+    def scratch_file(self, lang, ext, code):
+        """Same snippet -> same file, so compiled languages hit the build cache on re-runs"""
+        data = code.encode('utf-8')
+        digest = hashlib.sha256(lang.encode() + b"\0" + data).hexdigest()[:16]
 
-        reader = asyncio.create_task(self.read_pty(ws))
+        if lang == "java":
+            # javac wants the file named after the public class
+            match = re.search(r"public\s+(?:final\s+|abstract\s+)*class\s+(\w+)", code)
+            folder = os.path.join(SCRATCH_DIR, digest)
+            path = os.path.join(folder, (match.group(1) if match else "Main") + ext)
+        else:
+            folder = SCRATCH_DIR
+            path = os.path.join(folder, f"snippet_{digest}{ext}")
 
-        try:
-            async for msg in ws:
-                if msg == "__TERMINAL_RESET__":
-                    self.destroy_pty()
-                    await asyncio.sleep(0.3)
-                    self.create_pty()
-                    await ws.send("\x1b[2J\x1b[H")
-                    continue
+        if not os.path.exists(path):
+            os.makedirs(folder, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        return path
 
-                if msg.startswith("__RUN_FILE__"):
-                    _, lang, filepath = msg.split(":", 2)
-                    await self.run_file(lang.lower(), filepath, ws)
-                    continue
+    # ================= CLIENT =================
+    def attach(self, ws):
+        """Point this shell's output at a (re)connected tab"""
+        self.detach()
+        self.ws = ws
+        self.last_activity = time.time()
+        self.reader_task = asyncio.create_task(self.read_pty(ws))
+        self.resume_reader()
 
-                if msg.startswith("__RUN__"):
-                    header, code = msg[len("__RUN__"):].split(":", 1)
-                    await self.run_code(header.lower(), code, ws)
-                    continue
+    def detach(self, ws=None):
+        if ws is not None and ws is not self.ws:
+            # A newer connection already took this session over
+            return
+        if self.reader_task:
+            self.reader_task.cancel()
+        self.reader_task = None
+        self.batcher = None
+        self.ws = None
+        self.last_activity = time.time()
+        # Nobody is listening - let the kernel buffer fill instead of queueing in memory
+        self.pause_reader()
 
-                # Terminal input - DON'T echo, PTY handles it
-                if self.pty and self.is_active:
-                    # Write to PTY without echoing back
-                    self.pty.write(msg)
-                    await asyncio.sleep(0.01)
+    def write_output(self, text):
+        """Status messages go through the batcher so they stay in order with PTY output"""
+        if self.batcher:
+            self.batcher.feed(text)
 
-        except websockets.exceptions.ConnectionClosed:
-            print("❌ Client disconnected")
-        finally:
-            reader.cancel()
+    async def write_output_drained(self, text):
+        """Like write_output, but waits for a slow client instead of dropping output"""
+        batcher = self.batcher
+        if batcher:
+            await batcher.drained.wait()
+            batcher.feed(text)
+
+    async def handle_message(self, msg):
+        self.last_activity = time.time()
+
+        if msg == "__TERMINAL_RESET__":
             self.destroy_pty()
+            await asyncio.sleep(0.3)
+            await self.create_pty()
+            self.write_output("\x1b[2J\x1b[H")
+            return
+
+        # Shell exited on its own - the next keystroke starts a fresh one
+        if not self.is_active and not self.proc:
+            await self.create_pty()
+            self.write_output("\x1b[2J\x1b[H")
+            return
+
+        if msg.startswith("__RUN_FILE__"):
+            _, lang, filepath = msg.split(":", 2)
+            self.start_run(self.run_file(lang.lower(), filepath))
+            return
+
+        if msg.startswith("__RUN__"):
+            # __RUN__<lang>[;isolated]:<code>
+            header, code = msg[len("__RUN__"):].split(":", 1)
+            lang, _, mode = header.partition(";")
+            self.start_run(self.run_code(lang.lower(), code, isolated=mode.lower() == "isolated"))
+            return
+
+        # A program is running - keystrokes are its stdin, not the shell's
+        if self.proc:
+            self.send_run_input(msg)
+            return
+
+        # Terminal input - DON'T echo, PTY handles it
+        if self.pty and self.is_active:
+            # Write to PTY without echoing back
+            self.pty.write(msg)
 
     # ================= READ PTY =================
-    async def read_pty(self, ws):
-        """Background reader - reads PTY output and sends to client"""
+    def attach_reader(self):
+        """Hook the PTY into the event loop so output is pushed the moment it arrives"""
+        self.reader_loop = asyncio.get_running_loop()
+        if self.output_queue is None:
+            self.output_queue = asyncio.Queue()
+
+        if IS_WINDOWS:
+            # winpty has no selectable fd - park a thread on a blocking read
+            self.reader_thread = threading.Thread(
+                target=self._winpty_reader,
+                args=(self.pty, self.reader_loop, self.output_queue, self.reader_gate),
+                daemon=True
+            )
+            self.reader_thread.start()
+        else:
+            self.reader_fd = self.pty.fileno()
+            self.reader_loop.add_reader(self.reader_fd, self._on_pty_readable, self.pty)
+
+    def detach_reader(self):
+        if self.reader_fd is not None and self.reader_loop:
+            self.reader_loop.remove_reader(self.reader_fd)
+        self.reader_fd = None
+        # winpty thread exits by itself once its PTY is closed
+        self.reader_thread = None
+
+    def pause_reader(self):
+        """Backpressure - stop pulling from the PTY until the client catches up"""
+        self.reader_gate.clear()
+        if self.reader_fd is not None:
+            self.reader_loop.remove_reader(self.reader_fd)
+
+    def resume_reader(self):
+        self.reader_gate.set()
+        if self.reader_fd is not None:
+            self.reader_loop.add_reader(self.reader_fd, self._on_pty_readable, self.pty)
+
+    def _on_pty_readable(self, pty_obj):
+        try:
+            data = pty_obj.read()
+        except Exception as e:
+            print(f"[DEBUG] Read PTY error: {e}")
+            self.detach_reader()
+            self.output_queue.put_nowait((pty_obj, None))
+            return
+        if data:
+            self.output_queue.put_nowait((pty_obj, data))
+
+    def _winpty_reader(self, pty_obj, loop, queue, gate):
         while True:
+            gate.wait()
             try:
-                if self.pty and self.is_active and not self.reading_output:
-                    data = self.pty.read()
-                    if data:
-                        clean = self.clean_output(data)
-                        if clean.strip():
-                            await ws.send(clean)
-                await asyncio.sleep(0.01)
+                data = pty_obj.read(blocking=True)
             except Exception as e:
                 print(f"[DEBUG] Read PTY error: {e}")
-                break
+                loop.call_soon_threadsafe(queue.put_nowait, (pty_obj, None))
+                return
+            if data:
+                loop.call_soon_threadsafe(queue.put_nowait, (pty_obj, data))
+
+    def shell_exited(self):
+        """The shell ended by itself (exit, crash) - tell the tab and wait for a keystroke to respawn"""
+        print(f"💀 Shell exited [{self.session_id}]")
+        self.flush_filter()
+        self.cancel_run()
+        self.detach_reader()
+        try:
+            self.pty.close()
+        except:
+            pass
+        self.pty = None
+        self.is_active = False
+        self.write_output("\r\n\r\n⚠️ Shell exited - press any key to start a new one\r\n")
+
+    async def read_pty(self, ws):
+        """Background reader - waits on the output queue and hands chunks to the batcher"""
+        batcher = OutputBatcher(ws, on_pause=self.pause_reader, on_resume=self.resume_reader)
+        self.batcher = batcher
+        sender = asyncio.create_task(batcher.run())
+        try:
+            while not batcher.closed:
+                pty_obj, data = await self.output_queue.get()
+                if pty_obj is not self.pty:
+                    # Leftover from a PTY that was reset - its shell is gone already
+                    continue
+                if data is None:
+                    self.shell_exited()
+                    continue
+
+                self.last_output_time = self.last_activity = time.time()
+
+                batcher.feed(self.clean_output(data))
+        finally:
+            batcher.close()
+            sender.cancel()
+
+
+# ================= SERVER =================
+class TerminalServer:
+    """Session registry - every terminal tab gets its own shell, keyed by session id"""
+
+    def __init__(self, max_sessions=8, idle_timeout=600):
+        self.sessions = {}
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout  # seconds a detached shell is kept alive
+        self.reaper = None
+
+    def get_session_id(self, ws):
+        """Session id comes from ws://host/session/<id> or ws://host/?session=<id>"""
+        path = getattr(ws, "path", None)
+        if path is None and getattr(ws, "request", None) is not None:
+            path = ws.request.path
+        parsed = urlparse(path or "/")
+
+        query = parse_qs(parsed.query)
+        if query.get("session"):
+            return query["session"][0]
+
+        parts = [p for p in parsed.path.split("/") if p]
+        if len(parts) >= 2 and parts[0] == "session":
+            return parts[1]
+        return None
+
+    def reap_idle_sessions(self):
+        now = time.time()
+        for session_id, session in list(self.sessions.items()):
+            if session.ws is None and now - session.last_activity > self.idle_timeout:
+                self.close_session(session_id)
+
+    def evict_oldest_detached(self):
+        detached = [s for s in self.sessions.values() if s.ws is None]
+        if detached:
+            self.close_session(min(detached, key=lambda s: s.last_activity).session_id)
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        if session:
+            session.detach()
+            session.destroy_pty()
+
+    async def reaper_loop(self):
+        while True:
+            await asyncio.sleep(30)
+            self.reap_idle_sessions()
+
+    # ================= WS HANDLER =================
+    async def handler(self, ws):
+        if self.reaper is None:
+            self.reaper = asyncio.create_task(self.reaper_loop())
+
+        session_id = self.get_session_id(ws)
+        # Old clients without an id get a private shell for this connection only
+        keep_alive = session_id is not None
+        if not keep_alive:
+            session_id = uuid.uuid4().hex
+        session = self.sessions.get(session_id)
+
+        if session is None:
+            if len(self.sessions) >= self.max_sessions:
+                self.evict_oldest_detached()
+            if len(self.sessions) >= self.max_sessions:
+                print(f"⛔ Session limit reached ({self.max_sessions})")
+                await ws.send(f"\r\n❌ Too many terminal sessions (max {self.max_sessions})\r\n")
+                await ws.close(1013, "Too many terminal sessions")
+                return
+            session = TerminalSession(session_id)
+            self.sessions[session_id] = session
+
+        print(f"🔗 Client connected [{session_id}]")
+
+        if not session.is_active:
+            await session.create_pty()
+
+        session.attach(ws)
+
+        try:
+            async for msg in ws:
+                await session.handle_message(msg)
+
+        except websockets.exceptions.ConnectionClosed:
+            print(f"❌ Client disconnected [{session_id}]")
+        finally:
+            # Keep the shell alive for a reconnect - the reaper kills it after idle_timeout
+            session.detach(ws)
+            if not keep_alive:
+                self.close_session(session_id)
 
 
 # ================= START =================
@@ -401,10 +1458,11 @@ server = TerminalServer()
 
 async def main():
     async with websockets.serve(server.handler, "localhost", 8000):
+        warm_pool.start()
         print("🚀 Terminal Server v5 - FIXED ECHO & CURSOR")
         print("🔌 ws://localhost:8000")
         print("✅ Fixed: Double echo, cursor position, 8.3 path support")
         await asyncio.Future()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
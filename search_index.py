@@ -0,0 +1,578 @@
+import os
+import re
+import sys
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from array import array
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants  # Python 3.11+
+except ImportError:
+    import sre_parse
+    import sre_constants
+
+from file_index import path_key
+from hidden import codeflow_folder
+import ignore_rules
+
+# ================= SETTINGS =================
+INDEX_FILE = "search.db"     # inside <project>/.codeflow
+MAX_FILE_KB = 2048           # bigger files (bundles, dumps) are not indexed
+SNIFF_BYTES = 8192           # a NUL byte in here means binary
+MAX_HITS = 2000              # per search
+BATCH_HITS = 100             # hits per push to the UI
+BATCH_SECONDS = 0.1
+PREVIEW_CHARS = 200
+COMMIT_EVERY = 500           # files per transaction while indexing
+COMPACT_NEW_FILES = 5000     # files indexed since the last compaction
+COMPACT_DEAD = 0.25          # share of postings that belong to dead file ids
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    grams BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    gram INTEGER PRIMARY KEY,
+    ids BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fresh (
+    gram INTEGER NOT NULL,
+    batch INTEGER NOT NULL,
+    ids BLOB NOT NULL,
+    PRIMARY KEY (gram, batch)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# ================= TRIGRAMS =================
+def trigrams(data):
+    """Distinct ASCII-case-folded byte trigrams of data as ints (b0 << 16 | b1 << 8 | b2)"""
+    data = data.lower()
+    # Code repeats lines a lot - every distinct line is scanned once.
+    # Grams across the re-joined lines are made up, so queries never use grams with a newline.
+    data = b"\n".join(set(data.split(b"\n")))
+    if len(data) < 4:
+        return {int.from_bytes(data[i:i + 3], "big") for i in range(len(data) - 2)}
+
+    # Every 4-byte window, read four shifted passes at a time as big-endian uint32 in C;
+    # each distinct window gives its two trigrams
+    quads = set()
+    for shift in range(4):
+        words = array("I")
+        words.frombytes(data[shift:shift + (len(data) - shift) // 4 * 4])
+        if sys.byteorder == "little":
+            words.byteswap()
+        quads.update(words)
+    grams = {quad >> 8 for quad in quads}
+    grams.update(quad & 0xFFFFFF for quad in quads)
+    return grams
+
+
+def query_grams(literal, ignore_case):
+    data = literal.encode("utf-8").lower()
+    grams = set()
+    for i in range(len(data) - 2):
+        gram = data[i:i + 3]
+        # Non-ASCII case folding isn't in the index, so those grams can't filter a case-insensitive search
+        if b"\n" in gram or (ignore_case and max(gram) >= 0x80):
+            continue
+        grams.add(int.from_bytes(gram, "big"))
+    return grams
+
+
+def required_literals(pattern, flags):
+    """Literal runs that every match of the regex contains (top-level sequence only)"""
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return []
+    runs, run = [], []
+    for op, arg in parsed:
+        if op == sre_constants.LITERAL:
+            run.append(chr(arg))
+            continue
+        if run:
+            runs.append("".join(run))
+            run = []
+    if run:
+        runs.append("".join(run))
+    return runs
+
+
+def compile_query(query, regex=False, case_sensitive=False):
+    """(pattern, literals every match contains). Raises re.error for a bad regex."""
+    flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+    if not regex:
+        return re.compile(re.escape(query), flags), [query]
+    pattern = re.compile(query, flags)
+    return pattern, required_literals(query, pattern.flags)
+
+
+# ================= INDEX =================
+class SearchIndex:
+    """
+    Trigram index over one project's text files, kept in <project>/.codeflow/search.db.
+    Posting lists map gram -> file ids and are read from SQLite per query gram, never held in
+    memory: compacted lists in postings, files indexed since in fresh - one row per gram for
+    each commit's batch of files. Only the batch being indexed right now is in memory.
+    A changed file gets a new id and the old id simply stops being alive, so updates only
+    append; compact() folds fresh into postings and drops dead ids now and then.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.normpath(root)
+        self.ignore = ignore_rules.for_project(self.root)
+        self.db_file = os.path.join(codeflow_folder(self.root), INDEX_FILE)
+        self.lock = threading.RLock()
+        self.update_lock = threading.Lock()  # one writer (refresh / sync) at a time
+        self.conn = None
+        self.files = {}       # rel path -> (id, mtime_ns, size, digest, gram count)
+        self.paths = {}       # alive id -> rel path
+        self.base_id = 0      # ids up to here are in the postings table
+        self.live = 0         # postings of alive ids
+        self.dead = 0         # postings of dead ids still in postings / fresh
+        self.pending = {}     # gram -> array("I") of ids indexed since the last commit
+        self.stale = set()    # absolute paths the watcher reported
+        self.full_refresh = True
+        self.ready = False
+        self.refresher = None                # background full refresh, if one is running
+        self.stopping = threading.Event()    # set by close() - a refresh stops at the next file
+
+    def connect(self):
+        with self.lock:
+            if self.conn is not None:
+                return
+            if self.stopping.is_set():
+                raise RuntimeError("Search index was closed")
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=10)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            self.load()
+
+    def load(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'base_id'").fetchone()
+        self.base_id = int(row[0]) if row else 0
+        for file_id, rel, mtime_ns, size, digest, count in self.conn.execute(
+                "SELECT id, path, mtime_ns, size, digest, length(grams) / 4 FROM files"):
+            self.files[rel] = (file_id, mtime_ns, size, digest, count)
+            self.paths[file_id] = rel
+            self.live += count
+        if not self.conn.execute("SELECT 1 FROM meta WHERE key = 'fresh'").fetchone():
+            # Index from before the fresh table - files after the last compaction only had their own gram list
+            for file_id, blob in self.conn.execute("SELECT id, grams FROM files WHERE id > ?", (self.base_id,)).fetchall():
+                grams = array("I")
+                grams.frombytes(blob)
+                self.add_postings(file_id, grams)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fresh', '1')")
+            self.commit()
+        total = sum(self.conn.execute("SELECT coalesce(sum(length(ids)), 0) / 4 FROM postings").fetchone()
+                    + self.conn.execute("SELECT coalesce(sum(length(ids)), 0) / 4 FROM fresh").fetchone())
+        self.dead = max(total - self.live, 0)
+
+    def add_postings(self, file_id, grams):
+        pending = self.pending
+        for gram in grams:
+            ids = pending.get(gram)
+            if ids is None:
+                pending[gram] = array("I", (file_id,))
+            else:
+                ids.append(file_id)
+
+    def commit(self):
+        """Write the pending batch as fresh rows (keyed by its first id) and commit"""
+        with self.lock:
+            if self.pending:
+                batch = min(ids[0] for ids in self.pending.values())
+                self.conn.executemany("INSERT OR REPLACE INTO fresh (gram, batch, ids) VALUES (?, ?, ?)",
+                                      ((gram, batch, ids.tobytes()) for gram, ids in sorted(self.pending.items())))
+                self.pending = {}
+            self.conn.commit()
+
+    def close(self):
+        """Stop a running refresh (it finishes the file it's on) and wait for it before closing"""
+        self.stopping.set()
+        refresher = self.refresher
+        if refresher is not None and refresher is not threading.current_thread():
+            refresher.join()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    # ================= UPDATING =================
+    def rel(self, path):
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def skipped(self, rel, is_dir=False):
+        """Inside .codeflow, ignored itself or inside an ignored folder"""
+        return rel.split("/")[0] in ("..", ".codeflow") or self.ignore.ignored_path(rel, is_dir)
+
+    def walk(self, folder):
+        """(rel, full path, stat) for every indexable file under folder"""
+        top = self.rel(folder)
+        stack = [(folder, "" if top == "." else top + "/")]
+        while stack:
+            current, prefix = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        rel = prefix + entry.name
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if rel != ".codeflow" and not self.ignore.ignored(rel, True):
+                                    stack.append((entry.path, rel + "/"))
+                            elif entry.is_file() and not self.ignore.ignored(rel):
+                                st = entry.stat()
+                                if st.st_size <= MAX_FILE_KB * 1024:
+                                    yield rel, entry.path, st
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def update_file(self, rel, full, st):
+        """Index one file if its mtime/size changed and its content hash too. Returns 1 if re-indexed."""
+        known = self.files.get(rel)
+        if known and known[1] == st.st_mtime_ns and known[2] == st.st_size:
+            return 0
+        try:
+            with open(full, "rb") as f:
+                data = f.read(MAX_FILE_KB * 1024 + 1)
+        except OSError:
+            self.drop([rel])
+            return 0
+        if len(data) > MAX_FILE_KB * 1024 or b"\0" in data[:SNIFF_BYTES]:
+            self.drop([rel])
+            return 0
+
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if known and known[3] == digest:
+            # Touched, not changed
+            with self.lock:
+                self.files[rel] = (known[0], st.st_mtime_ns, st.st_size, digest, known[4])
+                self.conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                                  (st.st_mtime_ns, st.st_size, known[0]))
+            return 0
+
+        grams = array("I", sorted(trigrams(data)))
+        with self.lock:
+            if known:
+                self.forget(rel)
+            cursor = self.conn.execute(
+                "INSERT INTO files (path, mtime_ns, size, digest, grams) VALUES (?, ?, ?, ?, ?)",
+                (rel, st.st_mtime_ns, st.st_size, digest, grams.tobytes()),
+            )
+            file_id = cursor.lastrowid
+            self.files[rel] = (file_id, st.st_mtime_ns, st.st_size, digest, len(grams))
+            self.paths[file_id] = rel
+            self.add_postings(file_id, grams)
+            self.live += len(grams)
+        return 1
+
+    def forget(self, rel):
+        known = self.files.pop(rel, None)
+        if known is None:
+            return
+        self.paths.pop(known[0], None)
+        self.conn.execute("DELETE FROM files WHERE id = ?", (known[0],))
+        self.live -= known[4]
+        self.dead += known[4]
+
+    def drop(self, rels):
+        with self.lock:
+            for rel in rels:
+                self.forget(rel)
+
+    def drop_tree(self, rel):
+        with self.lock:
+            self.drop([r for r in self.files if r == rel or r.startswith(rel + "/")])
+
+    def refresh(self):
+        """Walk the whole project and re-index whatever changed since the last run"""
+        with self.update_lock:
+            if self.stopping.is_set():
+                return
+            self.connect()
+            with self.lock:
+                self.stale.clear()
+                self.full_refresh = False
+            started = time.perf_counter()
+            seen = set()
+            changed = 0
+            for rel, full, st in self.walk(self.root):
+                if self.stopping.is_set():
+                    # Closing - keep what's done, the next open carries on from there
+                    self.commit()
+                    return
+                seen.add(rel)
+                changed += self.update_file(rel, full, st)
+                if changed and changed % COMMIT_EVERY == 0:
+                    self.commit()
+            with self.lock:
+                gone = [rel for rel in self.files if rel not in seen]
+                self.drop(gone)
+                self.commit()
+            self.ready = True
+            self.maybe_compact()
+            print(f"🔎 Search index: {len(seen)} files, {changed} re-indexed, {len(gone)} removed "
+                  f"in {time.perf_counter() - started:.2f}s")
+
+    def start_refresh(self):
+        """Full refresh on its own thread, unless one is running already"""
+        with self.lock:
+            if self.stopping.is_set() or (self.refresher is not None and self.refresher.is_alive()):
+                return
+            self.refresher = threading.Thread(target=self.refresh, daemon=True)
+            self.refresher.start()
+
+    @property
+    def refreshing(self):
+        return self.refresher is not None and self.refresher.is_alive()
+
+    def notify(self, deltas, rules_changed=False):
+        """fs_watcher deltas -> paths to look at again before the next search"""
+        with self.lock:
+            if rules_changed:
+                # A .gitignore changed - what is indexed at all may have changed anywhere
+                self.full_refresh = True
+            for delta in deltas:
+                if delta["type"] == "reset":
+                    self.full_refresh = True
+                for key in ("path", "old_path"):
+                    path = delta.get(key)
+                    if path and path_key(path).startswith(path_key(self.root)):
+                        self.stale.add(path)
+
+    def sync(self):
+        """Apply watcher changes. Never waits for a full refresh - searches use what's there meanwhile."""
+        if not self.ready or self.update_lock.locked():
+            return
+        if self.full_refresh:
+            self.start_refresh()
+            return
+        with self.update_lock:
+            with self.lock:
+                paths, self.stale = self.stale, set()
+            for path in paths:
+                self.update_path(path)
+            self.commit()
+
+    def update_path(self, path):
+        rel = self.rel(path)
+        if rel == "." or rel.split("/")[0] in ("..", ".codeflow"):
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.drop_tree(rel)
+            return
+        if os.path.isdir(path):
+            if self.skipped(rel, True):
+                return
+            seen = set()
+            for sub_rel, full, sub_st in self.walk(path):
+                seen.add(sub_rel)
+                self.update_file(sub_rel, full, sub_st)
+            with self.lock:
+                self.drop([r for r in self.files if r.startswith(rel + "/") and r not in seen])
+        elif self.skipped(rel) or st.st_size > MAX_FILE_KB * 1024:
+            self.drop([rel])
+        else:
+            self.update_file(rel, path, st)
+
+    def maybe_compact(self):
+        with self.lock:
+            new_files = sum(1 for file_id in self.paths if file_id > self.base_id)
+            total = self.live + self.dead
+            if new_files >= COMPACT_NEW_FILES or (total and self.dead / total >= COMPACT_DEAD):
+                self.compact()
+
+    def compact(self):
+        """Fold fresh rows into the posting lists and drop dead ids - one gram's list in memory at a time"""
+        with self.lock:
+            self.commit()
+            alive = self.paths
+            conn = self.conn
+            grams = [gram for (gram,) in conn.execute("SELECT gram FROM postings UNION SELECT gram FROM fresh").fetchall()]
+            for gram in grams:
+                ids = self.posting_list(gram)
+                kept = array("I", filter(alive.__contains__, ids))
+                if kept:
+                    conn.execute("INSERT OR REPLACE INTO postings (gram, ids) VALUES (?, ?)", (gram, kept.tobytes()))
+                else:
+                    conn.execute("DELETE FROM postings WHERE gram = ?", (gram,))
+            conn.execute("DELETE FROM fresh")
+            self.base_id = max(alive, default=self.base_id)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('base_id', ?)", (str(self.base_id),))
+            conn.commit()
+            self.dead = 0
+
+    def posting_list(self, gram):
+        """Ids of every file (alive or not) that has gram - compacted list, fresh batches, pending batch"""
+        ids = array("I")
+        for (blob,) in self.conn.execute("SELECT ids FROM postings WHERE gram = ? UNION ALL "
+                                         "SELECT ids FROM fresh WHERE gram = ?", (gram, gram)):
+            ids.frombytes(blob)
+        ids.extend(self.pending.get(gram, ()))
+        return ids
+
+    # ================= SEARCH =================
+    def candidates(self, grams):
+        """Rel paths of alive files that contain every gram"""
+        with self.lock:
+            if not grams:
+                return sorted(self.paths.values())
+            lists = []
+            for gram in grams:
+                ids = self.posting_list(gram)
+                if not ids:
+                    return []
+                lists.append(ids)
+            lists.sort(key=len)
+            ids = set(lists[0])
+            for other in lists[1:]:
+                if not ids:
+                    break
+                ids.intersection_update(other)
+            return sorted(self.paths[i] for i in ids if i in self.paths)
+
+    def search(self, pattern, literals, max_hits=MAX_HITS, cancelled=lambda: False, stats=None):
+        """Yield {path, line, column, length, text} hits, files in path order"""
+        self.connect()
+        self.sync()
+        ignore_case = bool(pattern.flags & re.IGNORECASE)
+        grams = set()
+        for literal in literals:
+            grams |= query_grams(literal, ignore_case)
+
+        started = time.perf_counter()
+        candidates = self.candidates(grams)
+        stats = stats if stats is not None else {}
+        stats.update(candidates=len(candidates), files_searched=0, hits=0,
+                     lookup_ms=round((time.perf_counter() - started) * 1000, 2))
+
+        for rel in candidates:
+            if cancelled():
+                return
+            full = os.path.join(self.root, *rel.split("/"))
+            try:
+                with open(full, "rb") as f:
+                    text = f.read().decode("utf-8", errors="replace")
+            except OSError:
+                continue
+            stats["files_searched"] += 1
+
+            line, pos = 1, 0
+            for match in pattern.finditer(text):
+                start = match.start()
+                if match.end() == start:
+                    continue
+                line += text.count("\n", pos, start)
+                pos = start
+                line_start = text.rfind("\n", 0, start) + 1
+                line_end = text.find("\n", start)
+                if line_end == -1:
+                    line_end = len(text)
+                yield {
+                    "path": full,
+                    "line": line,
+                    "column": start - line_start + 1,
+                    "length": match.end() - start,
+                    "text": text[line_start:line_end][:PREVIEW_CHARS],
+                }
+                stats["hits"] += 1
+                if stats["hits"] >= max_hits:
+                    stats["truncated"] = True
+                    return
+
+
+# ================= REGISTRY =================
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(root):
+    """Index for the open project (switching projects closes the old one), refreshed in the background once"""
+    key = path_key(root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            for old in _indexes.values():
+                old.close()
+            _indexes.clear()
+            index = _indexes[key] = SearchIndex(root)
+            index.start_refresh()
+        return index
+
+
+def notify(deltas, rules_changed=False):
+    with _indexes_lock:
+        indexes = list(_indexes.values())
+    for index in indexes:
+        index.notify(deltas, rules_changed)
+
+
+# ================= STREAMED SEARCHES =================
+_searches = {}  # search_id -> cancel event
+_searches_lock = threading.Lock()
+
+
+def start_search(root, query, on_batch, regex=False, case_sensitive=False, max_hits=MAX_HITS, search_id=None):
+    """
+    Run a search on its own thread. on_batch(search_id, hits, done, info) gets hits as they
+    are found; info (timings, counts) comes with the last call. A new search cancels the previous one.
+    """
+    pattern, literals = compile_query(query, regex, case_sensitive)
+    search_id = search_id or uuid.uuid4().hex[:12]
+    cancel = threading.Event()
+    with _searches_lock:
+        for other in _searches.values():
+            other.set()
+        _searches[search_id] = cancel
+
+    def run():
+        started = time.perf_counter()
+        stats = {}
+        batch = []
+        last_push = started
+        try:
+            index = get_index(root)
+            for hit in index.search(pattern, literals, max_hits, cancel.is_set, stats):
+                batch.append(hit)
+                now = time.perf_counter()
+                if len(batch) >= BATCH_HITS or now - last_push >= BATCH_SECONDS:
+                    on_batch(search_id, batch, False, None)
+                    batch, last_push = [], now
+            if not cancel.is_set():
+                stats.update(status="ok", indexing=not index.ready or index.refreshing,
+                             elapsed_ms=round((time.perf_counter() - started) * 1000, 1))
+                on_batch(search_id, batch, True, stats)
+        except Exception as e:
+            on_batch(search_id, batch, True, {"status": "error", "message": str(e)})
+        finally:
+            with _searches_lock:
+                _searches.pop(search_id, None)
+
+    threading.Thread(target=run, daemon=True).start()
+    return search_id
+
+
+def cancel_search(search_id):
+    with _searches_lock:
+        cancel = _searches.get(search_id)
+    if cancel is not None:
+        cancel.set()
+    return cancel is not None
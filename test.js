@@ -206,6 +206,13 @@ class TabManager {
     removeTab(tabId) {
         for (const [path, tab] of this.tabs) {
             if (tab.id === tabId) {
+                if (window.pywebview && window.pywebview.api) {
+                    if (tab.windowed) {
+                        window.pywebview.api.close_file_window(path);
+                    } else {
+                        window.pywebview.api.close_document(path);
+                    }
+                }
                 if (tab.editorInstance) {
                     tab.editorInstance.dispose();
                     this.editorInstances.delete(tabId);
@@ -334,7 +341,8 @@ let searchState = {
     active: false,
     currentSearch: '',
     searchResults: [],
-    currentResultIndex: -1
+    currentResultIndex: -1,
+    quickOpenPartial: false   // file names shown are the backend's first, partial ranking
 };
 
 // ========== DOM ELEMENTS ==========
@@ -394,6 +402,10 @@ let searchAddon = null;
 let wsConnection = null;
 let wsRetryCount = 0;
 const MAX_WS_RETRIES = 5;
+// Backend keeps one shell per session id - reconnects resume the same shell
+const terminalSessionId = (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : Date.now().toString(36) + Math.random().toString(36).slice(2);
 let terminalReady = false;
 let terminalKilled = false;
 let terminalRestarting = false;
@@ -788,7 +800,7 @@ function connectToWebSocket() {
     wsRetryCount++;
     
     try {
-        const wsUrl = 'ws://localhost:8000';
+        const wsUrl = `ws://localhost:8000/session/${terminalSessionId}`;
         wsConnection = new WebSocket(wsUrl);
         
         wsConnection.onopen = () => {
@@ -1489,15 +1501,25 @@ async function pasteItems(destinationPath) {
 
         if (result && result.status === 'ok') {
             const action = clipboardState.type === 'cut' ? 'Moved' : 'Copied';
-            showClipboardStatus(`${action} ${result.moved ? result.moved.length : result.copied.length} item(s)`, 'info');
             
             if (clipboardState.type === 'cut') {
                 clipboardState = { type: null, items: [], sourcePath: null };
                 updatePasteMenuItem();
             }
             
+            // Copy/move runs in the background - follow its progress
+            const job = await waitForFileJob(result.job_id, action === 'Moved' ? 'Moving' : 'Copying');
             await renderFileTree();
-            return true;
+            if (job.state === 'done') {
+                showClipboardStatus(`${action} ${job.results.length} item(s)`, 'info');
+                return true;
+            }
+            if (job.state === 'cancelled') {
+                showClipboardStatus(`${action === 'Moved' ? 'Move' : 'Copy'} cancelled`, 'error');
+            } else {
+                showClipboardStatus(job.errors[0] || 'Error pasting items', 'error');
+            }
+            return false;
         } else {
             showClipboardStatus(result?.message || 'Error pasting items', 'error');
             return false;
@@ -1509,6 +1531,44 @@ async function pasteItems(destinationPath) {
     }
 }
 
+// ========== BACKGROUND FILE JOBS ==========
+let activeFileJobId = null;
+
+function formatBytes(bytes) {
+    if (bytes >= 1073741824) return (bytes / 1073741824).toFixed(1) + ' GB';
+    if (bytes >= 1048576) return (bytes / 1048576).toFixed(1) + ' MB';
+    if (bytes >= 1024) return (bytes / 1024).toFixed(0) + ' KB';
+    return bytes + ' B';
+}
+
+// Poll a copy/move job until it finishes. Escape cancels it.
+async function waitForFileJob(jobId, label) {
+    activeFileJobId = jobId;
+    try {
+        while (true) {
+            const job = await window.pywebview.api.get_file_job(jobId);
+            if (!job || job.status !== 'ok') {
+                return { state: 'error', results: [], errors: [job?.message || 'Lost track of file job'] };
+            }
+            if (job.state !== 'queued' && job.state !== 'running') {
+                return job;
+            }
+            if (job.total_bytes > 0) {
+                showClipboardStatus(`${label}… ${job.percent}% (${formatBytes(job.done_bytes)} / ${formatBytes(job.total_bytes)}) - Esc to cancel`, 'info');
+            }
+            await new Promise(resolve => setTimeout(resolve, 250));
+        }
+    } finally {
+        activeFileJobId = null;
+    }
+}
+
+document.addEventListener('keydown', (e) => {
+    if (e.key === 'Escape' && activeFileJobId && window.pywebview && window.pywebview.api) {
+        window.pywebview.api.cancel_file_job(activeFileJobId);
+    }
+});
+
 async function deleteItems(paths) {
     if (!paths || paths.length === 0) {
         showClipboardStatus('No items selected for deletion', 'error');
@@ -1522,19 +1582,42 @@ async function deleteItems(paths) {
         return false;
     }
 
+    // node_modules, venv, build output ... can skip the trash - they are regenerated anyway
+    const ignoredPaths = paths.filter(path => findTreeNode(currentFileSystem, path)?.ignored);
+    let permanentPaths = [];
+    if (ignoredPaths.length > 0) {
+        const names = ignoredPaths.map(path => path.split(/[\\/]/).pop()).join(', ');
+        if (confirm(`Delete ${names} permanently instead of moving to trash? (much faster)`)) {
+            permanentPaths = ignoredPaths;
+        }
+    }
+    const trashPaths = paths.filter(path => !permanentPaths.includes(path));
+
     try {
         if (!window.pywebview || !window.pywebview.api) {
             showClipboardStatus('Backend not connected', 'error');
             return false;
         }
 
-        const result = await window.pywebview.api.delete_file(paths);
-        if (result && result.status === 'ok') {
-            showClipboardStatus(`Deleted ${result.deleted.length} item(s)`, 'info');
+        const calls = [];
+        if (trashPaths.length > 0) calls.push(window.pywebview.api.delete_file(trashPaths));
+        if (permanentPaths.length > 0) calls.push(window.pywebview.api.delete_file(permanentPaths, true));
+        const results = await Promise.all(calls);
+
+        const deleted = results.flatMap(r => r?.deleted || []);
+        const failed = results.flatMap(r => r?.failed || []);
+        if (deleted.length > 0) {
             await renderFileTree();
+        }
+        if (failed.length === 0 && results.every(r => r && r.status === 'ok')) {
+            showClipboardStatus(`Deleted ${deleted.length} item(s)`, 'info');
             return true;
+        } else if (deleted.length > 0) {
+            showClipboardStatus(`Deleted ${deleted.length} item(s), ${failed.length} failed: ${failed[0].message}`, 'error');
+            return false;
         } else {
-            showClipboardStatus(result?.message || 'Error deleting items', 'error');
+            const failedResult = results.find(r => !r || r.status !== 'ok');
+            showClipboardStatus(failedResult?.message || 'Error deleting items', 'error');
             return false;
         }
     } catch (error) {
@@ -1615,96 +1698,134 @@ function setupGlobalSearch() {
 
 async function performGlobalSearch(searchTerm) {
     try {
-        // Search in current file system
+        // File names - fuzzy ranked by the backend quick-open index
         const results = [];
-        
-        function searchInTree(item, path = '') {
-            const currentPath = path ? `${path}/${item.name}` : item.name;
-            
-            // Check if item name contains search term
-            if (item.name.toLowerCase().includes(searchTerm.toLowerCase())) {
-                results.push({
-                    type: item.type,
-                    name: item.name,
-                    path: currentPath,
-                    fullPath: item.path
-                });
+        if (window.pywebview && window.pywebview.api) {
+            const requestId = `open-${++quickOpenCounter}`;
+            activeQuickOpenId = requestId;
+            const response = await window.pywebview.api.quick_open(searchTerm, QUICK_OPEN_LIMIT, requestId);
+            if (searchState.currentSearch !== searchTerm || activeQuickOpenId !== requestId) return; // typed on / closed meanwhile
+            searchState.quickOpenPartial = false;
+            if (response && response.status === 'ok') {
+                results.push(...response.results.map(quickOpenResult));
+                searchState.quickOpenPartial = !!response.partial;
             }
-            
-            // Search in file contents for files
-            if (item.type === 'file' && 
-                (item.name.endsWith('.js') || item.name.endsWith('.py') || 
-                 item.name.endsWith('.html') || item.name.endsWith('.css') ||
-                 item.name.endsWith('.json') || item.name.endsWith('.txt'))) {
-                
-                // In a real implementation, you would search file contents here
-                // For now, we'll just search in open editor tabs
-                const openTab = tabManager.getTabByPath(item.path);
-                if (openTab) {
-                    const editor = tabManager.getEditorInstance(openTab.id);
-                    if (editor) {
-                        const content = editor.getValue();
-                        if (content.toLowerCase().includes(searchTerm.toLowerCase())) {
-                            results.push({
-                                type: 'content',
-                                name: item.name,
-                                path: currentPath,
-                                fullPath: item.path,
-                                matches: content.split('\n').filter(line => 
-                                    line.toLowerCase().includes(searchTerm.toLowerCase())
-                                ).length
-                            });
-                        }
-                    }
-                }
-            }
-            
-            // Recursively search in children
-            if (item.children) {
-                item.children.forEach(child => {
-                    searchInTree(child, currentPath);
-                });
-            }
-        }
-        
-        if (currentFileSystem) {
-            searchInTree(currentFileSystem);
         }
         
-        // Also search in open tabs
-        tabManager.getAllTabs().forEach(tab => {
-            const editor = tabManager.getEditorInstance(tab.id);
-            if (editor) {
-                const content = editor.getValue();
-                if (content.toLowerCase().includes(searchTerm.toLowerCase())) {
-                    if (!results.some(r => r.fullPath === tab.path)) {
-                        results.push({
-                            type: 'content',
-                            name: tab.name,
-                            path: tab.path,
-                            fullPath: tab.path,
-                            matches: content.split('\n').filter(line => 
-                                line.toLowerCase().includes(searchTerm.toLowerCase())
-                            ).length
-                        });
-                    }
-                }
-            }
-        });
-        
         searchState.searchResults = results;
         searchState.currentResultIndex = results.length > 0 ? 0 : -1;
         
         displaySearchResults(results);
+
+        // File contents come from the backend index, streamed in below the name matches
+        startContentSearch(searchTerm);
         
     } catch (error) {
         console.error('Search error:', error);
     }
 }
 
+// ========== QUICK OPEN (fuzzy file names) ==========
+const QUICK_OPEN_LIMIT = 30;
+let quickOpenCounter = 0;
+let activeQuickOpenId = null;
+
+function quickOpenResult(match) {
+    return {
+        type: 'file',
+        name: match.name,
+        path: match.rel,
+        fullPath: match.path,
+        highlight: match.positions
+    };
+}
+
+function highlightMatch(text, positions) {
+    const marked = new Set(positions);
+    return Array.from(text, (ch, i) => marked.has(i)
+        ? `<span style="color: var(--accent-blue); font-weight: 600;">${escapeHtml(ch)}</span>`
+        : escapeHtml(ch)).join('');
+}
+
+// Full ranking, when the first answer only covered part of a big project
+window.onQuickOpenResults = (requestId, matches) => {
+    if (requestId !== activeQuickOpenId) return;
+    const lines = searchState.searchResults.filter(r => r.type === 'line');
+    searchState.quickOpenPartial = false;
+    searchState.searchResults = [...matches.map(quickOpenResult), ...lines];
+    searchState.currentResultIndex = searchState.searchResults.length > 0 ? 0 : -1;
+    displaySearchResults(searchState.searchResults);
+};
+
+// ========== PROJECT CONTENT SEARCH (streamed) ==========
+const CONTENT_SEARCH_DELAY = 150;
+const CONTENT_SEARCH_MAX_HITS = 500;
+let contentSearchTimer = null;
+let contentSearchCounter = 0;
+let activeSearchId = null;
+
+function escapeHtml(text) {
+    return String(text).replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+}
+
+function startContentSearch(searchTerm) {
+    clearTimeout(contentSearchTimer);
+    if (activeSearchId && window.pywebview && window.pywebview.api) {
+        window.pywebview.api.cancel_search(activeSearchId);
+    }
+    activeSearchId = null;
+
+    contentSearchTimer = setTimeout(async () => {
+        if (!window.pywebview || !window.pywebview.api || searchState.currentSearch !== searchTerm) return;
+        // Our own id, so hits pushed before this call returns are still recognised
+        const searchId = `search-${++contentSearchCounter}`;
+        activeSearchId = searchId;
+        const result = await window.pywebview.api.search_project(searchTerm, false, false, CONTENT_SEARCH_MAX_HITS, searchId);
+        if (!result || result.status !== 'ok') {
+            console.warn('Search failed:', result?.message);
+        }
+    }, CONTENT_SEARCH_DELAY);
+}
+
+window.onSearchResults = (searchId, hits, done, info) => {
+    if (searchId !== activeSearchId) return;
+
+    hits.forEach(hit => {
+        const fileName = hit.path.split(/[\\/]/).pop();
+        searchState.searchResults.push({
+            type: 'line',
+            name: `${fileName}:${hit.line}`,
+            fileName,
+            path: hit.text.trim(),
+            fullPath: hit.path,
+            line: hit.line,
+            column: hit.column,
+            length: hit.length
+        });
+    });
+    if (searchState.currentResultIndex < 0 && searchState.searchResults.length > 0) {
+        searchState.currentResultIndex = 0;
+    }
+    if (hits.length > 0) {
+        displaySearchResults(searchState.searchResults);
+    }
+
+    if (done) {
+        activeSearchId = null;
+        if (info && info.status === 'error') {
+            console.warn('Search failed:', info.message);
+        } else if (info) {
+            console.log(`🔎 ${info.hits} hit(s) in ${info.files_searched}/${info.candidates} file(s), ${info.elapsed_ms} ms${info.indexing ? ' (still indexing)' : ''}`);
+        }
+    }
+};
+
 function displaySearchResults(results) {
-    // Clear previous results
-    clearSearchResults();
+    // Clear previous results (just the dropdown - streamed hits keep arriving into searchState)
+    const existingResults = document.querySelector('.search-results');
+    if (existingResults) {
+        existingResults.remove();
+    }
     
     if (results.length === 0) {
         return;
@@ -1722,15 +1843,23 @@ function displaySearchResults(results) {
     dropdown.style.overflowY = 'auto';
     dropdown.style.zIndex = '10000';
     
+    if (searchState.quickOpenPartial) {
+        // First answer only ranked part of the project - the full list replaces it when it's in
+        const note = document.createElement('div');
+        note.style.cssText = 'padding: 4px 12px; font-size: 10px; color: var(--text-muted);';
+        note.textContent = 'Ranking more files…';
+        dropdown.appendChild(note);
+    }
+    
     results.forEach((result, index) => {
         const item = document.createElement('div');
         item.className = `dropdown-item ${index === searchState.currentResultIndex ? 'selected' : ''}`;
         item.innerHTML = `
             <div style="display: flex; align-items: center; gap: 8px;">
-                ${getFileIconSVG(result.type === 'folder' ? 'folder' : result.name.split('.').pop())}
-                <div style="flex: 1;">
-                    <div style="font-weight: 500;">${result.name}</div>
-                    <div style="font-size: 10px; color: var(--text-muted);">${result.path}</div>
+                ${getFileIconSVG(result.type === 'folder' ? 'folder' : (result.fileName || result.name).split('.').pop())}
+                <div style="flex: 1; min-width: 0;">
+                    <div style="font-weight: 500;">${escapeHtml(result.name)}</div>
+                    <div style="font-size: 10px; color: var(--text-muted); white-space: nowrap; overflow: hidden; text-overflow: ellipsis;">${result.highlight ? highlightMatch(result.path, result.highlight) : escapeHtml(result.path)}</div>
                     ${result.matches ? `<div style="font-size: 10px; color: var(--accent-blue);">${result.matches} matches</div>` : ''}
                 </div>
             </div>
@@ -1752,9 +1881,26 @@ function openSearchResult(index) {
     
     const result = searchState.searchResults[index];
     
-    if (result.type === 'folder' || result.type === 'file') {
-        // Navigate to file/folder in explorer
+    if (result.type === 'folder') {
+        // Navigate to folder in explorer
         openFileInExplorer(result.fullPath);
+    } else if (result.type === 'file') {
+        openFileInEditor(result.name, result.fullPath);
+    } else if (result.type === 'line') {
+        openFileInEditor(result.fileName, result.fullPath).then(() => {
+            const activeTab = tabManager.getActiveTab();
+            const editor = activeTab && tabManager.getEditorInstance(activeTab.id);
+            if (editor) {
+                editor.revealLineInCenter(result.line);
+                editor.setSelection({
+                    startLineNumber: result.line,
+                    startColumn: result.column,
+                    endLineNumber: result.line,
+                    endColumn: result.column + result.length
+                });
+                editor.focus();
+            }
+        });
     } else if (result.type === 'content') {
         // Open file in editor and focus search
         openFileInEditor(result.name, result.fullPath).then(() => {
@@ -1797,24 +1943,40 @@ function navigateSearchResults(direction) {
 }
 
 function clearSearchResults() {
+    activeQuickOpenId = null;
+    clearTimeout(contentSearchTimer);
+    if (activeSearchId && window.pywebview && window.pywebview.api) {
+        window.pywebview.api.cancel_search(activeSearchId);
+    }
+    activeSearchId = null;
     const existingResults = document.querySelector('.search-results');
     if (existingResults) {
         existingResults.remove();
     }
     searchState.searchResults = [];
     searchState.currentResultIndex = -1;
+    searchState.quickOpenPartial = false;
 }
 
 function openFileInExplorer(fullPath) {
-    // Find and expand the tree item
-    function expandTreeItem(item, path) {
+    const normalize = p => p.replace(/\\/g, '/');
+    const target = normalize(fullPath);
+
+    // Find and expand the tree item - only folders on the way to the target
+    async function expandTreeItem(item, path) {
+        const itemPath = normalize(item.path);
+        if (itemPath !== path && !path.startsWith(itemPath + '/')) {
+            return false;
+        }
+
         const treeItem = document.querySelector(`.tree-item[data-path="${item.path}"]`);
         if (treeItem) {
             if (item.type === 'folder' && !item.open) {
                 treeItem.click(); // Expand folder
+                await treeItem.expanding; // Children are fetched on demand
             }
             
-            if (item.path === path) {
+            if (itemPath === path) {
                 treeItem.click(); // Select item
                 treeItem.scrollIntoView({ block: 'center' });
                 return true;
@@ -1823,7 +1985,7 @@ function openFileInExplorer(fullPath) {
             // Search in children
             if (item.children) {
                 for (const child of item.children) {
-                    if (expandTreeItem(child, path)) {
+                    if (await expandTreeItem(child, path)) {
                         return true;
                     }
                 }
@@ -1833,7 +1995,7 @@ function openFileInExplorer(fullPath) {
     }
     
     if (currentFileSystem) {
-        expandTreeItem(currentFileSystem, fullPath);
+        expandTreeItem(currentFileSystem, target);
     }
 }
 
@@ -2013,6 +2175,48 @@ function getFileIconSVG(extension) {
 }
 
 // ========== FILE SYSTEM FUNCTIONS ==========
+const TREE_PAGE_SIZE = 200;
+
+// Fetch the next page of a folder's direct children (first page if not loaded yet)
+async function loadFolderPage(item) {
+    const cursor = item.loaded ? item.next_cursor : 0;
+    if (cursor === null || cursor === undefined) return;
+
+    const page = await window.pywebview.api.list_directory(item.path, cursor, TREE_PAGE_SIZE);
+    if (!page || page.status !== 'ok') {
+        throw new Error(page ? page.message : 'No response from list_directory');
+    }
+    if (!item.loaded) {
+        item.children = [];
+        item.loaded = true;
+    }
+    item.children.push(...page.children);
+    item.next_cursor = page.next_cursor;
+    // list_directory sends has_children: null for folders it hasn't listed yet
+    item.has_children = page.total > 0;
+}
+
+function renderFolderChildren(item, treeItem, level, from = 0) {
+    item.children.slice(from).forEach(child => {
+        renderTreeItem(child, treeItem, level + 1);
+    });
+
+    if (item.next_cursor !== null && item.next_cursor !== undefined) {
+        const more = document.createElement('div');
+        more.className = 'tree-load-more';
+        more.style.setProperty('--level', level + 1);
+        more.innerHTML = `<div class="item-content"><span class="item-name">Load more…</span></div>`;
+        more.addEventListener('click', async (e) => {
+            e.stopPropagation();
+            const start = item.children.length;
+            more.remove();
+            await loadFolderPage(item);
+            renderFolderChildren(item, treeItem, level, start);
+        });
+        treeItem.appendChild(more);
+    }
+}
+
 async function renderFileTree() {
     try {
         if (!window.pywebview || !window.pywebview.api) {
@@ -2020,16 +2224,117 @@ async function renderFileTree() {
             return;
         }
         
-        const response = await window.pywebview.api.get_folder_structure();
-        currentFileSystem = response;
+        // Only the top level - deeper folders are listed when expanded
+        const response = await window.pywebview.api.list_directory(null, 0, TREE_PAGE_SIZE);
+        if (!response || response.status !== 'ok') {
+            throw new Error(response ? response.message : 'No response from list_directory');
+        }
+        currentFileSystem = {
+            name: response.name,
+            path: response.path,
+            type: 'folder',
+            has_children: response.total > 0,
+            children: response.children,
+            next_cursor: response.next_cursor,
+            loaded: true
+        };
         treeContainer.innerHTML = '';
         renderTreeItem(currentFileSystem, treeContainer, 0);
+
+        // Changes from the terminal, git or AI edits arrive as deltas (see applyFsDeltas)
+        window.pywebview.api.watch_project(currentFileSystem.path);
     } catch (error) {
         console.error('Error rendering file tree:', error);
         showClipboardStatus('Error loading file tree', 'error');
     }
 }
 
+// ========== FILE WATCHER DELTAS ==========
+function parentPathOf(path) {
+    return path.replace(/[\\/][^\\/]*$/, '');
+}
+
+// Loaded node for path, or null if it (or a folder above it) was never expanded
+function findTreeNode(item, path) {
+    if (!item) return null;
+    if (item.path === path) return item;
+    if (!item.loaded || !item.children) return null;
+    for (const child of item.children) {
+        if (path === child.path || path.startsWith(child.path + '/') || path.startsWith(child.path + '\\')) {
+            return findTreeNode(child, path);
+        }
+    }
+    return null;
+}
+
+function insertTreeNode(parent, node) {
+    parent.has_children = true;
+    if (!parent.loaded || parent.children.some(c => c.path === node.path)) return false;
+
+    // Same order as list_directory - folders first, then by name
+    const rank = n => (n.type === 'folder' ? '0' : '1') + n.name.toLowerCase();
+    const index = parent.children.findIndex(c => rank(c) > rank(node));
+    parent.children.splice(index === -1 ? parent.children.length : index, 0, node);
+    return true;
+}
+
+function removeTreeNode(path) {
+    const parent = findTreeNode(currentFileSystem, parentPathOf(path));
+    if (!parent || !parent.loaded) return false;
+    const before = parent.children.length;
+    parent.children = parent.children.filter(c => c.path !== path);
+    return parent.children.length !== before;
+}
+
+window.applyFsDeltas = async function (deltas) {
+    if (!currentFileSystem) return;
+    let changed = false;
+    const reload = [];
+
+    for (const delta of deltas) {
+        if (delta.type === 'reset') {
+            renderFileTree();
+            return;
+        }
+        if (delta.type === 'remove') {
+            changed = removeTreeNode(delta.path) || changed;
+        } else if (delta.type === 'rename') {
+            changed = removeTreeNode(delta.old_path) || changed;
+            const parent = delta.node && findTreeNode(currentFileSystem, parentPathOf(delta.path));
+            if (parent) changed = insertTreeNode(parent, delta.node) || changed;
+        } else if (delta.type === 'add') {
+            const parent = findTreeNode(currentFileSystem, parentPathOf(delta.path));
+            if (parent) changed = insertTreeNode(parent, delta.node) || changed;
+        } else if (delta.type === 'modify') {
+            const node = findTreeNode(currentFileSystem, delta.path);
+            if (node) {
+                node.size = delta.size;
+                node.mtime = delta.mtime;
+            }
+        } else if (delta.type === 'refresh') {
+            // Too many changes in one folder - list it again
+            const node = findTreeNode(currentFileSystem, delta.path);
+            if (node && node.loaded) {
+                node.loaded = false;
+                node.children = [];
+                node.next_cursor = undefined;
+                if (node.open) reload.push(node);
+                changed = true;
+            }
+        }
+    }
+
+    try {
+        await Promise.all(reload.map(node => loadFolderPage(node)));
+    } catch (error) {
+        console.error('Error reloading folder:', error);
+    }
+    if (changed) {
+        treeContainer.innerHTML = '';
+        renderTreeItem(currentFileSystem, treeContainer, 0);
+    }
+};
+
 function renderTreeItem(item, container, level) {
     const treeItem = document.createElement('div');
     treeItem.className = `tree-item ${item.type} ${item.open ? 'open' : ''}`;
@@ -2122,18 +2427,21 @@ function renderTreeItem(item, container, level) {
                     item.open = false;
                     chevron.classList.remove('rotated');
                     
-                    const children = Array.from(treeItem.querySelectorAll('.tree-item'));
+                    const children = Array.from(treeItem.querySelectorAll('.tree-item, .tree-load-more'));
                     children.forEach(child => child.remove());
                     
                 } else {
                     item.open = true;
                     chevron.classList.add('rotated');
                     
-                    if (item.children && item.children.length > 0) {
-                        item.children.forEach(child => {
-                            renderTreeItem(child, treeItem, level + 1);
+                    treeItem.expanding = (item.loaded ? Promise.resolve() : loadFolderPage(item))
+                        .then(() => {
+                            if (item.open) renderFolderChildren(item, treeItem, level);
+                        })
+                        .catch(error => {
+                            console.error('Error loading folder:', error);
+                            showClipboardStatus('Error loading folder', 'error');
                         });
-                    }
                 }
             }
             e.stopPropagation();
@@ -2174,10 +2482,8 @@ function renderTreeItem(item, container, level) {
         });
     });
     
-    if (item.type === 'folder' && item.open && item.children) {
-        item.children.forEach(child => {
-            renderTreeItem(child, treeItem, level + 1);
-        });
+    if (item.type === 'folder' && item.open && item.loaded) {
+        renderFolderChildren(item, treeItem, level);
     }
 }
 
@@ -2311,14 +2617,37 @@ async function openFileInEditor(fileName, filePath) {
             }
         }
         
-        const content = await window.pywebview.api.open_files_editor(filePath);
+        const opened = await window.pywebview.api.open_file_chunked(filePath);
+        if (!opened || opened.status !== 'ok') {
+            throw new Error(opened ? opened.message : 'No response from backend');
+        }
+        const content = opened.content;
         const tabId = tabManager.addTab(fileName, filePath, content);
         
         if (!tabId) {
             throw new Error('Failed to create tab');
         }
         
+        if (opened.windowed) {
+            // Large file - read-only, further ranges fetched as you scroll
+            tabManager.getTab(tabId).windowed = {
+                size: opened.size,
+                end: opened.end,
+                eof: opened.eof,
+                firstLine: 1,
+                loading: false
+            };
+        }
+        
         await createUITab(fileName, filePath, tabId, content);
+        
+        if (opened.doc_version) {
+            // Saves send only the edits made since this version (see saveCurrentFile)
+            const tab = tabManager.getTab(tabId);
+            const editor = tabManager.getEditorInstance(tabId);
+            tab.docVersion = editor && editor.getValue() === content ? opened.doc_version : null;
+            tab.pendingChanges = [];
+        }
         welcomeScreen.style.display = 'none';
         splitView.style.display = 'flex';
         
@@ -2352,6 +2681,9 @@ async function createUITab(fileName, filePath, tabId, content) {
     const editorInstance = await createEditorForTab(tabId, content, getLanguageFromFileName(fileName));
     if (editorInstance) {
         tabManager.setEditorInstance(tabId, editorInstance);
+        if (tabManager.getTab(tabId)?.windowed) {
+            setupWindowedEditor(tabId, editorInstance);
+        }
     }
     
     setActiveTab(tab);
@@ -2421,7 +2753,8 @@ async function createEditorForTab(tabId, content, language) {
     
     // Track cursor position
     editor.onDidChangeCursorPosition((e) => {
-        const lineNumber = e.position.lineNumber;
+        const windowed = tabManager.getTab(tabId)?.windowed;
+        const lineNumber = e.position.lineNumber + (windowed ? windowed.firstLine - 1 : 0);
         const column = e.position.column;
         updateCursorPositionDisplay(lineNumber, column);
     });
@@ -2430,10 +2763,19 @@ async function createEditorForTab(tabId, content, language) {
     const position = editor.getPosition();
     updateCursorPositionDisplay(position.lineNumber, position.column);
     
-    editor.onDidChangeModelContent(() => {
+    editor.onDidChangeModelContent((e) => {
         const currentContent = editor.getValue();
         const tabData = tabManager.getTab(tabId);
-        if (tabData) {
+        if (tabData && !tabData.windowed) {
+            // Offsets are against the text before this event - apply back to front
+            tabData.pendingChanges = tabData.pendingChanges || [];
+            [...e.changes].sort((a, b) => b.rangeOffset - a.rangeOffset).forEach(change => {
+                tabData.pendingChanges.push({
+                    rangeOffset: change.rangeOffset,
+                    rangeLength: change.rangeLength,
+                    text: change.text
+                });
+            });
             tabManager.updateTabContent(tabData.path, currentContent);
             updateTabUnsavedIndicator(tabId);
         }
@@ -2447,6 +2789,76 @@ async function createEditorForTab(tabId, content, language) {
     return editor;
 }
 
+// ========== LARGE FILE (WINDOWED) TABS ==========
+const WINDOW_CHUNK_BYTES = 512 * 1024;
+const WINDOW_JUMP_LINES = 5000;
+
+function setupWindowedEditor(tabId, editor) {
+    const tab = tabManager.getTab(tabId);
+    editor.updateOptions({
+        readOnly: true,
+        lineNumbers: n => String(n + tab.windowed.firstLine - 1)
+    });
+    showClipboardStatus(`Large file (${(tab.windowed.size / 1048576).toFixed(1)} MB) opened read-only`, 'info');
+
+    // Next range when the bottom comes into view
+    editor.onDidScrollChange(e => {
+        const w = tab.windowed;
+        if (w.eof || w.loading) return;
+        if (e.scrollTop + editor.getLayoutInfo().height >= e.scrollHeight - 2000) {
+            appendWindowedRange(tab, editor);
+        }
+    });
+
+    editor.addCommand(monaco.KeyMod.CtrlCmd | monaco.KeyCode.KeyG, () => jumpToLineWindowed(tab, editor));
+}
+
+async function appendWindowedRange(tab, editor) {
+    const w = tab.windowed;
+    w.loading = true;
+    try {
+        const chunk = await window.pywebview.api.read_file_range(tab.path, w.end, WINDOW_CHUNK_BYTES);
+        if (!chunk || chunk.status !== 'ok') {
+            showClipboardStatus(chunk?.message || 'Could not read more of the file', 'error');
+            return;
+        }
+        const model = editor.getModel();
+        const last = model.getLineCount();
+        const column = model.getLineMaxColumn(last);
+        model.applyEdits([{ range: new monaco.Range(last, column, last, column), text: chunk.content }]);
+        w.end = chunk.end;
+        w.eof = chunk.eof;
+    } finally {
+        w.loading = false;
+    }
+}
+
+async function jumpToLineWindowed(tab, editor) {
+    const line = parseInt(prompt('Go to line:'), 10);
+    if (!line || line < 1) return;
+
+    const first = Math.max(1, line - 200);
+    const result = await window.pywebview.api.read_file_lines(tab.path, first, WINDOW_JUMP_LINES);
+    if (!result || result.status !== 'ok') {
+        const message = result?.status === 'pending'
+            ? `Still indexing lines (${result.indexed_lines} so far)`
+            : (result?.message || 'Could not jump to line');
+        showClipboardStatus(message, 'error');
+        return;
+    }
+
+    const w = tab.windowed;
+    w.firstLine = result.first_line;
+    w.end = result.end;
+    w.eof = result.eof;
+    editor.setValue(result.content);
+    editor.updateOptions({ lineNumbers: n => String(n + w.firstLine - 1) });
+
+    const target = Math.max(1, line - w.firstLine + 1);
+    editor.revealLineInCenter(target);
+    editor.setPosition({ lineNumber: target, column: 1 });
+}
+
 function getLanguageFromFileName(fileName) {
     const ext = fileName.split('.').pop().toLowerCase();
     const languageMap = {
@@ -2568,6 +2980,11 @@ async function saveCurrentFile() {
         showClipboardStatus('No file to save', 'error');
         return false;
     }
+    if (activeTab.windowed) {
+        // The editor only holds part of the file - saving would truncate it
+        showClipboardStatus('Large files open read-only', 'error');
+        return false;
+    }
     
     const editorInstance = tabManager.getEditorInstance(activeTab.id);
     const content = editorInstance ? editorInstance.getValue() : '';
@@ -2578,17 +2995,32 @@ async function saveCurrentFile() {
             return false;
         }
         
-        const result = await window.pywebview.api.save(activeTab.path, content);
+        // Only the edits since the last save cross the bridge - the backend answers
+        // "resync" when it lost track and then the full buffer goes instead
+        const sent = activeTab.pendingChanges || [];
+        activeTab.pendingChanges = [];
+        let result = null;
+        if (activeTab.docVersion) {
+            result = await window.pywebview.api.save_delta(activeTab.path, activeTab.docVersion, sent);
+        }
+        if (!result || result.status === 'resync') {
+            result = await window.pywebview.api.save(activeTab.path, content);
+        }
         if (result && result.status === 'success') {
+            activeTab.docVersion = result.version;
             tabManager.markAsSaved(activeTab.path);
             updateTabUnsavedIndicator(activeTab.id);
             showClipboardStatus('File saved successfully', 'info');
             return true;
         } else {
+            // Nothing was written - keep the edits for the next attempt
+            activeTab.pendingChanges = sent.concat(activeTab.pendingChanges);
             showClipboardStatus(result?.message || 'Save failed', 'error');
             return false;
         }
     } catch (error) {
+        // Version is unknown now - the next save sends the full buffer
+        activeTab.docVersion = null;
         console.error('Error saving file:', error);
         showClipboardStatus('Error saving file', 'error');
         return false;
@@ -2601,6 +3033,10 @@ async function saveFileAs() {
         showClipboardStatus('No file to save', 'error');
         return false;
     }
+    if (activeTab.windowed) {
+        showClipboardStatus('Large files open read-only', 'error');
+        return false;
+    }
     
     const editorInstance = tabManager.getEditorInstance(activeTab.id);
     const content = editorInstance ? editorInstance.getValue() : '';
@@ -2622,6 +3058,8 @@ async function saveFileAs() {
             tabManager.removeTab(activeTab.id);
             const tabId = tabManager.addTab(newName, newPath, content);
             tabManager.markAsSaved(newPath);
+            tabManager.getTab(tabId).docVersion = result.version;
+            tabManager.getTab(tabId).pendingChanges = [];
             
             const oldTabElement = document.getElementById(activeTab.id);
             if (oldTabElement) {
@@ -4112,4 +4550,4 @@ if (document.readyState === 'loading') {
     });
 } else {
     setTimeout(reloadAndApplySettings, 500);
-}
\ No newline at end of file
+}
\ No newline at end of file
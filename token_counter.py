@@ -0,0 +1,317 @@
+import os
+import re
+import sys
+import math
+import heapq
+import base64
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# ================= SETTINGS =================
+TOKENIZER = "auto"                  # auto | bpe | tiktoken | pretoken | heuristic - tiktoken is in requirements.txt
+TIKTOKEN_ENCODING = "cl100k_base"   # same split rules as llama-3's tokenizer, closest public vocab
+VOCAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage", "tokenizers")
+CACHE_SIZE = 4096                   # texts whose count is kept, by content hash
+PIECE_CACHE_SIZE = 200_000          # BPE pieces whose count is kept - code repeats them a lot
+
+# cl100k / llama-3 pre-tokenizer - as tiktoken takes it, and spelled with stdlib classes (built on first use)
+TIKTOKEN_PATTERN = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+PIECE_PATTERN = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|(?:[^\r\n\w]|_)?[^\W\d_{N}]+|[\d{N}]{{1,3}}| ?(?:[^\s\w]|_)+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+_piece_re = None
+
+
+def piece_re():
+    """
+    \p{L} / \p{N} without the regex module: \w minus \d and _ is every letter plus the
+    Nl / No numbers (½, ², Ⅻ ...), which \p{N} wants instead - those get listed explicitly.
+    Everything else ("not a letter or number") is just [^\w] or _.
+    """
+    global _piece_re
+    if _piece_re is None:
+        numbers = "".join(re.escape(chr(c)) for c in range(sys.maxunicode + 1)
+                          if unicodedata.category(chr(c)) in ("Nl", "No"))
+        _piece_re = re.compile(PIECE_PATTERN.format(N=numbers))
+    return _piece_re
+
+
+# ================= COUNTERS =================
+class HeuristicCounter:
+    """The old rule: 1 token ≈ 4 characters"""
+    name = "heuristic"
+    exact = False
+
+    def count(self, text):
+        return len(text) // 4
+
+
+class PretokenCounter:
+    """
+    No vocab needed: split exactly like the real tokenizer, then add the expected token count
+    of each piece (fitted against cl100k on Python / JS / HTML / CSS). Still an estimate.
+    """
+    name = "pretoken"
+    exact = False
+
+    def count(self, text):
+        total = 0.0
+        for piece in piece_re().findall(text):
+            if not piece.isascii():
+                total += 0.65 * len(piece.encode("utf-8"))
+                continue
+            core = piece.strip()
+            n = len(core)
+            if not core:
+                total += 1 if len(piece) <= 64 else len(piece) / 64   # indentation / blank lines
+            elif core[-1].isalpha():
+                # Words up to ~6 letters are one token, longer identifiers ~one more per 5 letters
+                lead = not core[0].isalpha()
+                letters = n - lead
+                total += (1.05 if letters <= 6 else 1 + 0.19 * (letters - 6)) + 0.2 * lead
+            elif core.isdigit():
+                total += 1
+            else:
+                total += 1 if n <= 3 else (n - 1) / 2   # operators / brackets merge in pairs
+        return round(total)
+
+
+class BpeCounter:
+    """
+    Exact byte-level BPE from a tiktoken-format vocab ("<base64 token> <rank>" per line) -
+    cl100k_base.tiktoken, or llama-3's own tokenizer.model, which uses the same format.
+    With tiktoken installed the vocab is handed to it; otherwise pure Python, where each
+    distinct piece is merged once (lowest rank first, off a heap) and its count remembered.
+    """
+    exact = True
+
+    def __init__(self, vocab_file):
+        self.name = f"bpe:{os.path.basename(vocab_file)}"
+        self.vocab_file = vocab_file
+        self.ranks = None
+        self.encoding = None
+        self.pieces = {}
+        self.lock = threading.Lock()
+
+    def load(self):
+        ranks = {}
+        with open(self.vocab_file, "rb") as f:
+            for line in f:
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.Encoding(self.name, pat_str=TIKTOKEN_PATTERN, mergeable_ranks=ranks, special_tokens={})
+            except Exception as e:
+                print(f"⚠️ tiktoken couldn't take {self.vocab_file} ({e}) - merging in pure Python")
+        self.ranks = ranks
+
+    def piece_count(self, piece):
+        """
+        Tokens in one piece (bytes): merge the lowest-ranked adjacent pair, leftmost on ties, until
+        none is in the vocab. Parts are a linked list of start offsets and candidate pairs sit on a
+        heap; a popped pair whose bytes changed since it was pushed is skipped - O(n log n).
+        """
+        ranks = self.ranks
+        if piece in ranks:
+            return 1
+        n = len(piece)
+        end = list(range(1, n + 1))     # start -> end of the part starting there
+        prev = list(range(-1, n - 1))   # start -> start of the part before it
+        alive = [True] * n
+        heap = [(ranks[piece[i:i + 2]], i) for i in range(n - 1) if piece[i:i + 2] in ranks]
+        heapq.heapify(heap)
+        parts = n
+        while heap:
+            rank, i = heapq.heappop(heap)
+            if not alive[i] or end[i] >= n:
+                continue
+            j = end[i]
+            if ranks.get(piece[i:end[j]]) != rank:
+                continue
+            # Merge part j into part i
+            alive[j] = False
+            end[i] = end[j]
+            if end[i] < n:
+                prev[end[i]] = i
+            parts -= 1
+            if prev[i] >= 0:
+                rank = ranks.get(piece[prev[i]:end[i]])
+                if rank is not None:
+                    heapq.heappush(heap, (rank, prev[i]))
+            if end[i] < n:
+                rank = ranks.get(piece[i:end[end[i]]])
+                if rank is not None:
+                    heapq.heappush(heap, (rank, i))
+        return parts
+
+    def count(self, text):
+        if self.ranks is None:
+            with self.lock:
+                if self.ranks is None:
+                    self.load()
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        pieces = self.pieces
+        total = 0
+        for piece in piece_re().findall(text):
+            n = pieces.get(piece)
+            if n is None:
+                n = self.piece_count(piece.encode("utf-8"))
+                if len(pieces) >= PIECE_CACHE_SIZE:
+                    pieces.clear()
+                pieces[piece] = n
+            total += n
+        return total
+
+
+class TiktokenCounter:
+    exact = True
+
+    def __init__(self, encoding=TIKTOKEN_ENCODING):
+        self.name = f"tiktoken:{encoding}"
+        self.encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+def vocab_files():
+    try:
+        return sorted(os.path.join(VOCAB_DIR, name) for name in os.listdir(VOCAB_DIR)
+                      if name.endswith((".tiktoken", ".model")))
+    except OSError:
+        return []
+
+
+def make_counter(kind=TOKENIZER):
+    """
+    auto: a vocab dropped into storage/tokenizers (exact for that vocab) -> tiktoken (the default,
+    see requirements.txt) -> pretoken estimate, with a warning that batch budgets are now guesses.
+    """
+    if kind in ("auto", "bpe") and vocab_files():
+        return BpeCounter(vocab_files()[0])
+    reason = None
+    if kind in ("auto", "tiktoken"):
+        if tiktoken is None:
+            reason = "tiktoken is not installed"
+        else:
+            try:
+                return TiktokenCounter()
+            except Exception as e:
+                reason = f"tiktoken encoding {TIKTOKEN_ENCODING} not available: {e}"
+    if kind == "heuristic":
+        return HeuristicCounter()
+    if reason:
+        print("=" * 60)
+        print(f"⚠️ TOKEN COUNTS ARE ESTIMATES - {reason}")
+        print("   Batches may overshoot the model's limits. Fix: pip install -r requirements.txt")
+        print(f"   (or put a .tiktoken vocab in {VOCAB_DIR})")
+        print("=" * 60)
+    return PretokenCounter()
+
+
+# ================= SHARED COUNTER + CACHE =================
+_counter = None
+_cache = OrderedDict()  # content hash -> count, oldest first
+_lock = threading.Lock()
+
+
+def get_counter():
+    global _counter
+    with _lock:
+        if _counter is None:
+            _counter = make_counter()
+            print(f"🔢 Token counter: {_counter.name}")
+        return _counter
+
+
+def set_counter(counter):
+    """Plug in any object with .name, .exact and .count(text)"""
+    global _counter
+    with _lock:
+        _counter = counter
+        _cache.clear()
+
+
+def count_tokens(text, digest=None):
+    """Token count of text with the shared counter; repeat texts come from an LRU keyed by content hash"""
+    counter = get_counter()
+    key = digest or hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _lock:
+        n = _cache.get(key)
+        if n is not None:
+            _cache.move_to_end(key)
+            return n
+    n = counter.count(text)
+    with _lock:
+        _cache[key] = n
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return n
+
+
+# ================= CALIBRATION =================
+def calibrate(folders, reference=None, candidates=None, top=8):
+    """
+    How far off are the estimates on real code? Every text file under folders (same scanner,
+    ignore rules and size limit as readme_smart) counted with reference vs each candidate.
+    """
+    from project_scanner import ProjectScanner
+
+    reference = reference or make_counter()
+    candidates = candidates or [HeuristicCounter(), PretokenCounter()]
+    if not reference.exact:
+        print(f"⚠️ No exact counter here (install tiktoken or put a vocab in {VOCAB_DIR}) - "
+              f"comparing against the {reference.name} estimate")
+
+    totals = {c.name: 0 for c in candidates}
+    per_file = {c.name: [] for c in candidates}
+    by_ext = {}
+    ref_total = 0
+    for folder in folders:
+        scanner = ProjectScanner(folder)
+        for record in scanner.scan():
+            ref = reference.count(record["content"])
+            if not ref:
+                continue
+            ref_total += ref
+            ext = os.path.splitext(record["path"])[1].lower() or record["filename"]
+            row = by_ext.setdefault(ext, {"files": 0, "ref": 0, **{c.name: 0 for c in candidates}})
+            row["files"] += 1
+            row["ref"] += ref
+            for c in candidates:
+                n = c.count(record["content"])
+                totals[c.name] += n
+                row[c.name] += n
+                per_file[c.name].append(abs(n - ref) / ref)
+        print(scanner.summary())
+
+    if not ref_total:
+        print("❌ No text files found")
+        return {}
+    print(f"\n📏 Reference: {reference.name} - {ref_total:,} tokens")
+    report = {"reference": reference.name, "tokens": ref_total, "counters": {}}
+    for c in candidates:
+        errors = sorted(per_file[c.name])
+        total_error = 100 * (totals[c.name] - ref_total) / ref_total
+        mean_error = 100 * sum(errors) / len(errors)
+        p90 = 100 * errors[int(len(errors) * 0.9)]
+        report["counters"][c.name] = {"total_error": total_error, "mean_file_error": mean_error, "p90_file_error": p90}
+        print(f"  {c.name:<10} total {totals[c.name]:>12,} ({total_error:+.1f}%)  per file: mean {mean_error:.1f}%, p90 {p90:.1f}%")
+
+    print("\n  By extension (signed error of the total):")
+    for ext, row in sorted(by_ext.items(), key=lambda kv: -kv[1]["ref"])[:top]:
+        cols = "  ".join(f"{c.name} {100 * (row[c.name] - row['ref']) / row['ref']:+6.1f}%" for c in candidates)
+        print(f"  {ext:<8} {row['files']:>5} files {row['ref']:>10,} tokens  {cols}")
+    return report
+
+
+if __name__ == "__main__":
+    # python token_counter.py [folder ...]
+    calibrate(sys.argv[1:] or ["."])
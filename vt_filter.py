@@ -0,0 +1,121 @@
+import re
+import sys
+import time
+
+# DEC private modes the webview terminal should never see:
+#   2004 bracketed paste, 25 cursor show/hide, 1 application cursor keys
+STRIPPED_MODES = {"2004", "25", "1"}
+
+PRIVATE_MODE_RE = re.compile(r"\x1b\[\?([0-9;]*)([hl])")
+# Tail of a chunk that may still turn into a private-mode sequence once the next read arrives
+PARTIAL_RE = re.compile(r"\x1b(?:\[(?:\?[0-9;]*)?)?\Z")
+
+
+class OutputFilter:
+    """
+    Single-pass filter for the PTY stream.
+    Drops the private modes above and passes everything else (colors, cursor moves, clears) through.
+    Keeps the unfinished tail of a chunk so sequences split across reads are still caught.
+    """
+
+    def __init__(self, stripped_modes=STRIPPED_MODES):
+        self.stripped_modes = stripped_modes
+        self.carry = ""
+
+    def _replace(self, match):
+        params = match.group(1).split(";")
+        kept = [p for p in params if p not in self.stripped_modes]
+        if not kept:
+            return ""
+        if len(kept) == len(params):
+            return match.group(0)
+        return f"\x1b[?{';'.join(kept)}{match.group(2)}"
+
+    def feed(self, data):
+        if self.carry:
+            data = self.carry + data
+            self.carry = ""
+
+        # Hold back a possibly incomplete sequence at the very end
+        esc = data.rfind("\x1b", -16)
+        if esc != -1 and PARTIAL_RE.match(data, esc):
+            self.carry = data[esc:]
+            data = data[:esc]
+
+        # Fast path - most chunks have no private-mode sequence at all
+        if "\x1b[?" not in data:
+            return data
+        return PRIVATE_MODE_RE.sub(self._replace, data)
+
+    def flush(self):
+        data, self.carry = self.carry, ""
+        return data
+
+
+def legacy_clean_output(data):
+    """The old eight-pass str.replace filter - kept for the benchmark only"""
+    data = data.replace('\x1b[?2004h', '').replace('\x1b[?2004l', '')
+    data = data.replace('\x1b[?25h', '').replace('\x1b[?25l', '')
+    data = data.replace('\x1b[?1h', '').replace('\x1b[?1l', '')
+    data = data.replace('__DONE__', '')
+    data = data.replace('__CMD_START__', '')
+    return data
+
+
+# ================= BENCHMARK =================
+def sample_build_log(lines=200000):
+    """Stand-in for a recorded log: compiler lines, colored warnings, progress bars, prompt redraws"""
+    out = []
+    for i in range(lines):
+        if i % 50 == 0:
+            out.append("\x1b[?2004h\x1b[?25l[%3d%%] \x1b[32mBuilding CXX object src/module_%d.o\x1b[0m\x1b[?25h\r\n" % (i % 100, i))
+        elif i % 17 == 0:
+            out.append("\x1b[1m\x1b[35mwarning:\x1b[0m unused variable 'tmp_%d' [-Wunused-variable]\r\n" % i)
+        else:
+            out.append("g++ -O2 -Wall -Iinclude -c src/file_%d.cpp -o build/file_%d.o\r\n" % (i, i))
+    return "".join(out)
+
+
+def chunks_of(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def benchmark(text, chunk_size=4096, rounds=5):
+    chunks = chunks_of(text, chunk_size)
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    def measure(run):
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return mb / best
+
+    def run_new():
+        f = OutputFilter()
+        for chunk in chunks:
+            f.feed(chunk)
+        f.flush()
+
+    def run_legacy():
+        for chunk in chunks:
+            legacy_clean_output(chunk)
+
+    return measure(run_legacy), measure(run_new)
+
+
+if __name__ == "__main__":
+    # python vt_filter.py [recorded-build.log]
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "r", encoding="utf-8", errors="replace") as f:
+            log = f.read()
+        source = sys.argv[1]
+    else:
+        log = sample_build_log()
+        source = "synthetic build log"
+
+    print(f"📊 {source}: {len(log.encode('utf-8')) / (1024 * 1024):.1f} MB")
+    for size in (512, 4096, 65536):
+        legacy, new = benchmark(log, size)
+        print(f"  chunk {size:>6} B   legacy {legacy:8.1f} MB/s   single-pass {new:8.1f} MB/s   ({new / legacy:.1f}x)")